@@ -0,0 +1,232 @@
+"""
+Bulk scans for field surveys.
+
+An extension worker uploads every leaf photo from a field visit in one
+request (repeated `images` parts and/or one `archive` zip). The images
+are hashed and decoded in parallel, repeats are served from the scan
+cache, and the rest go through the worker's InferenceBatcher like any
+other scan. They are submitted one batch-worth at a time, so a survey
+never fills the batcher's queue ahead of interactive scans; a full queue
+raises InferenceQueueFull (503 in the view). All accepted scans are stored
+with a single bulk_create, and their files are deleted again if that
+fails. The response carries one entry per image plus a field-level health
+summary.
+
+Quota: each distinct readable image is one disease-detection use. The
+upload is hashed and decoded (BulkScan) before the view charges, so
+in-request repeats and unreadable files are free, and the charge is
+refunded when the scan fails or the batcher is full.
+
+Tuning (env vars):
+    BULK_SCAN_MAX_IMAGES       images per request               (default 50)
+    BULK_SCAN_MAX_IMAGE_BYTES  per-image size limit             (default 10 MB)
+    BULK_SCAN_DECODE_WORKERS   threads decoding images          (default 4)
+"""
+
+import hashlib
+import io
+import os
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from rest_framework import status
+
+from .image_storage import schedule_optimise
+from .inference import get_batcher
+from .models import ScanResult
+from .preprocessing import preprocess_image
+from .scan_cache import scan_cache
+from .scan_service import INFERENCE_TIMEOUT, evaluate_scan
+
+MAX_IMAGES = int(os.getenv("BULK_SCAN_MAX_IMAGES", "50"))
+MAX_IMAGE_BYTES = int(os.getenv("BULK_SCAN_MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+DECODE_WORKERS = int(os.getenv("BULK_SCAN_DECODE_WORKERS", "4"))
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+class BulkScanError(Exception):
+    """Invalid bulk upload; the message is safe to return to the client."""
+
+
+def collect_uploads(files) -> list[tuple[str, bytes]]:
+    """
+    (filename, bytes) for every image in request.FILES: each `images`
+    part, plus the image members of an optional `archive` zip. Counts and
+    sizes are checked before anything is read into memory.
+    """
+    parts = files.getlist("images")
+    if len(parts) > MAX_IMAGES:
+        raise BulkScanError(f"A bulk scan accepts at most {MAX_IMAGES} images.")
+    for f in parts:
+        if f.size > MAX_IMAGE_BYTES:
+            raise BulkScanError(f"{f.name} is larger than the per-image limit.")
+    uploads = [(f.name, f.read()) for f in parts]
+
+    archive = files.get("archive")
+    if archive:
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    name = PurePosixPath(info.filename)
+                    if info.is_dir() or name.suffix.lower() not in IMAGE_SUFFIXES:
+                        continue
+                    if name.name.startswith("."):
+                        continue  # macOS resource forks etc.
+                    if len(uploads) >= MAX_IMAGES:
+                        raise BulkScanError(f"A bulk scan accepts at most {MAX_IMAGES} images.")
+                    if info.file_size > MAX_IMAGE_BYTES:
+                        raise BulkScanError(f"{name.name} is larger than the per-image limit.")
+                    data = zf.read(info)
+                    # file_size comes from the archive's own header
+                    if len(data) > MAX_IMAGE_BYTES:
+                        raise BulkScanError(f"{name.name} is larger than the per-image limit.")
+                    uploads.append((name.name, data))
+        except zipfile.BadZipFile:
+            raise BulkScanError("The archive is not a valid zip file.")
+
+    if not uploads:
+        raise BulkScanError("No images provided. Upload `images` files or an `archive` zip.")
+    return uploads
+
+
+def _decode(data: bytes):
+    """Decode one image (runs on the decode pool; PIL releases the GIL)."""
+    try:
+        return preprocess_image(io.BytesIO(data)), None
+    except Exception as exc:
+        return None, f"Could not read image: {exc}"
+
+
+class BulkScan:
+    """
+    One bulk upload, hashed, deduplicated against itself and the scan
+    cache, and decoded, so the view knows what it is charging for before
+    run() sends anything to the models.
+    """
+
+    def __init__(self, uploads: list[tuple[str, bytes]]):
+        self.uploads = uploads
+        self.hashes = [hashlib.sha256(data).hexdigest() for _, data in uploads]
+        self.scans = {}                 # upload index -> scan_batch() dict
+        self.errors = {}                # upload index -> decode error
+        self.repeats = {}               # index -> earlier index with same bytes
+        self.decoded = {}               # index -> array awaiting inference
+
+        first_seen, misses = {}, []
+        for i, image_hash in enumerate(self.hashes):
+            if image_hash in first_seen:
+                self.repeats[i] = first_seen[image_hash]
+                continue
+            first_seen[image_hash] = i
+            cached = scan_cache.get(image_hash)
+            if cached is not None:
+                self.scans[i] = cached
+            else:
+                misses.append(i)
+
+        with ThreadPoolExecutor(max_workers=DECODE_WORKERS) as pool:
+            for i, (arr, error) in zip(misses, pool.map(_decode, (uploads[i][1] for i in misses))):
+                if error:
+                    self.errors[i] = error
+                else:
+                    self.decoded[i] = arr
+
+    @property
+    def billable(self) -> int:
+        """Distinct readable images: what the quota is charged for."""
+        return len(self.scans) + len(self.decoded)
+
+    def run(self, user) -> dict:
+        """Scan the upload for `user`; returns the response body."""
+        hashes, scans, errors = self.hashes, dict(self.scans), dict(self.errors)
+
+        pending = list(self.decoded)    # upload indices that need inference
+        batcher = get_batcher()
+        for start in range(0, len(pending), batcher.max_batch_size):
+            chunk = pending[start:start + batcher.max_batch_size]
+            futures = [batcher.submit(self.decoded[i]) for i in chunk]
+            for i, future in zip(chunk, futures):
+                scans[i] = future.result(timeout=INFERENCE_TIMEOUT)
+                scan_cache.put(hashes[i], scans[i])
+
+        for i, first in self.repeats.items():
+            if first in scans:
+                scans[i] = scans[first]
+            else:
+                errors[i] = errors[first]
+
+        image_field = ScanResult._meta.get_field("image")
+
+        results, rows, saved = [], [], []
+        try:
+            for i, (filename, data) in enumerate(self.uploads):
+                entry = {"index": i, "filename": filename}
+                if i in errors:
+                    results.append({**entry, "httpStatus": status.HTTP_400_BAD_REQUEST,
+                                    "error": "unreadable_image", "message": errors[i]})
+                    continue
+
+                body, code, record = evaluate_scan(scans[i])
+                results.append({**entry, "httpStatus": code, **body})
+                if record is None:
+                    continue
+
+                # Each row stores its own file; only the prediction is deduplicated
+                image_name = image_field.storage.save(
+                    image_field.generate_filename(None, filename), ContentFile(data)
+                )
+                saved.append(image_name)
+                rows.append((len(results) - 1, ScanResult(
+                    user=user, image=image_name, image_hash=hashes[i], **record
+                )))
+
+            with transaction.atomic():
+                created = ScanResult.objects.bulk_create([row for _, row in rows])
+                # Re-encode + thumbnail off the request path, once committed
+                schedule_optimise(
+                    scan_result.pk for scan_result in created if scan_result.pk is not None
+                )
+        except Exception:
+            # No row references the files written for this request
+            for name in saved:
+                image_field.storage.delete(name)
+            raise
+
+        for (result_index, _), scan_result in zip(rows, created):
+            if scan_result.pk is not None:
+                results[result_index]["scanId"] = scan_result.pk
+
+        return {"results": results, "summary": summarize_field(results)}
+
+
+def summarize_field(results: list[dict]) -> dict:
+    """Aggregate per-image bulk results into a field health summary."""
+    scanned = [r for r in results if r["httpStatus"] == status.HTTP_200_OK]
+    healthy = [r for r in scanned if r["isHealthy"]]
+    diseased = [r for r in scanned if not r["isHealthy"]]
+
+    diseases = Counter(f'{r["cropType"]} — {r["disease"]}' for r in diseased)
+    severities = Counter(r["severity"].lower() for r in diseased)
+    crops = Counter(r["cropType"] for r in scanned)
+
+    return {
+        "total_images": len(results),
+        "scanned": len(scanned),
+        "healthy": len(healthy),
+        "diseased": len(diseased),
+        "not_a_plant": sum(r.get("error") == "not_a_plant" for r in results),
+        "unsupported_crop": sum(r.get("error") == "unsupported_crop" for r in results),
+        "unreadable": sum(r.get("error") == "unreadable_image" for r in results),
+        "health_score": (
+            round(len(healthy) / len(scanned) * 100, 1) if scanned else None
+        ),
+        "crops": dict(crops.most_common()),
+        "diseases": [{"name": name, "count": count} for name, count in diseases.most_common()],
+        "severity_breakdown": dict(severities),
+        "dominant_issue": diseases.most_common(1)[0][0] if diseases else None,
+    }
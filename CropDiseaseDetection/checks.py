@@ -0,0 +1,21 @@
+"""
+System checks for the disease-scan settings, so a bad deployment fails
+`manage.py check` / startup instead of the first scan or readiness probe.
+"""
+
+from django.core.checks import Error, register
+
+
+@register()
+def check_inference_backend(app_configs, **kwargs):
+    from .ml_model import BACKENDS, INFERENCE_BACKEND
+
+    if INFERENCE_BACKEND in BACKENDS:
+        return []
+    return [
+        Error(
+            f"Unknown INFERENCE_BACKEND {INFERENCE_BACKEND!r}.",
+            hint=f"Set INFERENCE_BACKEND to one of: {', '.join(BACKENDS)}.",
+            id="CropDiseaseDetection.E001",
+        )
+    ]
@@ -0,0 +1,69 @@
+"""
+Fused scan graph: plant gate + disease classifier in one SavedModel.
+
+The two networks were trained separately and do not share a backbone, so
+they cannot be merged into one trunk with two heads without retraining.
+What this module does instead is trace both into a single TensorFlow
+graph with a cascaded early exit:
+
+    plant_prob = gate(images)
+    accepted   = plant_prob > threshold
+    if any(accepted):  disease_probs = classifier(images[accepted])
+    else:              disease_probs = zeros          # classifier never runs
+
+Only accepted images reach the classifier, so a rejected photo costs one
+network instead of two. The exported SavedModel is loaded with plain
+tf.saved_model.load(), so neither Keras 3 nor the legacy tf_keras loader
+is needed at serving time.
+"""
+
+import tensorflow as tf
+
+from .preprocessing import IMG_SIZE
+
+
+class FusedScanModule(tf.Module):
+    def __init__(self, plant_detector, disease_model, threshold: float = 0.5):
+        super().__init__(name="fused_scan")
+        self.plant_detector = plant_detector
+        self.disease_model = disease_model
+        self.threshold = float(threshold)
+        self.num_classes = int(disease_model.outputs[0].shape[-1])
+
+    @tf.function(
+        input_signature=[
+            tf.TensorSpec([None, IMG_SIZE[1], IMG_SIZE[0], 3], tf.float32, name="images")
+        ]
+    )
+    def scan(self, images):
+        """
+        images (N, 224, 224, 3) float32 in [0, 1] ->
+            plant_prob     (N,)    sigmoid output of the gate
+            disease_probs  (N, C)  class probabilities; zeros for rejected images
+        """
+        batch_size = tf.shape(images)[0]
+        plant_prob = tf.reshape(self.plant_detector(images, training=False), [-1])
+        accepted = tf.where(plant_prob > self.threshold)[:, 0]
+
+        def classify():
+            probs = self.disease_model(tf.gather(images, accepted), training=False)
+            return tf.scatter_nd(
+                tf.expand_dims(accepted, 1),
+                tf.cast(probs, tf.float32),
+                tf.stack([tf.cast(batch_size, tf.int64), self.num_classes]),
+            )
+
+        def skip():
+            return tf.zeros([batch_size, self.num_classes], dtype=tf.float32)
+
+        disease_probs = tf.cond(tf.size(accepted) > 0, classify, skip)
+        return {"plant_prob": plant_prob, "disease_probs": disease_probs}
+
+
+def export_fused_model(plant_detector, disease_model, path, threshold: float = 0.5):
+    """Trace both models into one graph and save it as a SavedModel at `path`."""
+    module = FusedScanModule(plant_detector, disease_model, threshold)
+    tf.saved_model.save(
+        module, str(path), signatures={"serving_default": module.scan}
+    )
+    return module
@@ -0,0 +1,115 @@
+"""
+Post-upload storage pipeline for scan images.
+
+Uploads are stored as-is when the scan is saved, so the request never waits
+on re-encoding. Right after the row commits, a background thread replaces
+the original with a re-encoded, size-capped copy and writes a small
+thumbnail next to it. Both are WebP, which is much smaller than phone
+JPEGs at the same quality. Every ScanResult owns its upload, so the row is
+repointed with one conditional update and the raw upload is deleted once
+that commits.
+
+Rows uploaded before this existed are handled by `manage.py optimise_scan_images`.
+
+Tuning (env vars):
+    SCAN_IMAGE_MAX_SIDE       longest side of the stored original (default 1600)
+    SCAN_IMAGE_QUALITY        WebP quality of the original         (default 85)
+    SCAN_THUMBNAIL_SIDE       longest side of the thumbnail        (default 320)
+    SCAN_THUMBNAIL_QUALITY    WebP quality of the thumbnail        (default 75)
+    SCAN_IMAGE_WORKERS        background re-encode threads         (default 2)
+"""
+
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+from .models import ScanResult
+
+logger = logging.getLogger(__name__)
+
+MAX_SIDE = int(os.getenv("SCAN_IMAGE_MAX_SIDE", "1600"))
+QUALITY = int(os.getenv("SCAN_IMAGE_QUALITY", "85"))
+THUMBNAIL_SIDE = int(os.getenv("SCAN_THUMBNAIL_SIDE", "320"))
+THUMBNAIL_QUALITY = int(os.getenv("SCAN_THUMBNAIL_QUALITY", "75"))
+WORKERS = int(os.getenv("SCAN_IMAGE_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="scan-image")
+
+
+def _encode(img, max_side: int, quality: int) -> bytes:
+    from PIL import Image as PILImage
+
+    img = img.copy()
+    img.thumbnail((max_side, max_side), PILImage.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format="WEBP", quality=quality, method=4)
+    return buf.getvalue()
+
+
+def optimise_scan_image(scan_id: int) -> bool:
+    """
+    Re-encode the original and write the thumbnail for one ScanResult.
+    Returns False if there was nothing to do.
+    """
+    from PIL import Image as PILImage, ImageOps
+
+    scan = ScanResult.objects.filter(pk=scan_id).only("image", "thumbnail").first()
+    if scan is None or not scan.image or scan.thumbnail:
+        return False
+
+    old_name = scan.image.name
+    with scan.image.open("rb") as f:
+        img = PILImage.open(f)
+        img = ImageOps.exif_transpose(img).convert("RGB")
+
+    stem = PurePosixPath(old_name).stem
+    image_field = ScanResult._meta.get_field("image")
+    thumb_field = ScanResult._meta.get_field("thumbnail")
+    new_name = image_field.storage.save(
+        image_field.generate_filename(None, f"{stem}.webp"),
+        ContentFile(_encode(img, MAX_SIDE, QUALITY)),
+    )
+    thumb_name = thumb_field.storage.save(
+        thumb_field.generate_filename(None, f"{stem}.webp"),
+        ContentFile(_encode(img, THUMBNAIL_SIDE, THUMBNAIL_QUALITY)),
+    )
+
+    with transaction.atomic():
+        # Conditional, so a concurrent run (or a deleted row) loses cleanly
+        updated = ScanResult.objects.filter(pk=scan_id, image=old_name, thumbnail="").update(
+            image=new_name, thumbnail=thumb_name
+        )
+        if not updated:
+            transaction.on_commit(lambda: _delete_files(new_name, thumb_name))
+            return False
+        transaction.on_commit(lambda: _delete_files(old_name))
+    return True
+
+
+def _delete_files(*names):
+    storage = ScanResult._meta.get_field("image").storage
+    for name in names:
+        storage.delete(name)
+
+
+def _optimise_in_background(scan_ids):
+    try:
+        for scan_id in scan_ids:
+            try:
+                optimise_scan_image(scan_id)
+            except Exception:
+                logger.exception("Optimising image of scan %s failed", scan_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_optimise(scan_ids):
+    """Optimise these scans' images in the background once the current transaction commits."""
+    scan_ids = list(scan_ids)
+    if scan_ids:
+        transaction.on_commit(lambda: _executor.submit(_optimise_in_background, scan_ids))
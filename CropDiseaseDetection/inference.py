@@ -0,0 +1,174 @@
+"""
+Micro-batching inference service for disease scans.
+
+Keras has a large fixed cost per predict call, and concurrent requests in
+one worker process cannot share a forward pass when each calls the model
+on its own. Requests instead submit their preprocessed image here and get
+a Future back; a single background thread collects images until either
+the batch is full or the oldest one has waited DISEASE_BATCH_MAX_WAIT_MS,
+then runs ml_model.scan_batch() once for the whole group.
+
+Tuning (env vars):
+    DISEASE_BATCH_MAX_SIZE     images per forward pass        (default 8)
+    DISEASE_BATCH_MAX_WAIT_MS  max time the first image waits (default 20)
+    DISEASE_BATCH_MAX_QUEUE    pending images before rejecting (default 64)
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.getenv("DISEASE_BATCH_MAX_SIZE", "8"))
+MAX_WAIT_MS = float(os.getenv("DISEASE_BATCH_MAX_WAIT_MS", "20"))
+MAX_QUEUE = int(os.getenv("DISEASE_BATCH_MAX_QUEUE", "64"))
+
+
+class InferenceQueueFull(Exception):
+    """Raised by submit() when the pending queue is at capacity."""
+
+
+class InferenceBatcher:
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 max_queue=MAX_QUEUE):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "images": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "queue_wait_s": 0.0,
+            "inference_s": 0.0,
+            "max_queue_depth": 0,
+            "batch_sizes": {},
+        }
+
+    def submit(self, image_array: np.ndarray) -> Future:
+        """
+        Queue one preprocessed image shaped (1, 224, 224, 3).
+        The Future resolves to the ml_model.scan_batch() dict for it.
+        """
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((image_array, future, time.monotonic()))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            raise InferenceQueueFull("Disease inference queue is full.")
+
+        with self._stats_lock:
+            self._stats["submitted"] += 1
+            self._stats["max_queue_depth"] = max(
+                self._stats["max_queue_depth"], self._queue.qsize()
+            )
+        return future
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            s = dict(self._stats, batch_sizes=dict(self._stats["batch_sizes"]))
+        batches = s["batches"] or 1
+        images = s["images"] or 1
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": s["max_queue_depth"],
+            "submitted": s["submitted"],
+            "rejected": s["rejected"],
+            "images_processed": s["images"],
+            "batches_processed": s["batches"],
+            "failed_batches": s["failed_batches"],
+            "avg_batch_size": round(s["images"] / batches, 2),
+            "batch_size_histogram": s["batch_sizes"],
+            "avg_queue_wait_ms": round(s["queue_wait_s"] / images * 1000, 2),
+            "avg_inference_ms_per_batch": round(s["inference_s"] / batches * 1000, 2),
+            "throughput_images_per_s": (
+                round(s["images"] / s["inference_s"], 2) if s["inference_s"] else 0.0
+            ),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    # Worker
+
+    def _ensure_started(self):
+        # Started lazily so every (forked) gunicorn worker gets its own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="disease-inference", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0][2] + self.max_wait
+
+            # Wait for more images until the deadline; past it, still take
+            # whatever is already queued (a backlog should batch up, not
+            # drain one image at a time).
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        from .ml_model import scan_batch
+
+        started = time.monotonic()
+        try:
+            results = scan_batch(np.concatenate([item[0] for item in batch]))
+        except Exception as exc:
+            logger.exception("Disease inference batch of %d failed", len(batch))
+            with self._stats_lock:
+                self._stats["failed_batches"] += 1
+            for _, future, _ in batch:
+                future.set_exception(exc)
+            return
+
+        elapsed = time.monotonic() - started
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+        with self._stats_lock:
+            size = len(batch)
+            self._stats["images"] += size
+            self._stats["batches"] += 1
+            self._stats["inference_s"] += elapsed
+            self._stats["queue_wait_s"] += sum(started - item[2] for item in batch)
+            self._stats["batch_sizes"][size] = self._stats["batch_sizes"].get(size, 0) + 1
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> InferenceBatcher:
+    """Process-wide batcher (one inference thread per worker process)."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = InferenceBatcher()
+    return _batcher
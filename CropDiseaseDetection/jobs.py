@@ -0,0 +1,220 @@
+"""
+Background scan jobs.
+
+The async endpoint stores a ScanJob together with its upload, hands the job
+to this runner and returns immediately; a small thread pool then runs the
+same scan_service.run_scan() the synchronous endpoint uses and writes the
+outcome back onto the job, where it is picked up by polling or by the
+websocket in ws.py.
+
+Backpressure: at most SCAN_JOB_MAX_PENDING jobs may be queued or running
+per worker process; beyond that submit() raises ScanJobQueueFull and the
+endpoint answers 503 with Retry-After instead of buffering unbounded
+uploads.
+
+Recovery: the thread pool lives in the worker process, so a restart or
+redeploy drops whatever it held. While a job is queued or running here,
+its heartbeat_at is refreshed every SCAN_JOB_HEARTBEAT seconds. A queued /
+running job whose heartbeat is older than SCAN_JOB_STALE_AFTER lost its
+worker; recover_stale_jobs() reruns it from the stored upload (up to
+SCAN_JOB_MAX_ATTEMPTS runs in all) or marks it failed. It is called when a
+worker starts (gunicorn.conf.py, ASGI lifespan in krishiSathi/asgi.py) and
+when a job is polled, so a client never waits on a lost job forever.
+
+Quota: the endpoint charges one disease-detection use when it accepts a
+job. A job that fails on the server side (busy model, crash, lost worker
+out of attempts) is refunded, like a 503 from the synchronous endpoint.
+
+Tuning (env vars):
+    SCAN_JOB_WORKERS       threads running scans               (default 4)
+    SCAN_JOB_MAX_PENDING   queued + running jobs per worker     (default 32)
+    SCAN_JOB_HEARTBEAT     heartbeat interval, seconds          (default 10)
+    SCAN_JOB_STALE_AFTER   heartbeat age of a lost job, seconds (default 60)
+    SCAN_JOB_MAX_ATTEMPTS  runs per job, including reruns       (default 2)
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from payment.quota import refund_quota
+
+from .models import ScanJob
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("SCAN_JOB_WORKERS", "4"))
+MAX_PENDING = int(os.getenv("SCAN_JOB_MAX_PENDING", "32"))
+HEARTBEAT_INTERVAL = int(os.getenv("SCAN_JOB_HEARTBEAT", "10"))
+STALE_AFTER = int(os.getenv("SCAN_JOB_STALE_AFTER", "60"))
+MAX_ATTEMPTS = int(os.getenv("SCAN_JOB_MAX_ATTEMPTS", "2"))
+
+UNFINISHED = (ScanJob.STATUS_QUEUED, ScanJob.STATUS_RUNNING)
+
+
+class ScanJobQueueFull(Exception):
+    """Raised by submit() when this worker already has MAX_PENDING jobs."""
+
+
+class ScanJobRunner:
+    def __init__(self, workers: int = WORKERS, max_pending: int = MAX_PENDING,
+                 heartbeat_interval: int = HEARTBEAT_INTERVAL):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.heartbeat_interval = heartbeat_interval
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._heartbeat = None
+        self._lock = threading.Lock()
+        self._owned = set()             # ids of jobs queued / running here
+
+    def submit(self, job: ScanJob):
+        """Run `job` (a ScanJob whose upload is stored) in the background."""
+        if not self._slots.acquire(blocking=False):
+            raise ScanJobQueueFull("Too many scans in progress.")
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="scan-job"
+                )
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(
+                    target=self._beat, name="scan-job-heartbeat", daemon=True
+                )
+                self._heartbeat.start()
+            self._owned.add(job.pk)
+        try:
+            self._executor.submit(self._run, job.pk)
+        except Exception:
+            self._release(job.pk)
+            raise
+
+    def pending(self) -> int:
+        return len(self._owned)
+
+    def _release(self, job_id):
+        with self._lock:
+            self._owned.discard(job_id)
+        self._slots.release()
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                owned = list(self._owned)
+            if not owned:
+                continue
+            try:
+                ScanJob.objects.filter(pk__in=owned, status__in=UNFINISHED).update(
+                    heartbeat_at=timezone.now()
+                )
+            except Exception:
+                logger.exception("Scan job heartbeat failed")
+            finally:
+                close_old_connections()
+
+    def _run(self, job_id):
+        from .scan_service import run_scan
+
+        job = ScanJob(pk=job_id)
+        try:
+            ScanJob.objects.filter(pk=job_id).update(
+                status=ScanJob.STATUS_RUNNING, heartbeat_at=timezone.now()
+            )
+            job = ScanJob.objects.select_related("user").get(pk=job_id)
+            with job.upload.open("rb") as f:
+                image = ContentFile(f.read(), name=PurePosixPath(job.upload.name).name)
+            body, code, _ = run_scan(job.user, image)
+            _finish(
+                job,
+                status=ScanJob.STATUS_DONE if code < 500 else ScanJob.STATUS_FAILED,
+                result=body,
+                http_status=code,
+                scan_result_id=body.get("scanId"),
+            )
+        except Exception as exc:
+            logger.exception("Scan job %s failed", job_id)
+            _finish(
+                job,
+                status=ScanJob.STATUS_FAILED,
+                result={"error": f"Disease detection failed: {str(exc)}"},
+                http_status=500,
+            )
+        finally:
+            self._release(job_id)
+            close_old_connections()
+
+
+def _finish(job, **fields):
+    """
+    Store a job's outcome and drop its upload (run_scan kept its own copy).
+    A failed job gives back the quota use charged when it was submitted.
+    """
+    ScanJob.objects.filter(pk=job.pk).update(finished_at=timezone.now(), upload="", **fields)
+    if job.upload:
+        job.upload.storage.delete(job.upload.name)
+    if fields.get("status") == ScanJob.STATUS_FAILED and job.user_id:
+        refund_quota(job.user, "disease_detection")
+
+
+def is_stale(job: ScanJob) -> bool:
+    """Unfinished, and its worker stopped heartbeating."""
+    if job.status not in UNFINISHED:
+        return False
+    last_seen = job.heartbeat_at or job.created_at
+    return last_seen < timezone.now() - timedelta(seconds=STALE_AFTER)
+
+
+def recover_stale_jobs(job_ids=None) -> dict:
+    """
+    Rerun (on this worker) or fail the unfinished jobs whose worker is
+    gone; `job_ids` limits the sweep. Each stale job is claimed with a
+    conditional update, so concurrent sweeps never rerun it twice.
+    """
+    cutoff = timezone.now() - timedelta(seconds=STALE_AFTER)
+    stale = ScanJob.objects.filter(status__in=UNFINISHED).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, created_at__lt=cutoff)
+    )
+    if job_ids is not None:
+        stale = stale.filter(pk__in=job_ids)
+
+    result = {"requeued": 0, "failed": 0}
+    for job in stale:
+        claim = ScanJob.objects.filter(pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at)
+
+        if job.upload and job.attempts + 1 < MAX_ATTEMPTS:
+            if not claim.update(
+                status=ScanJob.STATUS_QUEUED, heartbeat_at=timezone.now(), attempts=F("attempts") + 1
+            ):
+                continue
+            try:
+                job_runner.submit(job)
+            except ScanJobQueueFull:
+                # Busy here; leave it stale for the next sweep
+                ScanJob.objects.filter(pk=job.pk).update(heartbeat_at=None, attempts=job.attempts)
+                continue
+            logger.warning("Requeued scan job %s after its worker was lost", job.pk)
+            result["requeued"] += 1
+        else:
+            if not claim.update(heartbeat_at=timezone.now()):
+                continue
+            _finish(
+                job,
+                status=ScanJob.STATUS_FAILED,
+                result={"error": "The scan was interrupted. Please upload the image again."},
+                http_status=500,
+            )
+            result["failed"] += 1
+    return result
+
+
+job_runner = ScanJobRunner()
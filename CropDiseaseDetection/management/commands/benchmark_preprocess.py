@@ -0,0 +1,91 @@
+"""
+Measure per-scan preprocessing CPU time, old pipeline vs new.
+
+"legacy" reproduces what a scan used to cost: two full decodes and two
+LANCZOS resizes (one for the plant gate, one for the disease model).
+"current" is the single draft-decode + BILINEAR pass used now. Also
+reports the largest pixel difference between the two outputs so resize
+drift can be checked against the models' tolerance.
+
+    python manage.py benchmark_preprocess leaf1.jpg leaf2.png
+    python manage.py benchmark_preprocess --repeat 50      # synthetic 12 MP JPEG
+"""
+
+import io
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from CropDiseaseDetection.preprocessing import (
+    legacy_preprocess_image,
+    preprocess_image,
+)
+
+
+def _synthetic_jpeg(width=4000, height=3000) -> bytes:
+    from PIL import Image as PILImage
+
+    rng = np.random.default_rng(0)
+    # Smooth gradient + noise so the JPEG is not trivially compressible
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    noise = rng.integers(0, 32, size=base.shape)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+
+    buf = io.BytesIO()
+    PILImage.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Benchmark disease-scan image preprocessing (legacy vs current)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", nargs="*", help="Image files to benchmark.")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        if repeat < 1:
+            raise CommandError("--repeat must be at least 1.")
+
+        samples = []
+        for path in options["images"]:
+            try:
+                with open(path, "rb") as f:
+                    samples.append((path, f.read()))
+            except OSError as exc:
+                raise CommandError(f"Cannot read {path}: {exc}")
+        if not samples:
+            samples.append(("synthetic 4000x3000 JPEG", _synthetic_jpeg()))
+
+        for label, data in samples:
+            legacy_s = self._time(
+                lambda: [legacy_preprocess_image(io.BytesIO(data)) for _ in range(2)],
+                repeat,
+            )
+            current_s = self._time(lambda: preprocess_image(io.BytesIO(data)), repeat)
+
+            drift = float(
+                np.abs(
+                    legacy_preprocess_image(io.BytesIO(data))
+                    - preprocess_image(io.BytesIO(data))
+                ).max()
+            )
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label}"))
+            self.stdout.write(f"legacy  (2 decodes): {legacy_s * 1000:8.2f} ms/scan")
+            self.stdout.write(f"current (1 decode):  {current_s * 1000:8.2f} ms/scan")
+            self.stdout.write(
+                f"saved: {(legacy_s - current_s) * 1000:.2f} ms/scan "
+                f"({legacy_s / current_s:.1f}x), max pixel drift {drift:.4f}"
+            )
+
+    def _time(self, fn, repeat: int) -> float:
+        fn()  # warm-up
+        started = time.process_time()
+        for _ in range(repeat):
+            fn()
+        return (time.process_time() - started) / repeat
@@ -0,0 +1,121 @@
+"""
+Accuracy / latency comparison of the disease-scan backends.
+
+    python manage.py compare_inference_backends ./leaf_samples
+    python manage.py compare_inference_backends ./leaf_samples --backends keras tflite
+
+Every backend scans the same preprocessed images; the first backend
+listed is the reference. Each backend runs in its own forked child process
+(the parent never loads a model), so its peak RSS is its own and not
+inherited from the backend measured before it. Reported per backend:
+    * ms per image (batched, warm), and peak RSS of its process with the
+      growth over the process's RSS before loading the models
+    * agreement with the reference on the plant gate and on the top-1 class
+    * max |plant probability| difference
+    * top-1 accuracy when images sit in folders named after their class
+      (PlantVillage layout, e.g. Tomato___Early_blight/img001.jpg)
+"""
+
+import multiprocessing
+import resource
+import time
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from CropDiseaseDetection import ml_model
+from CropDiseaseDetection.management.commands.export_tflite_models import (
+    iter_image_paths,
+)
+from CropDiseaseDetection.preprocessing import preprocess_image
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_backend(backend, batch, batch_size):
+    """Scan `batch` with one backend (in a fresh child process)."""
+    baseline_mb = _peak_rss_mb()
+    ml_model.scan_batch(batch[:1], backend)  # load + warm up
+
+    started = time.perf_counter()
+    results = []
+    for start in range(0, len(batch), batch_size):
+        results.extend(ml_model.scan_batch(batch[start:start + batch_size], backend))
+    ms_per_image = (time.perf_counter() - started) * 1000 / len(batch)
+    return results, ms_per_image, _peak_rss_mb(), baseline_mb
+
+
+class Command(BaseCommand):
+    help = "Compare disease-scan backends on a local image set."
+
+    def add_arguments(self, parser):
+        parser.add_argument("images", help="Directory of test images.")
+        parser.add_argument(
+            "--backends",
+            nargs="+",
+            default=["keras", "tflite"],
+            choices=[b for b in ml_model.BACKENDS if b != "auto"],
+        )
+        parser.add_argument("--batch-size", type=int, default=8)
+
+    def handle(self, *args, **options):
+        paths = iter_image_paths(Path(options["images"]))
+        if not paths:
+            raise CommandError(f"No images found under {options['images']}.")
+
+        class_names = set(ml_model._load_class_names())
+        labels = [p.parent.name if p.parent.name in class_names else None for p in paths]
+        batch = np.concatenate([preprocess_image(str(p)) for p in paths])
+        self.stdout.write(f"{len(paths)} images, {sum(l is not None for l in labels)} labelled")
+
+        # fork: children inherit the preprocessed batch and Django setup
+        context = multiprocessing.get_context("fork")
+        reference = None
+        for backend in options["backends"]:
+            with context.Pool(1) as pool:
+                results, ms_per_image, rss_mb, baseline_mb = pool.apply(
+                    _run_backend, (backend, batch, options["batch_size"])
+                )
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {backend}"))
+            self.stdout.write(
+                f"latency: {ms_per_image:.1f} ms/image   "
+                f"peak RSS: {rss_mb:.0f} MB (+{rss_mb - baseline_mb:.0f} MB for the models)"
+            )
+
+            accuracy = self._accuracy(results, labels)
+            if accuracy is not None:
+                self.stdout.write(f"top-1 accuracy: {accuracy:.1%}")
+
+            if reference is None:
+                reference = results
+                continue
+            self._compare(reference, results)
+
+    def _accuracy(self, results, labels):
+        scored = [
+            (r["prediction"] or {}).get("raw_label") == label
+            for r, label in zip(results, labels)
+            if label is not None
+        ]
+        return sum(scored) / len(scored) if scored else None
+
+    def _compare(self, reference, results):
+        gate = np.mean([a["is_plant"] == b["is_plant"] for a, b in zip(reference, results)])
+        both = [
+            (a["prediction"]["raw_label"], b["prediction"]["raw_label"])
+            for a, b in zip(reference, results)
+            if a["prediction"] and b["prediction"]
+        ]
+        top1 = np.mean([a == b for a, b in both]) if both else float("nan")
+        plant_diff = max(
+            abs(a["plant_confidence"] - b["plant_confidence"])
+            for a, b in zip(reference, results)
+        )
+        self.stdout.write(
+            f"vs reference: gate agreement {gate:.1%}, top-1 agreement {top1:.1%}, "
+            f"max plant confidence diff {plant_diff:.2f} pts"
+        )
@@ -0,0 +1,80 @@
+"""
+Export the plant gate and disease model as one fused SavedModel.
+
+    python manage.py export_scan_model
+    python manage.py export_scan_model --output /models/fused_scan
+
+Loads both models the usual way (Keras 3 + tf_keras), traces them into a
+single early-exit graph (see CropDiseaseDetection.fused_model), saves it,
+then reloads the SavedModel and checks its outputs match the separate
+models on a random batch. Once FUSED_MODEL_PATH points at the export,
+ml_model.scan_batch() serves from it.
+"""
+
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from CropDiseaseDetection import ml_model
+from CropDiseaseDetection.preprocessing import IMG_SIZE
+
+
+class Command(BaseCommand):
+    help = "Export plant gate + disease model into one early-exit SavedModel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=str(ml_model.FUSED_MODEL_PATH),
+            help="Directory to write the SavedModel to.",
+        )
+        parser.add_argument(
+            "--check-batch",
+            type=int,
+            default=8,
+            help="Random images used to verify the export (0 to skip).",
+        )
+
+    def handle(self, *args, **options):
+        import tensorflow as tf
+
+        from CropDiseaseDetection.fused_model import export_fused_model
+
+        output = Path(options["output"])
+        plant = ml_model.get_plant_detector()
+        disease = ml_model.get_disease_model()
+
+        self.stdout.write(f"Exporting fused scan model to {output} ...")
+        export_fused_model(plant, disease, output, ml_model.PLANT_THRESHOLD)
+
+        n = options["check_batch"]
+        if n <= 0:
+            self.stdout.write(self.style.SUCCESS("Export done (not verified)."))
+            return
+
+        batch = np.random.default_rng(0).random(
+            (n, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32
+        )
+        fused = tf.saved_model.load(str(output)).scan(tf.constant(batch))
+
+        plant_ref = np.asarray(plant.predict_on_batch(batch))[:, 0]
+        disease_ref = np.asarray(disease.predict_on_batch(batch))
+        plant_out = fused["plant_prob"].numpy()
+        disease_out = fused["disease_probs"].numpy()
+
+        accepted = plant_ref > ml_model.PLANT_THRESHOLD
+        plant_err = float(np.abs(plant_out - plant_ref).max())
+        disease_err = (
+            float(np.abs(disease_out[accepted] - disease_ref[accepted]).max())
+            if accepted.any()
+            else 0.0
+        )
+        self.stdout.write(
+            f"max |diff| plant={plant_err:.2e} disease={disease_err:.2e} "
+            f"({int(accepted.sum())}/{n} images passed the gate)"
+        )
+        if plant_err > 1e-4 or disease_err > 1e-4:
+            raise CommandError("Fused model output differs from the source models.")
+
+        self.stdout.write(self.style.SUCCESS("Export verified."))
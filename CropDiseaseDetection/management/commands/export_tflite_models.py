@@ -0,0 +1,100 @@
+"""
+Convert the plant detector and disease model to quantised TFLite.
+
+    python manage.py export_tflite_models                          # float16
+    python manage.py export_tflite_models --quantize dynamic
+    python manage.py export_tflite_models --quantize int8 --images ./leaf_samples
+
+Quantisation modes:
+    float16  weights stored as float16, ~2x smaller, near-identical output
+    dynamic  int8 weights, float activations, ~4x smaller
+    int8     full integer model calibrated on --images (representative
+             leaf and non-leaf photos, ~100-300 is plenty); smallest and
+             fastest on CPU, check accuracy with compare_inference_backends
+
+Artefacts go to PLANT_TFLITE_PATH / DISEASE_TFLITE_PATH; serve them with
+INFERENCE_BACKEND=tflite. ONNX is not exported: onnxruntime / tf2onnx are
+not part of the deployment, and TFLite covers the CPU-only target.
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from CropDiseaseDetection import ml_model
+from CropDiseaseDetection.preprocessing import preprocess_image
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def iter_image_paths(root: Path):
+    """Image files under `root`, recursively, in a stable order."""
+    return sorted(
+        p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+
+class Command(BaseCommand):
+    help = "Export the disease-scan models to quantised TFLite."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--quantize",
+            choices=["float16", "dynamic", "int8"],
+            default="float16",
+        )
+        parser.add_argument(
+            "--images",
+            help="Directory of calibration images (required for int8).",
+        )
+        parser.add_argument(
+            "--max-calibration-images",
+            type=int,
+            default=300,
+        )
+
+    def handle(self, *args, **options):
+        import tensorflow as tf
+
+        mode = options["quantize"]
+        calibration = []
+        if mode == "int8":
+            if not options["images"]:
+                raise CommandError("--quantize int8 needs --images for calibration.")
+            paths = iter_image_paths(Path(options["images"]))
+            paths = paths[: options["max_calibration_images"]]
+            if not paths:
+                raise CommandError(f"No images found under {options['images']}.")
+            calibration = [preprocess_image(str(p)) for p in paths]
+            self.stdout.write(f"Calibrating on {len(calibration)} images")
+
+        targets = [
+            ("plant detector", ml_model.get_plant_detector(), ml_model.PLANT_TFLITE_PATH),
+            ("disease model", ml_model.get_disease_model(), ml_model.DISEASE_TFLITE_PATH),
+        ]
+        for label, model, path in targets:
+            converter = tf.lite.TFLiteConverter.from_keras_model(model)
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            if mode == "float16":
+                converter.target_spec.supported_types = [tf.float16]
+            elif mode == "int8":
+                converter.representative_dataset = lambda: ([arr] for arr in calibration)
+                converter.target_spec.supported_ops = [
+                    tf.lite.OpsSet.TFLITE_BUILTINS_INT8
+                ]
+                converter.inference_input_type = tf.int8
+                converter.inference_output_type = tf.int8
+
+            try:
+                flatbuffer = converter.convert()
+            except Exception as exc:
+                raise CommandError(f"Converting the {label} failed: {exc}")
+
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(flatbuffer)
+            self.stdout.write(
+                f"{label}: {path} ({len(flatbuffer) / 1e6:.1f} MB, {mode})"
+            )
+
+        self.stdout.write(self.style.SUCCESS("TFLite export done."))
@@ -0,0 +1,48 @@
+"""
+Re-encode stored scan images and write their thumbnails.
+
+New scans are optimised automatically after upload; this backfills rows
+stored before that (or whose background job failed). It goes through
+optimise_scan_image(), which repoints each row with a conditional update,
+so it is safe to run next to the background workers:
+
+    python manage.py optimise_scan_images
+    python manage.py optimise_scan_images --limit 500
+"""
+
+from django.core.management.base import BaseCommand
+
+from CropDiseaseDetection.image_storage import optimise_scan_image
+from CropDiseaseDetection.models import ScanResult
+
+
+class Command(BaseCommand):
+    help = "Re-encode scan images to capped WebP and generate thumbnails."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, help="Process at most this many scans.")
+
+    def handle(self, *args, **options):
+        ids = self._pending_ids(options["limit"])
+
+        done = failed = 0
+        for scan_id in ids:
+            try:
+                if optimise_scan_image(scan_id):
+                    done += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"scan {scan_id}: {exc}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Optimised {done} images ({failed} failed).")
+        )
+
+    def _pending_ids(self, limit):
+        ids = (
+            ScanResult.objects.filter(thumbnail="")
+            .exclude(image="")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        return list(ids[:limit] if limit else ids)
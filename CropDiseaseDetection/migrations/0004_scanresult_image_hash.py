@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CropDiseaseDetection', '0003_scanresult_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanresult',
+            name='image_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CropDiseaseDetection', '0005_scanjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanresult',
+            name='thumbnail',
+            field=models.ImageField(blank=True, default='', upload_to='scans/thumbs/'),
+        ),
+    ]
@@ -1,12 +1,38 @@
+"""
+Model loading and inference for disease scans.
+
+TensorFlow (and tf_keras for the legacy .h5 model) are imported only when
+a model is first loaded, so importing this module — or any view or URLconf
+that uses it — stays cheap for workers that never serve a scan.
+
+Lifecycle:
+    cold     nothing loaded; the first scan loads models on demand
+    warming  warm_up() is loading models / running the dummy batch
+    ready    models loaded and compiled; scans run at full speed
+    failed   warm_up() raised; see model_status()["error"]
+    misconfigured  INFERENCE_BACKEND is not one of BACKENDS (also reported
+             by `manage.py check`, see checks.py)
+
+Backends (INFERENCE_BACKEND env var):
+    auto     fused SavedModel if exported, else keras (default)
+    keras    plant_detector.keras + final_disease_model.h5
+    fused    one early-exit SavedModel (manage.py export_scan_model)
+    tflite   quantised .tflite models (manage.py export_tflite_models)
+
+warm_up() is called at worker start by gunicorn.conf.py when
+DISEASE_MODEL_WARMUP is set, and model_status() backs the readiness
+endpoint used by the load balancer.
+"""
+
 import os
 import json
+import logging
+import threading
+import time
 import numpy as np
 from pathlib import Path
-import tensorflow as tf
 
-# tf_keras is needed only for the .h5 model
-import tf_keras  # noqa: F401  (registers legacy ops)
-from tf_keras.models import load_model as legacy_load_model
+from .preprocessing import IMG_SIZE, preprocess_image  # noqa: F401
 
 # Paths  (override via env vars for Docker / production)
 _BASE = Path(__file__).resolve().parent
@@ -20,12 +46,43 @@ DISEASE_MODEL_PATH = Path(
 CLASS_NAMES_PATH = Path(
     os.getenv("CLASS_NAMES_PATH", _BASE / "weights" / "class_names.json")
 )
+# Single SavedModel holding both models (built by `manage.py export_scan_model`).
+# When present, scans run through it and tf_keras is never imported.
+FUSED_MODEL_PATH = Path(
+    os.getenv("FUSED_MODEL_PATH", _BASE / "weights" / "fused_scan")
+)
+
+PLANT_TFLITE_PATH = Path(
+    os.getenv("PLANT_TFLITE_PATH", _BASE / "weights" / "plant_detector.tflite")
+)
+DISEASE_TFLITE_PATH = Path(
+    os.getenv("DISEASE_TFLITE_PATH", _BASE / "weights" / "disease_model.tflite")
+)
+
+BACKENDS = ("auto", "keras", "fused", "tflite")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "auto").lower()
+
+PLANT_THRESHOLD = 0.5
+
+# Alternatives returned with every prediction, and the softmax temperature
+# used to calibrate them (T > 1 softens an over-confident model; fit T on a
+# held-out set — 1.0 leaves the model's probabilities unchanged)
+PREDICTION_TOP_K = int(os.getenv("PREDICTION_TOP_K", "3"))
+CALIBRATION_TEMPERATURE = float(os.getenv("CALIBRATION_TEMPERATURE", "1.0"))
+
+logger = logging.getLogger(__name__)
 
 # Singleton state
 _plant_detector = None
 _disease_model = None
+_fused_model = None
+_tflite_models = None
 _class_names = None
 
+# Serialises model loading between the warm-up thread and the first scans
+_load_lock = threading.RLock()
+_status = {"state": "cold", "error": None, "warmed_at": None, "warmup_seconds": None}
+
 
 def _load_class_names():
     global _class_names
@@ -39,7 +96,11 @@ def get_plant_detector():
     """Return the plant-vs-non-plant binary model (loaded once)."""
     global _plant_detector
     if _plant_detector is None:
-        _plant_detector = tf.keras.models.load_model(str(PLANT_DETECTOR_PATH))
+        with _load_lock:
+            if _plant_detector is None:
+                import tensorflow as tf
+
+                _plant_detector = tf.keras.models.load_model(str(PLANT_DETECTOR_PATH))
     return _plant_detector
 
 
@@ -47,67 +108,284 @@ def get_disease_model():
     """Return the 38-class disease model (loaded once, via legacy tf_keras)."""
     global _disease_model
     if _disease_model is None:
-        _disease_model = legacy_load_model(str(DISEASE_MODEL_PATH))
+        with _load_lock:
+            if _disease_model is None:
+                # tf_keras is needed only for the .h5 model
+                from tf_keras.models import load_model as legacy_load_model
+
+                _disease_model = legacy_load_model(str(DISEASE_MODEL_PATH))
     return _disease_model
 
 
-# Image pre-processing
-IMG_SIZE = (224, 224)
+def get_fused_model():
+    """
+    Return the fused scan SavedModel (loaded once), or None when it has
+    not been exported — callers then fall back to the two separate models.
+    """
+    global _fused_model
+    if _fused_model is None and (FUSED_MODEL_PATH / "saved_model.pb").exists():
+        with _load_lock:
+            if _fused_model is None:
+                import tensorflow as tf
+
+                _fused_model = tf.saved_model.load(str(FUSED_MODEL_PATH))
+    return _fused_model
+
+
+def get_tflite_models():
+    """Return (plant_detector, disease_model) as TFLiteModel (loaded once)."""
+    global _tflite_models
+    if _tflite_models is None:
+        with _load_lock:
+            if _tflite_models is None:
+                from .tflite_backend import TFLiteModel
+
+                _tflite_models = (
+                    TFLiteModel(PLANT_TFLITE_PATH),
+                    TFLiteModel(DISEASE_TFLITE_PATH),
+                )
+    return _tflite_models
+
+
+def get_backend(backend: str = None) -> str:
+    """Resolve `backend` (default INFERENCE_BACKEND) to keras / fused / tflite."""
+    backend = (backend or INFERENCE_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; use one of {BACKENDS}.")
+    if backend == "auto":
+        return "fused" if (FUSED_MODEL_PATH / "saved_model.pb").exists() else "keras"
+    return backend
 
 
-def preprocess_image(image_file) -> np.ndarray:
+def _gate_and_classifier(backend: str):
+    """(plant_detector, disease_model) for the two-model backends."""
+    if backend == "tflite":
+        return get_tflite_models()
+    return get_plant_detector(), get_disease_model()
+
+
+def warm_up(batch_size: int = 1):
     """
-    Accept a Django InMemoryUploadedFile / TemporaryUploadedFile and
-    return a float32 numpy array shaped (1, 224, 224, 3) with values in [0, 1].
+    Load every model this worker serves with and run one dummy batch
+    through scan_batch(), so graph tracing and kernel selection happen
+    before the first real scan. Safe to call more than once.
     """
-    from PIL import Image as PILImage
+    if _status["state"] == "ready":
+        return
+
+    _status.update(state="warming", error=None)
+    started = time.monotonic()
+    try:
+        _load_class_names()
+        backend = get_backend()
+        # Run the gate and (forced) classifier once each so both are traced
+        dummy = np.zeros((batch_size, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+        scan_batch(dummy, backend)
+        if backend != "fused":
+            _gate_and_classifier(backend)[1].predict_on_batch(dummy)
+    except Exception as exc:
+        logger.exception("Disease model warm-up failed")
+        _status.update(state="failed", error=str(exc))
+        raise
+
+    elapsed = time.monotonic() - started
+    _status.update(
+        state="ready", warmed_at=time.time(), warmup_seconds=round(elapsed, 2)
+    )
+    logger.info("Disease models warm in %.1fs (pid %s)", elapsed, os.getpid())
+
+
+def model_status() -> dict:
+    """Lifecycle state of this worker's models (see module docstring)."""
+    status = dict(_status)
+    try:
+        backend = get_backend()
+    except ValueError as exc:
+        backend = None
+        status.update(state="misconfigured", error=str(exc))
+    return {
+        **status,
+        "backend": backend,
+        "loaded": {
+            "plant_detector": _plant_detector is not None,
+            "disease_model": _disease_model is not None,
+            "fused_model": _fused_model is not None,
+            "tflite_models": _tflite_models is not None,
+        },
+        "pid": os.getpid(),
+    }
 
-    img = PILImage.open(image_file).convert("RGB")
-    img = img.resize(IMG_SIZE, PILImage.LANCZOS)
-    arr = np.array(img, dtype=np.float32) / 255.0
-    return np.expand_dims(arr, axis=0)  # (1, 224, 224, 3)
+
+def is_ready() -> bool:
+    return _status["state"] == "ready" and INFERENCE_BACKEND in BACKENDS
+
+
+# Image pre-processing lives in .preprocessing (decode once, reuse the
+# array for both models); preprocess_image is re-exported from here.
+
+def _as_input(image) -> np.ndarray:
+    """Accept an upload or an already-preprocessed (1, 224, 224, 3) array."""
+    if isinstance(image, np.ndarray):
+        return image
+    return preprocess_image(image)
 
 
 # Prediction helpers
 
-def is_plant(image_file) -> tuple[bool, float]:
+def _two_model_backend() -> str:
+    # Single-model helpers use the separate networks even when scans are fused
+    return "tflite" if get_backend() == "tflite" else "keras"
+
+
+def is_plant(image) -> tuple[bool, float]:
     """
     Returns (is_plant: bool, confidence: float 0-100).
     Threshold: sigmoid output > 0.5 → plant.
+    `image` is an upload or the array from preprocess_image().
     """
-    model = get_plant_detector()
-    arr = preprocess_image(image_file)
-    prob = float(model.predict(arr, verbose=0)[0][0])  # sigmoid scalar
-    return prob > 0.5, round(prob * 100, 2)
+    model = _gate_and_classifier(_two_model_backend())[0]
+    arr = _as_input(image)
+    prob = float(model.predict_on_batch(arr)[0][0])  # sigmoid scalar
+    return prob > PLANT_THRESHOLD, round(prob * 100, 2)
 
 
-def predict_disease(image_file) -> dict:
+def predict_disease(image) -> dict:
     """
     Returns a dict with keys:
         crop_type   str   e.g. "Tomato"
         disease     str   e.g. "Early_blight"  (or "healthy")
-        confidence  float 0-100
+        confidence  float 0-100 (temperature-calibrated)
         is_healthy  bool
         raw_label   str   e.g. "Tomato___Early_blight"
+        top_k       list  best PREDICTION_TOP_K classes, each
+                          {raw_label, crop_type, disease, confidence}
+        entropy     float 0-1, normalised; high = ambiguous image
+    Pass the array already built for is_plant() to skip a second decode.
     """
-    model = get_disease_model()
-    class_names = _load_class_names()
+    model = _gate_and_classifier(_two_model_backend())[1]
+
+    arr = _as_input(image)
+    probs = np.asarray(model.predict_on_batch(arr))   # (1, 38)
+    return decode_predictions(probs)[0]
 
-    arr = preprocess_image(image_file)
-    probs = model.predict(arr, verbose=0)[0]          # (38,)
-    idx = int(np.argmax(probs))
-    confidence = round(float(probs[idx]) * 100, 2)
 
-    raw_label = class_names[idx]                      # e.g. "Tomato___Early_blight"
-    parts = raw_label.split("___")
+def calibrate(probs: np.ndarray, temperature: float = None) -> np.ndarray:
+    """
+    Temperature-scale softmax outputs row-wise: softmax(log(p) / T).
+    The model only exposes probabilities, and log(p) equals the logits up
+    to a per-row constant, which softmax ignores.
+    """
+    temperature = CALIBRATION_TEMPERATURE if temperature is None else temperature
+    probs = np.asarray(probs, dtype=np.float64)
+    if temperature == 1.0:
+        return probs / probs.sum(axis=1, keepdims=True)
+    logits = np.log(np.clip(probs, 1e-12, None)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    scaled = np.exp(logits)
+    return scaled / scaled.sum(axis=1, keepdims=True)
+
+
+def _split_label(raw_label: str) -> tuple[str, str]:
+    parts = raw_label.split("___")                    # e.g. "Tomato___Early_blight"
     crop_type = parts[0].replace("_", " ")            # "Tomato"
     disease = parts[1].replace("_", " ") if len(parts) > 1 else "Unknown"
-    is_healthy = "healthy" in disease.lower()
+    return crop_type, disease
 
-    return {
-        "crop_type": crop_type,
-        "disease": disease,
-        "confidence": confidence,
-        "is_healthy": is_healthy,
-        "raw_label": raw_label,
-    }
\ No newline at end of file
+
+def decode_predictions(probs: np.ndarray, top_k: int = None) -> list[dict]:
+    """
+    Vectorised predict_disease() decoding for a (N, C) block of class
+    probabilities: calibration, top-k and entropy for all rows at once.
+    """
+    class_names = _load_class_names()
+    top_k = min(top_k or PREDICTION_TOP_K, len(class_names))
+
+    calibrated = calibrate(probs)
+    n_classes = calibrated.shape[1]
+
+    # Top-k per row without a full sort
+    top_idx = np.argpartition(-calibrated, top_k - 1, axis=1)[:, :top_k]
+    top_p = np.take_along_axis(calibrated, top_idx, axis=1)
+    order = np.argsort(-top_p, axis=1)
+    top_idx = np.take_along_axis(top_idx, order, axis=1)
+    top_p = np.take_along_axis(top_p, order, axis=1)
+
+    entropy = -(calibrated * np.log(np.clip(calibrated, 1e-12, None))).sum(axis=1)
+    entropy /= np.log(n_classes)
+
+    decoded = []
+    for row_idx, row_p, row_entropy in zip(top_idx, top_p, entropy):
+        candidates = []
+        for idx, p in zip(row_idx.tolist(), row_p.tolist()):
+            crop_type, disease = _split_label(class_names[idx])
+            candidates.append(
+                {
+                    "raw_label": class_names[idx],
+                    "crop_type": crop_type,
+                    "disease": disease,
+                    "confidence": round(p * 100, 2),
+                }
+            )
+        best = candidates[0]
+        decoded.append(
+            {
+                "crop_type": best["crop_type"],
+                "disease": best["disease"],
+                "confidence": best["confidence"],
+                "is_healthy": "healthy" in best["disease"].lower(),
+                "raw_label": best["raw_label"],
+                "top_k": candidates,
+                "entropy": round(float(row_entropy), 4),
+            }
+        )
+    return decoded
+
+
+def scan_batch(batch: np.ndarray, backend: str = None) -> list[dict]:
+    """
+    Run the plant gate and the disease model on a preprocessed batch
+    shaped (N, 224, 224, 3) — one forward pass per model for all N images.
+
+    The disease model only sees the images the gate accepted. Returns one
+    dict per image:
+        is_plant          bool
+        plant_confidence  float 0-100
+        prediction        predict_disease() dict, or None if not a plant
+    `backend` overrides INFERENCE_BACKEND (used by compare_inference_backends).
+    """
+    backend = get_backend(backend)
+    if backend == "fused":
+        import tensorflow as tf
+
+        fused = get_fused_model()
+        if fused is None:
+            raise RuntimeError(f"No fused scan model exported at {FUSED_MODEL_PATH}.")
+        out = fused.scan(tf.constant(batch, dtype=tf.float32))
+        plant_probs = out["plant_prob"].numpy()
+        accepted = np.flatnonzero(plant_probs > PLANT_THRESHOLD)
+        all_probs = out["disease_probs"].numpy()
+        disease_probs = {i: all_probs[i] for i in accepted.tolist()}
+    else:
+        plant_detector, disease_model = _gate_and_classifier(backend)
+        plant_probs = np.asarray(plant_detector.predict_on_batch(batch))[:, 0]
+        accepted = np.flatnonzero(plant_probs > PLANT_THRESHOLD)
+
+        disease_probs = {}
+        if accepted.size:
+            probs = np.asarray(disease_model.predict_on_batch(batch[accepted]))
+            disease_probs = dict(zip(accepted.tolist(), probs))
+
+    predictions = {}
+    if disease_probs:
+        rows = list(disease_probs)
+        decoded = decode_predictions(np.stack([disease_probs[i] for i in rows]))
+        predictions = dict(zip(rows, decoded))
+
+    return [
+        {
+            "is_plant": i in predictions,
+            "plant_confidence": round(float(p) * 100, 2),
+            "prediction": predictions.get(i),
+        }
+        for i, p in enumerate(plant_probs)
+    ]
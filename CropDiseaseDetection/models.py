@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 
@@ -10,6 +12,11 @@ class ScanResult(models.Model):
         related_name="scan_results",
     )
     image = models.ImageField(upload_to="scans/")
+    # Small preview written by image_storage after upload (empty until then)
+    thumbnail = models.ImageField(upload_to="scans/thumbs/", blank=True, default="")
+    # sha256 of the uploaded bytes (recorded only; repeats are matched by
+    # the in-process scan_cache, never by querying this column)
+    image_hash = models.CharField(max_length=64, blank=True, default="")
     crop_type = models.CharField(max_length=100)
     disease = models.CharField(max_length=100)
     confidence = models.FloatField()
@@ -21,4 +28,47 @@ class ScanResult(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.crop_type} — {self.disease} ({self.severity})"
\ No newline at end of file
+        return f"{self.crop_type} — {self.disease} ({self.severity})"
+
+class ScanJob(models.Model):
+    """An asynchronously processed scan (see jobs.py)."""
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="scan_jobs",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # The upload, kept until the job finishes so another worker can rerun it
+    upload = models.FileField(upload_to="scans/jobs/", blank=True, default="")
+    # Touched by the owning worker while the job is queued / running; a
+    # stale heartbeat means that worker died (see jobs.recover_stale_jobs)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Body and HTTP status the synchronous endpoint would have returned
+    result = models.JSONField(null=True, blank=True)
+    http_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    scan_result = models.ForeignKey(
+        ScanResult, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def __str__(self):
+        return f"ScanJob {self.id} ({self.status})"
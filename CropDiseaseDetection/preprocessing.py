@@ -0,0 +1,78 @@
+"""
+Image preprocessing shared by the plant detector and the disease model.
+
+Both models take the same (1, 224, 224, 3) float32 input in [0, 1], so an
+upload is decoded and resized exactly once per scan and the resulting
+array is handed to both. The pipeline is tuned for phone photos, which
+are usually multi-megapixel JPEGs:
+
+    * Image.draft() lets libjpeg decode at 1/2, 1/4 or 1/8 scale directly,
+      so a 4000x3000 photo is never fully materialised;
+    * the remaining downscale uses BILINEAR with reducing_gap, which is
+      several times cheaper than LANCZOS at this output size;
+    * the uint8 pixels are scaled straight into a preallocated float32
+      array, with no float64 or extra float32 temporaries.
+
+This module only needs PIL and numpy, so it can be used (and
+benchmarked) without loading TensorFlow.
+"""
+
+import numpy as np
+
+IMG_SIZE = (224, 224)
+
+# Resize in two steps (integer reduce, then filter) once the source is at
+# least this many times larger than the target
+RESIZE_REDUCING_GAP = 2.0
+
+_SCALE = np.float32(1.0 / 255.0)
+
+
+def decode_image(image_file):
+    """
+    Decode an upload into an RGB PIL image, letting JPEGs decode directly
+    at the smallest power-of-two scale that is still >= IMG_SIZE.
+    """
+    from PIL import Image as PILImage
+
+    img = PILImage.open(image_file)
+    if img.format == "JPEG":
+        img.draft("RGB", IMG_SIZE)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def image_to_array(img) -> np.ndarray:
+    """Resize an RGB PIL image and return a (1, 224, 224, 3) float32 array."""
+    from PIL import Image as PILImage
+
+    if img.size != IMG_SIZE:
+        img = img.resize(
+            IMG_SIZE, PILImage.BILINEAR, reducing_gap=RESIZE_REDUCING_GAP
+        )
+
+    out = np.empty((1, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+    np.multiply(np.asarray(img, dtype=np.uint8), _SCALE, out=out[0])
+    return out
+
+
+def preprocess_image(image_file) -> np.ndarray:
+    """
+    Accept a Django InMemoryUploadedFile / TemporaryUploadedFile and
+    return a float32 numpy array shaped (1, 224, 224, 3) with values in [0, 1].
+    """
+    return image_to_array(decode_image(image_file))
+
+
+def legacy_preprocess_image(image_file) -> np.ndarray:
+    """
+    The original full-decode + LANCZOS pipeline, kept for the
+    benchmark_preprocess command to compare speed and output drift against.
+    """
+    from PIL import Image as PILImage
+
+    img = PILImage.open(image_file).convert("RGB")
+    img = img.resize(IMG_SIZE, PILImage.LANCZOS)
+    arr = np.array(img, dtype=np.float32) / 255.0
+    return np.expand_dims(arr, axis=0)
@@ -0,0 +1,81 @@
+"""
+Content-hash cache for disease scans.
+
+Farmers often re-upload the same photo. Uploads are keyed by the sha256
+of their bytes: a repeat within this worker returns the cached scan
+without touching the models. Only the prediction is shared: every
+ScanResult still stores its own upload, so one user's scan never points
+at another user's file, and re-encoding one row's file (image_storage)
+cannot affect another row.
+
+Hashing is exact, not perceptual: a re-compressed or cropped copy is a
+new image. That keeps false hits at zero, which matters more here than
+catching near-duplicates.
+
+Tuning (env vars):
+    SCAN_CACHE_MAX_ENTRIES   scans kept per worker, LRU-evicted (default 1024)
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = int(os.getenv("SCAN_CACHE_MAX_ENTRIES", "1024"))
+
+
+def hash_upload(image_file) -> str:
+    """sha256 hex digest of an uploaded file; leaves it rewound."""
+    digest = hashlib.sha256()
+    image_file.seek(0)
+    for chunk in image_file.chunks():
+        digest.update(chunk)
+    image_file.seek(0)
+    return digest.hexdigest()
+
+
+class ScanCache:
+    """Bounded LRU of image hash -> ml_model.scan_batch() result."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            scan = self._entries.get(key)
+            if scan is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return scan
+
+    def put(self, key: str, scan: dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = scan
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+scan_cache = ScanCache()
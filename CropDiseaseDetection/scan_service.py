@@ -0,0 +1,202 @@
+"""
+One disease scan, end to end: hash -> cache / inference -> disease info
+-> ScanResult row.
+
+Shared by the synchronous detect/ endpoint and the background scan-job
+workers (jobs.py), so both produce identical responses. Returns the HTTP
+status alongside the body instead of a DRF Response so the job workers
+can store it.
+"""
+
+from rest_framework import status
+
+from .disease_info import get_disease_info
+from .image_storage import schedule_optimise
+from .inference import InferenceQueueFull, get_batcher
+from .models import ScanResult
+from .preprocessing import preprocess_image
+from .scan_cache import hash_upload, scan_cache
+
+SUPPORTED_CROPS = [
+    "Apple",
+    "Blueberry",
+    "Cherry (including sour)",
+    "Corn (maize)",
+    "Grape",
+    "Orange",
+    "Peach",
+    "Bell Pepper",
+    "Potato",
+    "Raspberry",
+    "Soybean",
+    "Squash",
+    "Strawberry",
+    "Tomato",
+]
+
+CONFIDENCE_THRESHOLD = 60.0
+
+# Seconds a request waits for its micro-batch before giving up
+INFERENCE_TIMEOUT = 30
+
+SEVERITY_MAP = {
+    "severe": "high",
+    "high": "high",
+    "moderate": "medium",
+    "medium": "medium",
+    "mild": "low",
+    "low": "low",
+    "none": "low",
+}
+
+
+def _top_predictions(prediction: dict) -> list[dict]:
+    # Scans cached before top-k existed carry only the argmax
+    return [
+        {
+            "cropType": candidate["crop_type"],
+            "disease": candidate["disease"],
+            "confidence": candidate["confidence"],
+        }
+        for candidate in prediction.get("top_k", [])
+    ]
+
+
+def evaluate_scan(scan: dict) -> tuple[dict, int, dict | None]:
+    """
+    Turn one ml_model.scan_batch() result into (body, http_status, record).
+    `record` holds the ScanResult fields to store, or is None when the
+    image was rejected (not a plant / unsupported crop).
+    """
+    plant_confidence = scan["plant_confidence"]
+
+    if not scan["is_plant"]:
+        return (
+            {
+                "error": "not_a_plant",
+                "message": (
+                    "The uploaded image does not appear to be a plant leaf. "
+                    "Please upload a clear photo of a crop leaf."
+                ),
+                "plant_confidence": plant_confidence,
+            },
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            None,
+        )
+
+    prediction = scan["prediction"]
+
+    if prediction["confidence"] < CONFIDENCE_THRESHOLD:
+        return (
+            {
+                "error": "unsupported_crop",
+                "message": (
+                    "This leaf doesn't match any crop in our database. "
+                    "Please upload a leaf from one of the supported crops."
+                ),
+                "confidence": prediction["confidence"],
+                "supported_crops": SUPPORTED_CROPS,
+                # Best guesses from the same pass, so clients need not re-submit
+                "topPredictions": _top_predictions(prediction),
+                "entropy": prediction.get("entropy"),
+            },
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            None,
+        )
+
+    info = get_disease_info(prediction["raw_label"])
+
+    treatment_list = info.get("treatment", [])
+    prevention_list = info.get("prevention", [])
+
+    result = {
+        "cropType": prediction["crop_type"],
+        "disease": prediction["disease"],
+        "confidence": prediction["confidence"],
+        "isHealthy": prediction["is_healthy"],
+        "severity": info["severity"],
+        "description": info["description"],
+        "treatment": treatment_list,
+        "prevention": prevention_list,
+        "topPredictions": _top_predictions(prediction),
+        "entropy": prediction.get("entropy"),
+    }
+
+    normalized_severity = SEVERITY_MAP.get(
+        info.get("severity", "low").lower(), "low"
+    )
+
+    record = {
+        "crop_type": prediction["crop_type"],
+        "disease": prediction["disease"],
+        "confidence": prediction["confidence"],
+        "is_healthy": prediction["is_healthy"],
+        "severity": normalized_severity,
+        "description": info.get("description", ""),
+        "treatment": "\n".join(treatment_list),
+        "prevention": "\n".join(prevention_list),
+    }
+    return result, status.HTTP_200_OK, record
+
+
+def is_readable_image(image) -> bool:
+    """
+    True when PIL recognises the upload as an image (header and structure
+    only, no pixel decode); leaves it rewound.
+    """
+    from PIL import Image as PILImage
+
+    try:
+        image.seek(0)
+        PILImage.open(image).verify()
+    except Exception:
+        return False
+    finally:
+        image.seek(0)
+    return True
+
+
+def run_scan(user, image) -> tuple[dict, int, dict]:
+    """
+    Scan one uploaded image for `user`.
+    Returns (body, http_status, extra_headers).
+    """
+    # Repeat uploads of the same bytes skip inference entirely
+    image_hash = hash_upload(image)
+    scan = scan_cache.get(image_hash)
+
+    # Plant gate + disease model run together in a shared micro-batch
+    try:
+        if scan is None:
+            arr = preprocess_image(image)
+            scan = get_batcher().submit(arr).result(timeout=INFERENCE_TIMEOUT)
+            scan_cache.put(image_hash, scan)
+    except InferenceQueueFull:
+        return (
+            {"error": "Disease detection is busy. Please try again shortly."},
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            {"Retry-After": "5"},
+        )
+    except Exception as exc:
+        return (
+            {"error": f"Disease detection failed: {str(exc)}"},
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            {},
+        )
+
+    body, code, record = evaluate_scan(scan)
+    if record is None:
+        return body, code, {}
+
+    image.seek(0)
+    scan_result = ScanResult.objects.create(
+        user=user,
+        image=image,
+        image_hash=image_hash,
+        **record,
+    )
+    body["scanId"] = scan_result.id
+    # Re-encode + thumbnail off the request path
+    schedule_optimise([scan_result.id])
+
+    return body, code, {}
@@ -1,3 +1,375 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from payment.models import DailyUsage
+
+from . import jobs
+from .bulk_scan import BulkScan, BulkScanError, collect_uploads, summarize_field
+from .checks import check_inference_backend
+from .image_storage import optimise_scan_image
+from .inference import InferenceBatcher, InferenceQueueFull
+from .models import ScanJob, ScanResult
+from .scan_cache import ScanCache
+from .tflite_backend import _bucket
+
+
+def fake_scan(index):
+    return {
+        "is_plant": True,
+        "plant_confidence": 99.0,
+        "prediction": {
+            "crop_type": "Tomato",
+            "disease": "Healthy",
+            "confidence": 95.0,
+            "is_healthy": True,
+            "raw_label": "Tomato___healthy",
+            "top_k": [],
+            "index": index,
+        },
+    }
+
+
+def fake_scan_batch(batch):
+    # Each test image carries its index in the first pixel
+    return [fake_scan(int(image[0, 0, 0])) for image in batch]
+
+
+def quota_used(user):
+    usage = DailyUsage.objects.filter(user=user, feature="disease_detection").first()
+    return usage.count if usage else 0
+
+
+def png_bytes(shade):
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), (shade, shade, shade)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class InferenceBatcherTests(SimpleTestCase):
+    def image(self, index):
+        return np.full((1, 2, 2, 3), index, dtype=np.float32)
+
+    def test_queued_images_share_one_forward_pass(self):
+        batcher = InferenceBatcher(max_batch_size=4, max_wait_ms=500, max_queue=8)
+        with mock.patch("CropDiseaseDetection.ml_model.scan_batch", side_effect=fake_scan_batch) as scan:
+            futures = [batcher.submit(self.image(i)) for i in range(4)]
+            results = [f.result(timeout=5) for f in futures]
+
+        self.assertEqual([r["prediction"]["index"] for r in results], [0, 1, 2, 3])
+        scan.assert_called_once()
+        self.assertEqual(batcher.stats()["batch_size_histogram"], {4: 1})
+
+    def test_failed_batch_fails_every_future(self):
+        batcher = InferenceBatcher(max_batch_size=2, max_wait_ms=500, max_queue=8)
+        with mock.patch("CropDiseaseDetection.ml_model.scan_batch", side_effect=RuntimeError("boom")), \
+                self.assertLogs("CropDiseaseDetection.inference", "ERROR"):
+            futures = [batcher.submit(self.image(i)) for i in range(2)]
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    future.result(timeout=5)
+        self.assertEqual(batcher.stats()["failed_batches"], 1)
+
+    def test_full_queue_rejects(self):
+        batcher = InferenceBatcher(max_batch_size=1, max_wait_ms=0, max_queue=1)
+        started, release = threading.Event(), threading.Event()
+
+        def blocking_scan(batch):
+            started.set()
+            release.wait(5)
+            return fake_scan_batch(batch)
+
+        with mock.patch("CropDiseaseDetection.ml_model.scan_batch", side_effect=blocking_scan):
+            running = batcher.submit(self.image(0))
+            self.assertTrue(started.wait(5))
+            queued = batcher.submit(self.image(1))
+            with self.assertRaises(InferenceQueueFull):
+                batcher.submit(self.image(2))
+            release.set()
+            running.result(timeout=5)
+            queued.result(timeout=5)
+        self.assertEqual(batcher.stats()["rejected"], 1)
+
+
+class ScanCacheTests(SimpleTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ScanCache(max_entries=2)
+        cache.put("a", {"scan": "a"})
+        cache.put("b", {"scan": "b"})
+        cache.get("a")
+        cache.put("c", {"scan": "c"})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"scan": "a"})
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["evictions"]), (2, 1))
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = ScanCache(max_entries=0)
+        cache.put("a", {"scan": "a"})
+        self.assertIsNone(cache.get("a"))
+
+
+class SummarizeFieldTests(SimpleTestCase):
+    def test_counts_and_dominant_issue(self):
+        def scanned(crop, disease, healthy, severity="Low"):
+            return {"httpStatus": 200, "cropType": crop, "disease": disease,
+                    "isHealthy": healthy, "severity": severity}
+
+        summary = summarize_field([
+            scanned("Tomato", "Healthy", True),
+            scanned("Tomato", "Late blight", False, "High"),
+            scanned("Tomato", "Late blight", False, "High"),
+            scanned("Potato", "Early blight", False, "Moderate"),
+            {"httpStatus": 422, "error": "not_a_plant"},
+            {"httpStatus": 400, "error": "unreadable_image"},
+        ])
+
+        self.assertEqual(summary["total_images"], 6)
+        self.assertEqual((summary["scanned"], summary["healthy"], summary["diseased"]), (4, 1, 3))
+        self.assertEqual((summary["not_a_plant"], summary["unreadable"]), (1, 1))
+        self.assertEqual(summary["health_score"], 25.0)
+        self.assertEqual(summary["crops"], {"Tomato": 3, "Potato": 1})
+        self.assertEqual(summary["dominant_issue"], "Tomato — Late blight")
+        self.assertEqual(summary["severity_breakdown"], {"high": 2, "moderate": 1})
+
+    def test_nothing_scanned(self):
+        summary = summarize_field([{"httpStatus": 422, "error": "not_a_plant"}])
+        self.assertIsNone(summary["health_score"])
+        self.assertIsNone(summary["dominant_issue"])
+
+
+class CollectUploadsTests(SimpleTestCase):
+    class Files(dict):
+        def getlist(self, key):
+            return self.get(key, [])
+
+    def test_limits_are_checked_before_reading(self):
+        big = mock.Mock(size=10, read=mock.Mock(side_effect=AssertionError("read")))
+        big.name = "big.png"
+        with mock.patch("CropDiseaseDetection.bulk_scan.MAX_IMAGE_BYTES", 5):
+            with self.assertRaisesMessage(BulkScanError, "big.png is larger"):
+                collect_uploads(self.Files(images=[big]))
+
+        small = mock.Mock(size=1, read=mock.Mock(side_effect=AssertionError("read")))
+        with mock.patch("CropDiseaseDetection.bulk_scan.MAX_IMAGES", 2):
+            with self.assertRaisesMessage(BulkScanError, "at most 2 images"):
+                collect_uploads(self.Files(images=[small] * 3))
+
+
+class BulkScanTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user("Farmer", "farmer@example.com", "9800000000", "pw")
+        self.batcher = InferenceBatcher(max_batch_size=8, max_wait_ms=50)
+        for target, value in (
+            ("CropDiseaseDetection.bulk_scan.get_batcher", lambda: self.batcher),
+            ("CropDiseaseDetection.bulk_scan.scan_cache", ScanCache()),
+            ("CropDiseaseDetection.bulk_scan.schedule_optimise", mock.Mock()),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def saved_files(self):
+        return ScanResult._meta.get_field("image").storage.listdir("scans")[1]
+
+    def post(self, *uploads):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        files = [SimpleUploadedFile(name, data, content_type="image/png") for name, data in uploads]
+        return client.post("/api/disease/detect/bulk/", {"images": files}, format="multipart")
+
+    def test_repeat_uploads_are_scanned_once_in_one_batch(self):
+        uploads = [("a.png", png_bytes(0)), ("b.png", png_bytes(1)),
+                   ("c.png", png_bytes(2)), ("a-again.png", png_bytes(0))]
+        with mock.patch("CropDiseaseDetection.ml_model.scan_batch", side_effect=fake_scan_batch) as scan:
+            body = BulkScan(uploads).run(self.user)
+
+        scan.assert_called_once()
+        self.assertEqual(len(scan.call_args.args[0]), 3)
+        self.assertEqual(self.batcher.stats()["batch_size_histogram"], {3: 1})
+        self.assertTrue(all("scanId" in result for result in body["results"]))
+        # Every row keeps its own file, repeats included
+        images = set(ScanResult.objects.values_list("image", flat=True))
+        self.assertEqual(len(images), 4)
+        self.assertEqual(len(self.saved_files()), 4)
+
+    def test_failed_insert_removes_stored_files(self):
+        uploads = [("a.png", png_bytes(0)), ("b.png", png_bytes(1))]
+        with mock.patch("CropDiseaseDetection.ml_model.scan_batch", side_effect=fake_scan_batch), \
+                mock.patch.object(ScanResult.objects, "bulk_create", side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                BulkScan(uploads).run(self.user)
+
+        self.assertEqual(self.saved_files(), [])
+
+    def test_repeats_and_unreadable_images_are_not_charged(self):
+        with mock.patch("CropDiseaseDetection.ml_model.scan_batch", side_effect=fake_scan_batch):
+            response = self.post(("a.png", png_bytes(0)), ("a-again.png", png_bytes(0)),
+                                 ("b.png", png_bytes(1)), ("junk.png", b"not an image"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["summary"]["unreadable"], 1)
+        self.assertEqual(quota_used(self.user), 2)
+
+    def test_busy_batcher_is_refunded(self):
+        with mock.patch.object(self.batcher, "submit", side_effect=InferenceQueueFull):
+            response = self.post(("a.png", png_bytes(0)), ("b.png", png_bytes(1)))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(quota_used(self.user), 0)
+
+
+class OptimiseScanImageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user("Farmer", "farmer@example.com", "9800000000", "pw")
+
+    def test_row_is_repointed_and_original_deleted(self):
+        scan = ScanResult(user=self.user, crop_type="Tomato", disease="Healthy", confidence=95.0)
+        scan.image.save("leaf.png", ContentFile(png_bytes(0)), save=False)
+        scan.save()
+        original = scan.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(optimise_scan_image(scan.pk))
+        scan.refresh_from_db()
+
+        storage = scan.image.storage
+        self.assertTrue(scan.image.name.endswith(".webp"))
+        self.assertTrue(storage.exists(scan.image.name) and storage.exists(scan.thumbnail.name))
+        self.assertFalse(storage.exists(original))
+        self.assertFalse(optimise_scan_image(scan.pk))
+
+
+class ScanJobTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user("Farmer", "farmer@example.com", "9800000000", "pw")
+        patcher = mock.patch.object(jobs.job_runner, "submit")
+        self.submit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class ScanJobRecoveryTests(ScanJobTestCase):
+    def make_job(self, heartbeat_age, attempts=0, status=ScanJob.STATUS_RUNNING):
+        job = ScanJob(user=self.user, status=status, attempts=attempts,
+                      heartbeat_at=timezone.now() - timedelta(seconds=heartbeat_age))
+        job.upload.save("leaf.png", ContentFile(png_bytes(0)), save=False)
+        job.save()
+        return job
+
+    def test_stale_job_is_requeued(self):
+        job = self.make_job(jobs.STALE_AFTER + 5)
+        self.assertTrue(jobs.is_stale(job))
+
+        with self.assertLogs("CropDiseaseDetection.jobs", "WARNING"):
+            self.assertEqual(jobs.recover_stale_jobs(), {"requeued": 1, "failed": 0})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ScanJob.STATUS_QUEUED, 1))
+        self.submit.assert_called_once()
+
+    def test_job_out_of_attempts_fails_drops_upload_and_refunds(self):
+        DailyUsage.objects.create(user=self.user, feature="disease_detection", count=1)
+        job = self.make_job(jobs.STALE_AFTER + 5, attempts=jobs.MAX_ATTEMPTS - 1)
+        upload_name = job.upload.name
+
+        self.assertEqual(jobs.recover_stale_jobs(), {"requeued": 0, "failed": 1})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.http_status, job.upload.name), (ScanJob.STATUS_FAILED, 500, ""))
+        self.assertFalse(job.upload.storage.exists(upload_name))
+        self.assertEqual(quota_used(self.user), 0)
+        self.submit.assert_not_called()
+
+    def test_live_and_finished_jobs_are_left_alone(self):
+        live = self.make_job(0)
+        done = self.make_job(jobs.STALE_AFTER + 5, status=ScanJob.STATUS_DONE)
+        self.assertFalse(jobs.is_stale(live))
+        self.assertFalse(jobs.is_stale(done))
+
+        self.assertEqual(jobs.recover_stale_jobs(), {"requeued": 0, "failed": 0})
+        self.submit.assert_not_called()
+
+
+class ScanJobQuotaTests(ScanJobTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, data, name="leaf.png"):
+        upload = SimpleUploadedFile(name, data, content_type="image/png")
+        return self.client.post("/api/disease/jobs/", {"image": upload}, format="multipart")
+
+    def test_unreadable_upload_is_rejected_before_charging(self):
+        response = self.post(b"not an image", name="leaf.jpg")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(quota_used(self.user), 0)
+        self.submit.assert_not_called()
+
+    def test_full_queue_is_refunded(self):
+        self.submit.side_effect = jobs.ScanJobQueueFull
+        response = self.post(png_bytes(0))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual((quota_used(self.user), ScanJob.objects.count()), (0, 0))
+
+    def test_busy_scan_fails_the_job_and_refunds(self):
+        self.assertEqual(self.post(png_bytes(0)).status_code, 202)
+        self.assertEqual(quota_used(self.user), 1)
+        job = ScanJob.objects.get()
+
+        busy = ({"error": "Disease detection is busy. Please try again shortly."}, 503, {})
+        runner = jobs.ScanJobRunner(max_pending=1)
+        runner._slots.acquire()
+        with mock.patch("CropDiseaseDetection.scan_service.run_scan", return_value=busy), \
+                mock.patch("CropDiseaseDetection.jobs.close_old_connections"):
+            runner._run(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.http_status), (ScanJob.STATUS_FAILED, 503))
+        self.assertEqual(quota_used(self.user), 0)
+
+
+class InferenceBackendTests(SimpleTestCase):
+    def test_batches_pad_to_power_of_two(self):
+        self.assertEqual([_bucket(n) for n in (1, 2, 3, 5, 8, 9)], [1, 2, 4, 8, 8, 16])
+
+    def test_unknown_backend_is_reported(self):
+        from . import ml_model
+
+        self.assertEqual(check_inference_backend(None), [])
+        with mock.patch.object(ml_model, "INFERENCE_BACKEND", "gpu"):
+            errors = check_inference_backend(None)
+            self.assertEqual([e.id for e in errors], ["CropDiseaseDetection.E001"])
+            self.assertEqual(ml_model.model_status()["state"], "misconfigured")
+            self.assertFalse(ml_model.is_ready())
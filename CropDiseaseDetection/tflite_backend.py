@@ -0,0 +1,99 @@
+"""
+TFLite runtime for the disease-scan models on CPU-only nodes.
+
+Loads the compact .tflite artefacts written by `manage.py
+export_tflite_models` and exposes the same predict_on_batch() interface
+as the Keras models, so ml_model.scan_batch() can use either.
+
+The lightweight `tflite_runtime` wheel is used when installed (no full
+TensorFlow import, much smaller RSS); otherwise tf.lite.Interpreter is
+used. Int8-quantised models get their inputs quantised and outputs
+dequantised here, so callers always pass / receive float32.
+
+Tuning (env vars):
+    TFLITE_NUM_THREADS   interpreter threads per model (default: CPU count)
+"""
+
+import os
+import threading
+
+import numpy as np
+
+NUM_THREADS = int(os.getenv("TFLITE_NUM_THREADS", "0")) or os.cpu_count() or 1
+
+
+def _interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def _bucket(batch_size: int) -> int:
+    """Smallest power of two >= batch_size."""
+    return 1 << max(0, batch_size - 1).bit_length()
+
+
+class TFLiteModel:
+    """
+    A .tflite model with a Keras-like predict_on_batch().
+
+    Resizing an interpreter's input means reallocating all its tensors, so
+    batches are zero-padded to the next power of two and each padded size
+    gets its own interpreter, allocated once. Mixed batch sizes from the
+    inference batcher then reuse a handful of interpreters instead of
+    reallocating on every change.
+    """
+
+    def __init__(self, model_path, num_threads: int = NUM_THREADS):
+        self.model_path = str(model_path)
+        self.num_threads = num_threads
+        self._interpreters = {}     # padded batch size -> (interpreter, input, output)
+        interpreter, self._input, self._output = self._allocate(None)
+        self._interpreters[int(self._input["shape"][0])] = (interpreter, self._input, self._output)
+        # Interpreters are not thread-safe
+        self._lock = threading.Lock()
+
+    def _allocate(self, batch_size):
+        interpreter = _interpreter_class()(
+            model_path=self.model_path, num_threads=self.num_threads
+        )
+        if batch_size is not None:
+            shape = list(interpreter.get_input_details()[0]["shape"])
+            interpreter.resize_tensor_input(
+                interpreter.get_input_details()[0]["index"], [batch_size, *map(int, shape[1:])]
+            )
+        interpreter.allocate_tensors()
+        return interpreter, interpreter.get_input_details()[0], interpreter.get_output_details()[0]
+
+    def predict_on_batch(self, batch: np.ndarray) -> np.ndarray:
+        n = batch.shape[0]
+        size = _bucket(n)
+        if size != n:
+            padding = np.zeros((size - n, *batch.shape[1:]), dtype=batch.dtype)
+            batch = np.concatenate([batch, padding])
+
+        with self._lock:
+            if size not in self._interpreters:
+                self._interpreters[size] = self._allocate(size)
+            interpreter, self._input, self._output = self._interpreters[size]
+            interpreter.set_tensor(self._input["index"], self._quantise(batch))
+            interpreter.invoke()
+            return self._dequantise(interpreter.get_tensor(self._output["index"]))[:n]
+
+    def _quantise(self, batch: np.ndarray) -> np.ndarray:
+        dtype = self._input["dtype"]
+        if dtype == np.float32:
+            return np.ascontiguousarray(batch, dtype=np.float32)
+        scale, zero_point = self._input["quantization"]
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantise(self, out: np.ndarray) -> np.ndarray:
+        if out.dtype == np.float32:
+            return out.copy()
+        scale, zero_point = self._output["quantization"]
+        return (out.astype(np.float32) - zero_point) * scale
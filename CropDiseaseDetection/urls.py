@@ -1,9 +1,23 @@
 # disease/urls.py
 from django.urls import path
-from .views import DiseaseDetectionAPIView, RecentScansAPIView, ScanDetailAPIView
+from .views import (
+    DiseaseDetectionAPIView,
+    RecentScansAPIView,
+    ScanDetailAPIView,
+    InferenceStatsAPIView,
+    ModelReadinessAPIView,
+    ScanJobSubmitAPIView,
+    ScanJobDetailAPIView,
+    BulkScanAPIView,
+)
 
 urlpatterns = [
     path("detect/", DiseaseDetectionAPIView.as_view()),
+    path("detect/bulk/", BulkScanAPIView.as_view()),
     path("recent-scans/", RecentScansAPIView.as_view()),
     path("scans/<int:pk>/", ScanDetailAPIView.as_view()),
+    path("inference-stats/", InferenceStatsAPIView.as_view()),
+    path("ready/", ModelReadinessAPIView.as_view()),
+    path("jobs/", ScanJobSubmitAPIView.as_view()),
+    path("jobs/<uuid:pk>/", ScanJobDetailAPIView.as_view()),
 ]
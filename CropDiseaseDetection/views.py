@@ -1,41 +1,17 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from payment.quota import check_and_increment_quota
-
-from .models import ScanResult
-from .ml_model import is_plant, predict_disease
-from .disease_info import get_disease_info
-
-SUPPORTED_CROPS = [
-    "Apple",
-    "Blueberry",
-    "Cherry (including sour)",
-    "Corn (maize)",
-    "Grape",
-    "Orange",
-    "Peach",
-    "Bell Pepper",
-    "Potato",
-    "Raspberry",
-    "Soybean",
-    "Squash",
-    "Strawberry",
-    "Tomato",
-]
-
-CONFIDENCE_THRESHOLD = 60.0
-
-SEVERITY_MAP = {
-    "severe": "high",
-    "high": "high",
-    "moderate": "medium",
-    "medium": "medium",
-    "mild": "low",
-    "low": "low",
-    "none": "low",
-}
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from payment.quota import check_and_increment_quota, refund_quota
+from django.utils import timezone
+
+from .models import ScanResult, ScanJob
+from .jobs import job_runner, ScanJobQueueFull, is_stale, recover_stale_jobs
+from .inference import InferenceQueueFull, get_batcher
+from .ml_model import model_status, is_ready
+from .scan_cache import scan_cache
+from .scan_service import is_readable_image, run_scan
+from .bulk_scan import collect_uploads, BulkScan, BulkScanError
 
 class DiseaseDetectionAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -54,86 +30,136 @@ class DiseaseDetectionAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        body, code, headers = run_scan(request.user, image)
+        if code >= 500:
+            # Busy / failed on our side: the user is not charged for it
+            refund_quota(request.user, "disease_detection")
+        return Response(body, status=code, headers=headers)
+
+
+class BulkScanAPIView(APIView):
+    """
+    Scan many leaf photos from one field visit in a single request:
+    repeated `images` parts and/or an `archive` zip. Each distinct readable
+    image counts against the daily disease-detection quota.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
         try:
-            plant_detected, plant_confidence = is_plant(image)
+            uploads = collect_uploads(request.FILES)
+        except BulkScanError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        scan = BulkScan(uploads)
+        blocked = check_and_increment_quota(
+            request.user, "disease_detection", amount=scan.billable
+        )
+        if blocked:
+            return blocked
+
+        try:
+            body = scan.run(request.user)
+        except InferenceQueueFull:
+            refund_quota(request.user, "disease_detection", amount=scan.billable)
+            return Response(
+                {"error": "Disease detection is busy. Please try again shortly."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "5"},
+            )
         except Exception as exc:
+            refund_quota(request.user, "disease_detection", amount=scan.billable)
             return Response(
-                {"error": f"Plant detection failed: {str(exc)}"},
+                {"error": f"Disease detection failed: {str(exc)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+        return Response(body, status=status.HTTP_200_OK)
+
+
+def serialize_job(job) -> dict:
+    """Poll / websocket payload for a ScanJob."""
+    return {
+        "jobId": str(job.id),
+        "status": job.status,
+        "createdAt": job.created_at.isoformat(),
+        "finishedAt": job.finished_at.isoformat() if job.finished_at else None,
+        "httpStatus": job.http_status,
+        "result": job.result,
+    }
+
+
+class ScanJobSubmitAPIView(APIView):
+    """
+    Asynchronous scan: returns 202 with a job id straight away; the result
+    arrives via GET jobs/<id>/ or the ws/disease/jobs/<id>/ websocket.
+    """
+    permission_classes = [IsAuthenticated]
 
-        if not plant_detected:
+    def post(self, request):
+        image = request.FILES.get("image")
+        if not image:
             return Response(
-                {
-                    "error": "not_a_plant",
-                    "message": (
-                        "The uploaded image does not appear to be a plant leaf. "
-                        "Please upload a clear photo of a crop leaf."
-                    ),
-                    "plant_confidence": plant_confidence,
-                },
-                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                {"error": "No image provided. Please upload a leaf image."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-
-        image.seek(0)
-
-        try:
-            prediction = predict_disease(image)
-        except Exception as exc:
+        # Reject what the job could only fail on before charging for it
+        if not is_readable_image(image):
             return Response(
-                {"error": f"Disease detection failed: {str(exc)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"error": "The uploaded file is not a readable image."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if prediction["confidence"] < CONFIDENCE_THRESHOLD:
+        blocked = check_and_increment_quota(request.user, "disease_detection")
+        if blocked:
+            return blocked
+
+        # The upload's temp file is gone once this request ends, and the
+        # job must survive this worker: keep the image with the job
+        job = ScanJob.objects.create(
+            user=request.user, upload=image, heartbeat_at=timezone.now()
+        )
+        try:
+            job_runner.submit(job)
+        except ScanJobQueueFull:
+            job.upload.delete(save=False)
+            job.delete()
+            refund_quota(request.user, "disease_detection")
             return Response(
-                {
-                    "error": "unsupported_crop",
-                    "message": (
-                        "This leaf doesn't match any crop in our database. "
-                        "Please upload a leaf from one of the supported crops."
-                    ),
-                    "confidence": prediction["confidence"],
-                    "supported_crops": SUPPORTED_CROPS,
-                },
-                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                {"error": "Disease detection is busy. Please try again shortly."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "10"},
             )
 
-        info = get_disease_info(prediction["raw_label"])
+        return Response(
+            {
+                "jobId": str(job.id),
+                "status": job.status,
+                "pollUrl": request.build_absolute_uri(f"{job.id}/"),
+                "websocketPath": f"/ws/disease/jobs/{job.id}/",
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
 
-        treatment_list = info.get("treatment", [])
-        prevention_list = info.get("prevention", [])
 
-        result = {
-            "cropType": prediction["crop_type"],
-            "disease": prediction["disease"],
-            "confidence": prediction["confidence"],
-            "isHealthy": prediction["is_healthy"],
-            "severity": info["severity"],
-            "description": info["description"],
-            "treatment": treatment_list,  
-            "prevention": prevention_list,  
-        }
+class ScanJobDetailAPIView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        normalized_severity = SEVERITY_MAP.get(
-            info.get("severity", "low").lower(), "low"
-        )
+    def get(self, request, pk):
+        try:
+            job = ScanJob.objects.get(pk=pk, user=request.user)
+        except ScanJob.DoesNotExist:
+            return Response(
+                {"error": "Scan job not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        if is_stale(job):
+            # Its worker was lost: rerun it here or fail it
+            recover_stale_jobs([job.pk])
+            job.refresh_from_db()
+        return Response(serialize_job(job))
 
-        image.seek(0)
-        ScanResult.objects.create(
-            user=request.user, 
-            image=image,
-            crop_type=prediction["crop_type"],
-            disease=prediction["disease"],
-            confidence=prediction["confidence"],
-            is_healthy=prediction["is_healthy"],
-            severity=normalized_severity,
-            description=info.get("description", ""),
-            treatment="\n".join(treatment_list),  
-            prevention="\n".join(prevention_list),  
-        )
+def _media_url(request, field_file):
+    return request.build_absolute_uri(field_file.url) if field_file else None
 
-        return Response(result, status=status.HTTP_200_OK)
 
 class RecentScansAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -153,7 +179,9 @@ class RecentScansAPIView(APIView):
                 "description": s.description,
                 "treatment": s.treatment,
                 "prevention": s.prevention,
-                "image": request.build_absolute_uri(s.image.url) if s.image else None,
+                # Lists show the small thumbnail; full image once it exists
+                "image": _media_url(request, s.thumbnail or s.image),
+                "fullImage": _media_url(request, s.image),
             }
             for s in scans
         ]
@@ -184,6 +212,37 @@ class ScanDetailAPIView(APIView):
                 "description": s.description,
                 "treatment": s.treatment,
                 "prevention": s.prevention,
-                "image": request.build_absolute_uri(s.image.url) if s.image else None,
+                "image": _media_url(request, s.image),
+                "thumbnail": _media_url(request, s.thumbnail),
             }
-        )
\ No newline at end of file
+        )
+
+class InferenceStatsAPIView(APIView):
+    """Micro-batching and scan-cache metrics for this worker process (admin only)."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {
+                **get_batcher().stats(),
+                "scan_cache": scan_cache.stats(),
+                "pending_jobs": job_runner.pending(),
+                "max_pending_jobs": job_runner.max_pending,
+            }
+        )
+
+
+class ModelReadinessAPIView(APIView):
+    """
+    Readiness probe for scan traffic: 200 once this worker's models are
+    warm, 503 while cold / warming / failed / misconfigured. Never loads
+    a model itself.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response(
+            model_status(),
+            status=status.HTTP_200_OK if is_ready() else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
@@ -0,0 +1,106 @@
+"""
+Websocket delivery of ScanJob results (plain ASGI, no Channels).
+
+    ws://<host>/ws/disease/jobs/<job id>/?token=<JWT access token>
+
+Browsers cannot set an Authorization header on a websocket, so the
+SimpleJWT access token travels in the query string. The server sends the
+job payload (views.serialize_job) whenever its status changes and closes
+with 1000 once the job has finished. Close codes: 4401 bad / missing
+token, 4404 unknown job, 4408 job still unfinished after WS_JOB_TIMEOUT.
+The handshake is always accepted first: a close sent before accept is
+turned into a plain HTTP 403 by the server, and the client never sees
+the code.
+"""
+
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+
+JOB_PATH = re.compile(r"^/ws/disease/jobs/(?P<job_id>[0-9a-f-]{36})/?$")
+
+# Seconds between job status checks, and before giving up on a job
+WS_POLL_INTERVAL = 0.5
+WS_JOB_TIMEOUT = 120
+
+
+def _authenticate(token: str):
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+    from rest_framework.exceptions import AuthenticationFailed
+
+    auth = JWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def _load_job(job_id, user):
+    from django.db import close_old_connections
+
+    from .jobs import is_stale, recover_stale_jobs
+    from .models import ScanJob
+    from .views import serialize_job
+
+    close_old_connections()
+    job = ScanJob.objects.filter(pk=job_id, user=user).first()
+    if job is not None and is_stale(job):
+        recover_stale_jobs([job.pk])
+        job.refresh_from_db()
+    return (serialize_job(job), job.is_finished) if job else (None, True)
+
+
+async def scan_job_websocket(scope, receive, send):
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    await send({"type": "websocket.accept"})
+
+    match = JOB_PATH.match(scope["path"])
+    if not match:
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    query = parse_qs(scope.get("query_string", b"").decode())
+    token = (query.get("token") or [""])[0]
+    user = await sync_to_async(_authenticate)(token) if token else None
+    if user is None:
+        await send({"type": "websocket.close", "code": 4401})
+        return
+
+    payload, finished = await sync_to_async(_load_job)(match["job_id"], user)
+    if payload is None:
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    await send({"type": "websocket.send", "text": json.dumps(payload)})
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + WS_JOB_TIMEOUT
+    last_status = payload["status"]
+    while not finished:
+        if loop.time() > deadline:
+            await send({"type": "websocket.close", "code": 4408})
+            return
+
+        # Waiting on receive() doubles as the poll sleep and notices disconnects
+        try:
+            message = await asyncio.wait_for(receive(), timeout=WS_POLL_INTERVAL)
+            if message["type"] == "websocket.disconnect":
+                return
+        except asyncio.TimeoutError:
+            pass
+
+        payload, finished = await sync_to_async(_load_job)(match["job_id"], user)
+        if payload is None:
+            break
+        if payload["status"] != last_status:
+            last_status = payload["status"]
+            await send({"type": "websocket.send", "text": json.dumps(payload)})
+
+    await send({"type": "websocket.close", "code": 1000})
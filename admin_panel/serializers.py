@@ -266,6 +266,7 @@ class ScanResultListSerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "image",
+            "thumbnail",
             "crop_type",
             "disease",
             "confidence",
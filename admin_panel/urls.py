@@ -37,6 +37,11 @@ from .views import (
     # subscription
     AdminSubscriptionListView,
     AdminSubscriptionDetailView,
+    # system
+    AdminOutboundHTTPMetricsView,
+    AdminLLMCacheStatsView,
+    AdminWeatherCacheStatsView,
+    AdminLLMGatewayStatsView,
 )
 
 app_name = "admin_panel"
@@ -45,6 +50,26 @@ urlpatterns = [
     # AUTHENTICATION & DASHBOARD
     path("login/", AdminLoginView.as_view(), name="admin-login"),
     path("dashboard/stats/", AdminDashboardStatsView.as_view(), name="dashboard-stats"),
+    path(
+        "system/http-metrics/",
+        AdminOutboundHTTPMetricsView.as_view(),
+        name="http-metrics",
+    ),
+    path(
+        "system/llm-cache/",
+        AdminLLMCacheStatsView.as_view(),
+        name="llm-cache-stats",
+    ),
+    path(
+        "system/weather-cache/",
+        AdminWeatherCacheStatsView.as_view(),
+        name="weather-cache-stats",
+    ),
+    path(
+        "system/llm-gateway/",
+        AdminLLMGatewayStatsView.as_view(),
+        name="llm-gateway-stats",
+    ),
     
     # USER MANAGEMENT
     path("users/", AdminUserListView.as_view(), name="users-list"),
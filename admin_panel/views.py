@@ -48,6 +48,10 @@ from .serializers import (
     AdminDailyPriceHistorySerializer,
 )
 from .permissions import IsAdminUser
+from krishiSathi.http_client import http_metrics
+from chatbot.response_cache import cache_stats as llm_cache_stats
+from chatbot.weather_cache import weather_cache
+from chatbot.llm_gateway import llm_gateway
 from .utils import log_admin_action
 
 
@@ -760,3 +764,55 @@ class AdminSubscriptionDetailView(generics.RetrieveUpdateDestroyAPIView):
             request=self.request,
         )
         instance.delete()
+
+
+class AdminOutboundHTTPMetricsView(APIView):
+    """
+    GET /admin/system/http-metrics/
+    Latency, error and circuit-breaker state per upstream service
+    (OpenWeather, Kalimati, Ollama, eSewa) for this worker process.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(http_metrics())
+
+
+class AdminLLMCacheStatsView(APIView):
+    """
+    GET /admin/system/llm-cache/
+    Hit rate, size and evictions of the chat and crop-suggestion response
+    caches for this worker process, for sizing CHAT_CACHE_MAX_ENTRIES / TTLs.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(llm_cache_stats())
+
+
+class AdminWeatherCacheStatsView(APIView):
+    """
+    GET /admin/system/weather-cache/
+    Memory / DB hits, upstream fetches and coalesced misses of the
+    weather cache for this worker process.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(weather_cache.stats())
+
+
+class AdminLLMGatewayStatsView(APIView):
+    """
+    GET /admin/system/llm-gateway/
+    Ollama admission control for this worker process: in-flight and queued
+    generations, rejections, queue wait, generation time and tokens/sec.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(llm_gateway.stats())
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ChatConversation, ChatMessage, WeatherData, CropSuggestion
+from .models import ChatConversation, ChatMessage, WeatherData, CropSuggestion, CropAdvisory
 
 @admin.register(ChatConversation)
 class ChatConversationAdmin(admin.ModelAdmin):
@@ -33,7 +33,15 @@ class WeatherDataAdmin(admin.ModelAdmin):
 @admin.register(CropSuggestion)
 class CropSuggestionAdmin(admin.ModelAdmin):
     """Admin interface for crop suggestions"""
-    list_display = ['crop_name', 'growth_stage', 'conversation', 'created_at']
+    list_display = ['crop_name', 'growth_stage', 'location', 'conversation', 'created_at']
     list_filter = ['crop_name', 'growth_stage', 'created_at']
     search_fields = ['crop_name', 'growth_stage', 'suggestion']
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+@admin.register(CropAdvisory)
+class CropAdvisoryAdmin(admin.ModelAdmin):
+    """Admin interface for precomputed crop advisories"""
+    list_display = ['crop_key', 'stage_key', 'location_key', 'weather_bucket', 'generated_at']
+    list_filter = ['crop_key', 'generated_at']
+    search_fields = ['crop_key', 'stage_key', 'location_key']
+    readonly_fields = ['generated_at']
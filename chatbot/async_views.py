@@ -0,0 +1,297 @@
+"""
+Async (ASGI) versions of the crop-suggestion and chat endpoints.
+
+Served under ASGI (see krishiSathi/asgi.py) one worker keeps many LLM
+requests in flight: the event loop is free while Ollama and OpenWeather
+answer. DRF's APIView is sync-only, so these are plain Django async views doing
+the same JWT authentication, quota check and validation (in a thread,
+via sync_to_async) before the async part of the request.
+
+    POST /api/chatbot/async/crop-suggestion/   same as crop-suggestion/
+    POST /api/chatbot/async/chat/              same as chat/
+    POST /api/chatbot/async/chat/stream/       same as chat/stream/ (SSE)
+"""
+
+import json
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from payment.quota import check_and_increment_quota, refund_quota
+
+from . import crop_advisories
+from .context_builder import build_context, remember_turn
+from .gemini_service import GeminiService
+from .llm_gateway import AsyncReleasingStream, LLMOverloaded, llm_gateway, priority_for
+from .models import ChatConversation, ChatMessage, CropSuggestion
+from .response_cache import chat_cache, lookup_chat, suggestion_cache, suggestion_key
+from .serializers import ChatRequestSerializer, CropSuggestionRequestSerializer
+from .views import _sse, _start_chat_turn
+from .weather_service import WeatherService
+
+
+def _prepare(request, feature, serializer_class):
+    """
+    Authenticate, charge the daily quota and validate the JSON body (sync).
+    Returns (validated_data, None) or (None, error JsonResponse).
+    """
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed as exc:
+        return None, JsonResponse({"detail": str(exc.detail)}, status=401)
+    if authenticated is None:
+        return None, JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    request.user = authenticated[0]
+
+    blocked = check_and_increment_quota(request.user, feature)
+    if blocked:
+        return None, JsonResponse(blocked.data, status=blocked.status_code)
+
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return None, JsonResponse({"error": "Request body must be JSON."}, status=400)
+
+    serializer = serializer_class(data=payload)
+    if not serializer.is_valid():
+        return None, JsonResponse(serializer.errors, status=400)
+    return serializer.validated_data, None
+
+
+async def _overloaded(exc, request, feature):
+    # Don't charge the daily quota for the server's own rejection
+    await sync_to_async(refund_quota)(request.user, feature)
+    response = JsonResponse(
+        {'success': False, 'error': str(exc), 'retry_after': exc.retry_after}, status=503
+    )
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+async def _lookup_chat(user_message):
+    # May call the embedding model; don't hold up the shared sync thread
+    return await sync_to_async(lookup_chat, thread_sensitive=False)(user_message)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncCropSuggestionView(View):
+    """Async CropSuggestionView."""
+
+    async def post(self, request):
+        data, error = await sync_to_async(_prepare)(
+            request, "weather_irrigation", CropSuggestionRequestSerializer
+        )
+        if error:
+            return error
+
+        location = data['location']
+        crop_name = data['crop_name']
+        growth_stage = data['growth_stage']
+        session_id = data.get('session_id', str(uuid.uuid4()))
+
+        try:
+            weather_data = await WeatherService().aget_weather_data(location)
+
+            cache_key = suggestion_key(crop_name, growth_stage, weather_data)
+            suggestion = suggestion_cache.get(cache_key)
+            if suggestion is None:
+                suggestion = await crop_advisories.afind(crop_name, growth_stage, location, weather_data)
+                if suggestion is not None:
+                    suggestion_cache.set(cache_key, suggestion)
+            cached = suggestion is not None
+            if not cached:
+                priority = await sync_to_async(priority_for)(request.user)
+                raw = await GeminiService(priority).aget_crop_suggestion(
+                    crop_name=crop_name,
+                    growth_stage=growth_stage,
+                    weather_data=weather_data
+                )
+                suggestion = json.loads(raw)
+                suggestion_cache.set(cache_key, suggestion)
+                await crop_advisories.astore(crop_name, growth_stage, location, weather_data, suggestion)
+
+            conversation, created = await ChatConversation.objects.aget_or_create(
+                session_id=session_id,
+                defaults={'user': request.user}
+            )
+            crop_suggestion = await CropSuggestion.objects.acreate(
+                conversation=conversation,
+                crop_name=crop_name,
+                growth_stage=growth_stage,
+                location=location,
+                weather_conditions=weather_data,
+                suggestion=suggestion
+            )
+
+            return JsonResponse({
+                'success': True,
+                'session_id': session_id,
+                'crop_name': crop_name,
+                'growth_stage': growth_stage,
+                'weather': weather_data,
+                'suggestion': suggestion,
+                'cached': cached,
+                'created_at': crop_suggestion.created_at
+            })
+
+        except LLMOverloaded as e:
+            return await _overloaded(e, request, "weather_irrigation")
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncChatView(View):
+    """Async ChatView."""
+
+    async def post(self, request):
+        data, error = await sync_to_async(_prepare)(request, "chatbot", ChatRequestSerializer)
+        if error:
+            return error
+
+        session_id = data['session_id']
+        user_message = data['message']
+        if not user_message.strip():
+            return JsonResponse(
+                {'success': False, 'error': 'Message cannot be empty'}, status=400
+            )
+
+        try:
+            conversation, conversation_history = await sync_to_async(_start_chat_turn)(
+                request, session_id, user_message
+            )
+
+            ai_response = None
+            if not conversation_history:
+                cache_key, embedding, ai_response = await _lookup_chat(user_message)
+            cached = ai_response is not None
+
+            if not cached:
+                chat_context = build_context(conversation, conversation_history, user_message)
+                priority = await sync_to_async(priority_for)(request.user)
+                gemini_service = GeminiService(priority)
+                ai_response = await gemini_service.achat_turn(chat_context)
+                if not conversation_history:
+                    chat_cache.set(cache_key, ai_response, embedding)
+
+            assistant_message = await ChatMessage.objects.acreate(
+                conversation=conversation,
+                role='assistant',
+                content=ai_response
+            )
+            if not cached:
+                await sync_to_async(remember_turn)(
+                    conversation, assistant_message, gemini_service.last_context, chat_context
+                )
+
+            return JsonResponse({
+                'success': True,
+                'session_id': session_id,
+                'response': ai_response,
+                'cached': cached,
+                'timestamp': assistant_message.timestamp
+            })
+
+        except LLMOverloaded as e:
+            return await _overloaded(e, request, "chatbot")
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncChatStreamView(View):
+    """Async ChatStreamView; same events."""
+
+    async def post(self, request):
+        data, error = await sync_to_async(_prepare)(request, "chatbot", ChatRequestSerializer)
+        if error:
+            return error
+
+        session_id = data['session_id']
+        user_message = data['message']
+        if not user_message.strip():
+            return JsonResponse(
+                {'success': False, 'error': 'Message cannot be empty'}, status=400
+            )
+
+        conversation, conversation_history = await sync_to_async(_start_chat_turn)(
+            request, session_id, user_message
+        )
+        cache_key = embedding = cached = None
+        if not conversation_history:
+            cache_key, embedding, cached = await _lookup_chat(user_message)
+
+        gemini_service = chat_context = slot = None
+        if cached is None:
+            priority = await sync_to_async(priority_for)(request.user)
+            try:
+                slot = await llm_gateway.aacquire(priority)
+            except LLMOverloaded as e:
+                return await _overloaded(e, request, "chatbot")
+            try:
+                chat_context = build_context(conversation, conversation_history, user_message)
+                gemini_service = GeminiService(priority)
+            except BaseException:
+                # Not yet owned by the response stream
+                slot.release()
+                raise
+
+        async def tokens():
+            if cached is not None:
+                yield cached  # whole cached reply as a single token
+                return
+            async for token in gemini_service.astream_chat_turn(chat_context, slot):
+                yield token
+
+        async def event_stream():
+            parts = []
+            saved = False
+            try:
+                async for token in tokens():
+                    parts.append(token)
+                    yield _sse('token', {'token': token})
+
+                ai_response = "".join(parts).strip()
+                if cache_key is not None and cached is None and ai_response:
+                    chat_cache.set(cache_key, ai_response, embedding)
+                assistant_message = await ChatMessage.objects.acreate(
+                    conversation=conversation,
+                    role='assistant',
+                    content=ai_response
+                )
+                saved = True
+                if chat_context is not None:
+                    await sync_to_async(remember_turn)(
+                        conversation, assistant_message, gemini_service.last_context, chat_context
+                    )
+                yield _sse('done', {
+                    'session_id': session_id,
+                    'response': ai_response,
+                    'cached': cached is not None,
+                    'timestamp': assistant_message.timestamp.isoformat(),
+                })
+            except Exception as e:
+                yield _sse('error', {'error': str(e)})
+            finally:
+                # Client went away mid-stream: keep what was generated
+                partial = "".join(parts).strip()
+                if not saved and partial:
+                    await ChatMessage.objects.acreate(
+                        conversation=conversation,
+                        role='assistant',
+                        content=partial
+                    )
+
+        stream = event_stream() if slot is None else AsyncReleasingStream(event_stream(), slot)
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
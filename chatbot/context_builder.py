@@ -0,0 +1,199 @@
+"""
+Prompt assembly for multi-turn chat under a token budget.
+
+Each turn used to resend the last 10 messages in full, so long assistant
+replies inflated the prompt and Ollama's prefill time. Now a turn is built
+one of two ways:
+
+    continuation  the conversation's stored Ollama `context` still ends at
+                  the latest reply, so only the new message is sent and the
+                  model continues from its KV cache (no history re-prefill)
+    rebuilt       system prompt + rolling summary + as many recent turns as
+                  fit CHAT_CONTEXT_TOKEN_BUDGET, newest first; older replies
+                  are truncated, and turns that no longer fit are folded into
+                  ChatConversation.summary in the background
+
+Tokens are estimated at ~4 characters each (no tokenizer is loaded in the
+web process); the continuation context is measured exactly, since Ollama
+returns it as token ids.
+
+Tuning (env vars):
+    CHAT_CONTEXT_TOKEN_BUDGET   prompt budget for a rebuilt turn   (default 1024)
+    CHAT_CONTEXT_TURN_TOKENS    cap per older message              (default 120)
+    CHAT_SUMMARY_WORDS          length of the rolling summary      (default 120)
+    CHAT_OLLAMA_CONTEXT_MAX     continuation context cap, tokens   (default 3072)
+    CHAT_HISTORY_LIMIT          unsummarised messages considered   (default 20)
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.db import close_old_connections
+
+from .gemini_service import CHAT_SYSTEM_PROMPT, GeminiService
+from .llm_gateway import PRIORITY_BACKGROUND
+from .models import ChatConversation, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "1024"))
+TURN_TOKENS = int(os.getenv("CHAT_CONTEXT_TURN_TOKENS", "120"))
+SUMMARY_WORDS = int(os.getenv("CHAT_SUMMARY_WORDS", "120"))
+OLLAMA_CONTEXT_MAX = int(os.getenv("CHAT_OLLAMA_CONTEXT_MAX", "3072"))
+HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "20"))
+
+CHARS_PER_TOKEN = 4
+# The two most recent messages (last question + answer) are kept whole
+FULL_TURNS = 2
+
+ROLE_LABELS = {"user": "Farmer", "assistant": "Assistant"}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-summary")
+_summarising = set()
+_summarising_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+
+@dataclass
+class ChatContext:
+    prompt: str
+    ollama_context: list | None = None
+    # Messages (oldest first) that did not fit and should be summarised
+    overflow: list = field(default_factory=list)
+
+    @property
+    def is_continuation(self) -> bool:
+        return self.ollama_context is not None
+
+
+def recent_history(conversation, exclude_id=None) -> list[dict]:
+    """
+    Unsummarised messages of `conversation`, oldest first, as
+    {"id", "role", "content"} dicts (at most CHAT_HISTORY_LIMIT).
+    """
+    messages = ChatMessage.objects.filter(conversation=conversation)
+    if conversation.summary_message_id is not None:
+        messages = messages.filter(id__gt=conversation.summary_message_id)
+    if exclude_id is not None:
+        messages = messages.exclude(id=exclude_id)
+    latest = messages.order_by("-timestamp", "-id").values("id", "role", "content")[:HISTORY_LIMIT]
+    return list(reversed(latest))
+
+
+def build_context(conversation, history: list[dict], user_message: str) -> ChatContext:
+    """Prompt (and optional Ollama context) for the next turn."""
+    stored = conversation.ollama_context
+    if (
+        stored
+        and history
+        and history[-1]["id"] == conversation.context_message_id
+        and len(stored) + estimate_tokens(user_message) <= OLLAMA_CONTEXT_MAX
+    ):
+        return ChatContext(prompt=user_message, ollama_context=stored)
+
+    header = [CHAT_SYSTEM_PROMPT]
+    if conversation.summary:
+        header.append(f"Summary of the earlier conversation: {conversation.summary}")
+
+    budget = TOKEN_BUDGET - sum(estimate_tokens(p) for p in header) - estimate_tokens(user_message)
+    kept = []
+    overflow = []
+    for age, msg in enumerate(reversed(history)):
+        content = msg["content"] if age < FULL_TURNS else truncate(msg["content"], TURN_TOKENS)
+        line = f"{ROLE_LABELS.get(msg['role'], msg['role'])}: {content}"
+        cost = estimate_tokens(line)
+        if cost > budget:
+            overflow = history[: len(history) - age]
+            break
+        budget -= cost
+        kept.append(line)
+
+    prompt = "\n\n".join(header + list(reversed(kept)) + [user_message])
+    return ChatContext(prompt=prompt, overflow=overflow)
+
+
+def remember_turn(conversation, assistant_message, ollama_context, chat_context: ChatContext):
+    """
+    After a reply is saved: keep Ollama's context for the next turn (or
+    drop it once it outgrows the cap) and fold overflowed turns into the
+    summary off the request path.
+    """
+    if ollama_context and len(ollama_context) <= OLLAMA_CONTEXT_MAX:
+        fields = {"ollama_context": ollama_context, "context_message_id": assistant_message.id}
+    else:
+        fields = {"ollama_context": None, "context_message_id": None}
+    ChatConversation.objects.filter(pk=conversation.pk).update(**fields)
+
+    if chat_context.overflow:
+        schedule_summary(conversation.pk, chat_context.overflow)
+
+
+def schedule_summary(conversation_id: int, messages: list[dict]):
+    """Fold `messages` into the conversation's summary in the background (once at a time)."""
+    with _summarising_lock:
+        if conversation_id in _summarising:
+            return
+        _summarising.add(conversation_id)
+    _executor.submit(_summarise_in_background, conversation_id, messages)
+
+
+def _summarise_in_background(conversation_id, messages):
+    try:
+        update_summary(conversation_id, messages)
+    except Exception:
+        logger.exception("Summarising conversation %s failed", conversation_id)
+    finally:
+        with _summarising_lock:
+            _summarising.discard(conversation_id)
+        close_old_connections()
+
+
+def update_summary(conversation_id: int, messages: list[dict]) -> bool:
+    """
+    Extend the rolling summary with `messages` and advance the summary
+    pointer. Falls back to the truncated questions if the model is
+    unavailable. Returns False if another turn moved the pointer first.
+    """
+    conversation = ChatConversation.objects.get(pk=conversation_id)
+    previous_pointer = conversation.summary_message_id
+    messages = [m for m in messages if previous_pointer is None or m["id"] > previous_pointer]
+    if not messages:
+        return False
+
+    transcript = "\n".join(
+        f"{ROLE_LABELS.get(m['role'], m['role'])}: {truncate(m['content'], TURN_TOKENS * 2)}"
+        for m in messages
+    )
+    prompt = (
+        f"Summarise this farming conversation in under {SUMMARY_WORDS} words. "
+        "Keep crops, locations, problems and advice already given. No markdown.\n\n"
+        f"Existing summary: {conversation.summary or '(none)'}\n\n"
+        f"New messages:\n{transcript}"
+    )
+    try:
+        summary = GeminiService(PRIORITY_BACKGROUND)._generate(prompt)
+    except Exception as exc:
+        logger.warning("Summary generation failed, keeping questions only: %s", exc)
+        questions = "; ".join(truncate(m["content"], 30) for m in messages if m["role"] == "user")
+        summary = f"{conversation.summary} Farmer asked: {questions}".strip()
+
+    updated = ChatConversation.objects.filter(
+        pk=conversation_id, summary_message_id=previous_pointer
+    ).update(
+        summary=truncate(summary, SUMMARY_WORDS * 2),
+        summary_message_id=messages[-1]["id"],
+    )
+    return bool(updated)
@@ -0,0 +1,177 @@
+"""
+Precomputed crop advisories for popular (crop, growth stage, location) combos.
+
+A crop suggestion depends only on the crop, the stage and the weather, so
+the same advice is valid until the location's weather moves to another
+bucket (see response_cache.weather_bucket). CropAdvisory rows hold one
+advisory per (crop, stage, location, weather bucket), shared by every
+worker:
+
+    find(crop, stage, location, weather)     advisory for the current bucket, or None
+    store(crop, stage, location, weather, s) keep a generated advisory
+    refresh()                                precompute the popular combos
+
+refresh() takes the combos requested at least CROP_ADVISORY_MIN_REQUESTS
+times in the last CROP_ADVISORY_LOOKBACK_DAYS days (from CropSuggestion
+rows). For each one it looks up the current weather through the weather
+cache, which fetches from OpenWeather once the cached forecast is stale.
+It generates an advisory only when that weather falls into a bucket that
+has no advisory yet.
+
+The refresh runs in its own (cron) process, so the serving workers' LLM
+gateways do not see it and cannot make it wait for user traffic. It is
+throttled explicitly instead: generations run one at a time, after each
+one it pauses CROP_ADVISORY_PAUSE_FACTOR times as long as the generation
+took (so when Ollama slows down under user load, the refresh backs off
+with it), and a run stops after CROP_ADVISORY_MAX_GENERATIONS; the rest
+are picked up by the next run. Run it from cron, shortly after the
+weather cache turns over:
+
+    python manage.py refresh_crop_advisories
+
+The crop-suggestion views check the per-process suggestion_cache, then
+find(), and only generate live for combos that were not precomputed. A
+live result is stored too, so other workers can reuse it.
+
+Tuning (env vars):
+    CROP_ADVISORY_TTL              advisory kept for, seconds   (default 86400)
+    CROP_ADVISORY_LOOKBACK_DAYS    popularity window, days      (default 7)
+    CROP_ADVISORY_MIN_REQUESTS     requests to count as popular (default 3)
+    CROP_ADVISORY_MAX_COMBOS       combos per refresh           (default 50)
+    CROP_ADVISORY_MAX_GENERATIONS  LLM generations per refresh  (default 20)
+    CROP_ADVISORY_PAUSE_FACTOR     pause / generation time      (default 1.0)
+"""
+
+import json
+import logging
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .gemini_service import GeminiService
+from .llm_gateway import PRIORITY_BACKGROUND
+from .models import CropAdvisory, CropSuggestion
+from .response_cache import normalise_prompt, weather_bucket
+from .weather_cache import city_key
+from .weather_service import WeatherService
+
+logger = logging.getLogger(__name__)
+
+TTL = int(os.getenv("CROP_ADVISORY_TTL", str(24 * 3600)))
+LOOKBACK_DAYS = int(os.getenv("CROP_ADVISORY_LOOKBACK_DAYS", "7"))
+MIN_REQUESTS = int(os.getenv("CROP_ADVISORY_MIN_REQUESTS", "3"))
+MAX_COMBOS = int(os.getenv("CROP_ADVISORY_MAX_COMBOS", "50"))
+MAX_GENERATIONS = int(os.getenv("CROP_ADVISORY_MAX_GENERATIONS", "20"))
+PAUSE_FACTOR = float(os.getenv("CROP_ADVISORY_PAUSE_FACTOR", "1.0"))
+
+
+def advisory_key(crop_name: str, growth_stage: str, location: str, weather_data: dict) -> dict:
+    """CropAdvisory lookup fields for a request."""
+    return {
+        "crop_key": normalise_prompt(crop_name),
+        "stage_key": normalise_prompt(growth_stage),
+        "location_key": city_key(location),
+        "weather_bucket": "|".join("" if v is None else str(v) for v in weather_bucket(weather_data)),
+    }
+
+
+def _fresh(crop_name, growth_stage, location, weather_data):
+    return CropAdvisory.objects.filter(
+        **advisory_key(crop_name, growth_stage, location, weather_data),
+        generated_at__gte=timezone.now() - timedelta(seconds=TTL),
+    ).values_list("suggestion", flat=True)
+
+
+def find(crop_name, growth_stage, location, weather_data):
+    """Advisory for the current weather bucket, or None."""
+    return _fresh(crop_name, growth_stage, location, weather_data).first()
+
+
+async def afind(crop_name, growth_stage, location, weather_data):
+    return await _fresh(crop_name, growth_stage, location, weather_data).afirst()
+
+
+def store(crop_name, growth_stage, location, weather_data, suggestion):
+    CropAdvisory.objects.update_or_create(
+        **advisory_key(crop_name, growth_stage, location, weather_data),
+        defaults={"weather_conditions": weather_data, "suggestion": suggestion},
+    )
+
+
+async def astore(crop_name, growth_stage, location, weather_data, suggestion):
+    await CropAdvisory.objects.aupdate_or_create(
+        **advisory_key(crop_name, growth_stage, location, weather_data),
+        defaults={"weather_conditions": weather_data, "suggestion": suggestion},
+    )
+
+
+def popular_combos(days=LOOKBACK_DAYS, min_requests=MIN_REQUESTS, limit=MAX_COMBOS) -> list:
+    """
+    Most requested (crop, stage, location) combos of the last `days` days,
+    as (crop_name, growth_stage, location, requests), most popular first.
+    """
+    rows = CropSuggestion.objects.filter(
+        created_at__gte=timezone.now() - timedelta(days=days)
+    ).exclude(location="").values_list("crop_name", "growth_stage", "location")
+
+    counts = Counter()
+    names = {}
+    for crop_name, growth_stage, location in rows.iterator():
+        key = (normalise_prompt(crop_name), normalise_prompt(growth_stage), city_key(location))
+        counts[key] += 1
+        names.setdefault(key, (crop_name, growth_stage, location))
+
+    return [
+        (*names[key], requests)
+        for key, requests in counts.most_common(limit)
+        if requests >= min_requests
+    ]
+
+
+def refresh(combos=None, max_generations=MAX_GENERATIONS, pause_factor=PAUSE_FACTOR) -> dict:
+    """
+    Precompute advisories for `combos` (default: popular_combos()) whose
+    current weather bucket has none yet, one generation at a time and
+    throttled (see module docstring), and delete advisories past TTL.
+    """
+    if combos is None:
+        combos = popular_combos()
+
+    result = {"combos": len(combos), "generated": 0, "unchanged": 0, "failed": 0, "deferred": 0}
+    weather_service = WeatherService()
+    gemini_service = GeminiService(PRIORITY_BACKGROUND)
+    attempted = 0
+    for crop_name, growth_stage, location, *_ in combos:
+        try:
+            weather_data = weather_service.get_weather_data(location)
+            if find(crop_name, growth_stage, location, weather_data) is not None:
+                result["unchanged"] += 1
+                continue
+            if attempted >= max_generations:
+                result["deferred"] += 1
+                continue
+            if attempted:
+                time.sleep(pause)
+            attempted += 1
+            started = time.monotonic()
+            try:
+                raw = gemini_service.get_crop_suggestion(
+                    crop_name=crop_name,
+                    growth_stage=growth_stage,
+                    weather_data=weather_data
+                )
+            finally:
+                pause = (time.monotonic() - started) * pause_factor
+            store(crop_name, growth_stage, location, weather_data, json.loads(raw))
+            result["generated"] += 1
+        except Exception:
+            logger.exception("Precomputing advisory for %s / %s / %s failed", crop_name, growth_stage, location)
+            result["failed"] += 1
+
+    result["pruned"], _ = CropAdvisory.objects.filter(
+        generated_at__lt=timezone.now() - timedelta(seconds=TTL)
+    ).delete()
+    return result
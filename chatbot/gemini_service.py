@@ -1,37 +1,165 @@
-import requests
 import json
 
+from django.conf import settings
+
+from krishiSathi.http_client import get_client
+
+from .llm_gateway import PRIORITY_FREE, LLMOverloaded, llm_gateway
+
+CHAT_SYSTEM_PROMPT = """
+You are a helpful agricultural chatbot assistant.
+
+Rules:
+- Reply in SHORT conversational answers.
+- Keep responses under 120 words.
+- Be practical and direct.
+- No markdown.
+""".strip()
+
+
 class GeminiService:
     """
     Drop-in replacement using Ollama (llama3.2)
     No changes needed anywhere else in your code
     """
 
-    def __init__(self):
-        self.base_url = "http://host.docker.internal:11434/api/generate"
-        self.model = "llama3.2"
+    def __init__(self, priority=PRIORITY_FREE):
+        self.client = get_client("ollama")
+        self.model = settings.OLLAMA_MODEL
+        # Queue priority at the LLM gateway (llm_gateway.priority_for)
+        self.priority = priority
+        # Token context Ollama returned with the last completed generation
+        self.last_context = None
 
     # -----------------------------
     # CORE FUNCTION (Ollama call)
     # -----------------------------
-    def _generate(self, prompt):
+    def _payload(self, prompt, stream, context=None):
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream
+        }
+        if context:
+            # Continue from an earlier turn's KV cache
+            payload["context"] = context
+        return payload
+
+    def _generate(self, prompt, context=None):
+        try:
+            with llm_gateway.slot(self.priority) as slot:
+                response = self.client.post(
+                    "/api/generate",
+                    json=self._payload(prompt, False, context)
+                )
+
+                response.raise_for_status()
+                data = response.json()
+                slot.record(data)
+            self.last_context = data.get("context")
+
+            return data.get("response", "").strip()
+
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            raise Exception(f"Ollama error: {str(e)}")
+
+    def _generate_stream(self, prompt, context=None, slot=None):
+        """
+        Yield response tokens as Ollama produces them.
+        With "stream": True Ollama answers with NDJSON, one object per
+        token: {"response": "...", "done": false}, ending with done=true
+        (which also carries the token context).
+        Pass a gateway `slot` acquired up front to reject before streaming
+        starts; it is released when the stream ends.
+        """
+        try:
+            if slot is None:
+                slot = llm_gateway.acquire(self.priority)
+            with self.client.post(
+                "/api/generate",
+                json=self._payload(prompt, True, context),
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise Exception(chunk["error"])
+                    token = chunk.get("response", "")
+                    if token:
+                        yield token
+                    if chunk.get("done"):
+                        slot.record(chunk)
+                        self.last_context = chunk.get("context")
+                        break
+
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            raise Exception(f"Ollama error: {str(e)}")
+        finally:
+            if slot is not None:
+                slot.release()
+
+    # -----------------------------
+    # ASYNC OLLAMA CALLS (ASGI views)
+    # -----------------------------
+    async def _agenerate(self, prompt, context=None):
         try:
-            response = requests.post(
-                self.base_url,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False
-                }
-            )
-
-            response.raise_for_status()
-            data = response.json()
+            async with llm_gateway.aslot(self.priority) as slot:
+                response = await self.client.apost(
+                    "/api/generate",
+                    json=self._payload(prompt, False, context)
+                )
+
+                response.raise_for_status()
+                data = response.json()
+                slot.record(data)
+            self.last_context = data.get("context")
 
             return data.get("response", "").strip()
 
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            raise Exception(f"Ollama error: {str(e)}")
+
+    async def _agenerate_stream(self, prompt, context=None, slot=None):
+        """Async _generate_stream(): the event loop is free between tokens."""
+        try:
+            if slot is None:
+                slot = await llm_gateway.aacquire(self.priority)
+            async with self.client.astream(
+                "POST",
+                "/api/generate",
+                json=self._payload(prompt, True, context),
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise Exception(chunk["error"])
+                    token = chunk.get("response", "")
+                    if token:
+                        yield token
+                    if chunk.get("done"):
+                        slot.record(chunk)
+                        self.last_context = chunk.get("context")
+                        break
+
+        except LLMOverloaded:
+            raise
         except Exception as e:
             raise Exception(f"Ollama error: {str(e)}")
+        finally:
+            if slot is not None:
+                slot.release()
 
     # -----------------------------
     # CROP SUGGESTION
@@ -39,8 +167,14 @@ class GeminiService:
     def get_crop_suggestion(self, crop_name, growth_stage, weather_data):
         prompt = self._create_crop_prompt(crop_name, growth_stage, weather_data)
 
-        response = self._generate(prompt)
+        return self._extract_json(self._generate(prompt))
+
+    async def aget_crop_suggestion(self, crop_name, growth_stage, weather_data):
+        prompt = self._create_crop_prompt(crop_name, growth_stage, weather_data)
 
+        return self._extract_json(await self._agenerate(prompt))
+
+    def _extract_json(self, response):
         # 🔥 Important: force JSON safety (llama sometimes adds text)
         try:
             return response[response.index("{"):response.rindex("}")+1]
@@ -112,17 +246,37 @@ Do not include explanations or markdown.
     # CHAT WITH CONTEXT
     # -----------------------------
     def chat_with_context(self, user_message, conversation_history=None):
-        agricultural_context = """
-You are a helpful agricultural chatbot assistant.
+        prompt = self._create_chat_prompt(user_message, conversation_history)
 
-Rules:
-- Reply in SHORT conversational answers.
-- Keep responses under 120 words.
-- Be practical and direct.
-- No markdown.
-""".strip()
+        return self._generate(prompt)
+
+    # -----------------------------
+    # CHAT WITH CONTEXT (STREAMING)
+    # -----------------------------
+    def stream_chat_with_context(self, user_message, conversation_history=None):
+        """Same prompt as chat_with_context(), yielding tokens as they arrive."""
+        prompt = self._create_chat_prompt(user_message, conversation_history)
+
+        return self._generate_stream(prompt)
+
+    # -----------------------------
+    # CHAT TURN (token-budgeted, see context_builder)
+    # -----------------------------
+    def chat_turn(self, chat_context):
+        """Reply for a ChatContext; self.last_context holds the new Ollama context."""
+        return self._generate(chat_context.prompt, chat_context.ollama_context)
+
+    def stream_chat_turn(self, chat_context, slot=None):
+        return self._generate_stream(chat_context.prompt, chat_context.ollama_context, slot)
+
+    async def achat_turn(self, chat_context):
+        return await self._agenerate(chat_context.prompt, chat_context.ollama_context)
 
-        messages = [agricultural_context]
+    def astream_chat_turn(self, chat_context, slot=None):
+        return self._agenerate_stream(chat_context.prompt, chat_context.ollama_context, slot)
+
+    def _create_chat_prompt(self, user_message, conversation_history=None):
+        messages = [CHAT_SYSTEM_PROMPT]
 
         if conversation_history:
             for msg in conversation_history:
@@ -130,9 +284,7 @@ Rules:
 
         messages.append(user_message)
 
-        prompt = "\n\n".join(messages)
-
-        return self._generate(prompt)
+        return "\n\n".join(messages)
 
     # -----------------------------
     # IMAGE (NOT SUPPORTED IN LLAMA3.2)
@@ -0,0 +1,334 @@
+"""
+Admission control for the local Ollama instance.
+
+Chat, streaming chat, crop suggestions and conversation summaries all
+generate on one Ollama server. Left uncoordinated, a burst makes every
+request slow and then time out. Every generation now takes a slot from the
+process-wide `llm_gateway`:
+
+    * at most LLM_MAX_CONCURRENCY generations run at once
+    * the rest wait in a priority queue: PRO subscribers, then free users,
+      then background work (summaries). FIFO within a priority
+    * a request whose estimated wait exceeds LLM_MAX_WAIT, or that finds
+      LLM_MAX_QUEUE requests already waiting, is rejected at once with
+      LLMOverloaded. Views turn that into 503 + Retry-After
+    * queue wait, generation time and tokens/sec (from Ollama's eval_count /
+      eval_duration) are exposed via stats()
+
+Works for threads (sync views) and asyncio tasks (ASGI views) alike.
+
+    with llm_gateway.slot(priority) as slot:             # sync
+        data = ...; slot.record(data)
+
+    async with llm_gateway.aslot(priority) as slot:      # async
+        ...
+
+The limits are per process; set LLM_MAX_CONCURRENCY so that
+workers x concurrency roughly matches OLLAMA_NUM_PARALLEL.
+
+Tuning (env vars):
+    LLM_MAX_CONCURRENCY        generations in flight             (default 2)
+    LLM_MAX_QUEUE              requests allowed to wait          (default 32)
+    LLM_MAX_WAIT               longest acceptable wait, seconds  (default 30)
+    LLM_EXPECTED_GENERATION    initial per-request estimate, s   (default 8)
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+MAX_WAIT = float(os.getenv("LLM_MAX_WAIT", "30"))
+EXPECTED_GENERATION = float(os.getenv("LLM_EXPECTED_GENERATION", "8"))
+
+PRIORITY_PRO, PRIORITY_FREE, PRIORITY_BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {PRIORITY_PRO: "pro", PRIORITY_FREE: "free", PRIORITY_BACKGROUND: "background"}
+
+# Samples kept for percentiles
+METRICS_WINDOW = 200
+
+
+def priority_for(user) -> int:
+    """Queue priority of a user's requests (PRO first)."""
+    try:
+        if user is not None and user.subscription.is_pro:
+            return PRIORITY_PRO
+    except Exception:
+        pass  # no subscription row = FREE
+    return PRIORITY_FREE
+
+
+class LLMOverloaded(Exception):
+    """Rejected without waiting; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("The assistant is busy right now. Please try again shortly.")
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    def __init__(self, priority, loop=None):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        # Caller holds the gateway lock
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class Slot:
+    """One admitted generation; release() exactly once (idempotent)."""
+
+    def __init__(self, gateway, priority, waited: float):
+        self.gateway = gateway
+        self.priority = priority
+        self.waited = waited
+        self.started = time.monotonic()
+        self.eval_count = None
+        self.eval_duration = None
+        self._released = False
+
+    def record(self, data: dict):
+        """Token counts from an Ollama response (final chunk when streaming)."""
+        self.eval_count = data.get("eval_count")
+        self.eval_duration = data.get("eval_duration")  # nanoseconds
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.gateway._release(self)
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE,
+                 max_wait=MAX_WAIT, expected_generation=EXPECTED_GENERATION):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._avg_generation = expected_generation
+        self._lock = threading.Lock()
+        self._active = 0
+        self._heap = []                 # (priority, seq, waiter)
+        self._waiting = 0               # waiters in _heap not cancelled
+        self._seq = itertools.count()
+
+        self._waits = deque(maxlen=METRICS_WINDOW)
+        self._generations = deque(maxlen=METRICS_WINDOW)
+        self._tokens_per_sec = deque(maxlen=METRICS_WINDOW)
+        self._stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+        self._admitted_by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+
+    # -- admission -----------------------------------------------------
+
+    def _enqueue(self, priority, loop=None):
+        """A Slot if one is free now, else a queued _Waiter; raises LLMOverloaded."""
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._active += 1
+                return self._admit(priority, 0.0), None
+
+            ahead = sum(
+                1 for p, _, w in self._heap if not w.cancelled and p <= priority
+            )
+            estimate = (ahead // self.max_concurrency + 1) * self._avg_generation
+            if self._waiting >= self.max_queue or estimate > self.max_wait:
+                self._stats["rejected"] += 1
+                raise LLMOverloaded(self._retry_after(estimate))
+
+            waiter = _Waiter(priority, loop)
+            heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+            self._waiting += 1
+            return None, waiter
+
+    def _admit(self, priority, waited):
+        # Caller holds the lock
+        self._stats["admitted"] += 1
+        self._admitted_by_priority[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        self._waits.append(waited)
+        return Slot(self, priority, waited)
+
+    def _granted_slot(self, waiter):
+        with self._lock:
+            return self._admit(waiter.priority, time.monotonic() - waiter.enqueued_at)
+
+    def _give_up(self, waiter) -> bool:
+        """Withdraw a waiter; False if it was granted a slot meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            waiter.cancelled = True
+            self._waiting -= 1
+            self._stats["timed_out"] += 1
+            return True
+
+    def acquire(self, priority=PRIORITY_FREE) -> Slot:
+        slot, waiter = self._enqueue(priority)
+        if slot is not None:
+            return slot
+        waiter.event.wait(self.max_wait)
+        if waiter.granted or not self._give_up(waiter):
+            return self._granted_slot(waiter)
+        raise LLMOverloaded(self._retry_after(self._avg_generation))
+
+    async def aacquire(self, priority=PRIORITY_FREE) -> Slot:
+        slot, waiter = self._enqueue(priority, asyncio.get_running_loop())
+        if slot is not None:
+            return slot
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Request went away while queued: hand a granted slot straight back
+            if not self._give_up(waiter):
+                self._granted_slot(waiter).release()
+            raise
+        if waiter.granted or not self._give_up(waiter):
+            return self._granted_slot(waiter)
+        raise LLMOverloaded(self._retry_after(self._avg_generation))
+
+    def _release(self, slot):
+        elapsed = time.monotonic() - slot.started
+        with self._lock:
+            self._generations.append(elapsed)
+            self._avg_generation = 0.8 * self._avg_generation + 0.2 * elapsed
+            if slot.eval_count and slot.eval_duration:
+                self._tokens_per_sec.append(slot.eval_count / (slot.eval_duration / 1e9))
+
+            # Hand the slot to the highest-priority live waiter
+            while self._heap:
+                _, _, waiter = heapq.heappop(self._heap)
+                if waiter.cancelled:
+                    continue
+                self._waiting -= 1
+                waiter.wake()
+                return
+            self._active -= 1
+
+    def _retry_after(self, estimate) -> int:
+        return max(1, math.ceil(min(estimate, self.max_wait)))
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_FREE):
+        slot = self.acquire(priority)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    @asynccontextmanager
+    async def aslot(self, priority=PRIORITY_FREE):
+        slot = await self.aacquire(priority)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    # -- metrics -------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            waits = sorted(self._waits)
+            generations = sorted(self._generations)
+            rates = sorted(self._tokens_per_sec)
+            in_flight, queued = self._active, self._waiting
+            by_priority = dict(self._admitted_by_priority)
+            avg_generation = self._avg_generation
+
+        def percentile(values, q, scale=1.0):
+            if not values:
+                return None
+            return round(values[min(len(values) - 1, int(q * len(values)))] * scale, 2)
+
+        return {
+            **stats,
+            "in_flight": in_flight,
+            "queued": queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+            "admitted_by_priority": by_priority,
+            "queue_wait_ms": {"p50": percentile(waits, 0.5, 1000), "p95": percentile(waits, 0.95, 1000)},
+            "generation_seconds": {
+                "p50": percentile(generations, 0.5),
+                "p95": percentile(generations, 0.95),
+                "ewma": round(avg_generation, 2),
+            },
+            "tokens_per_second": {"p50": percentile(rates, 0.5), "p5": percentile(rates, 0.05)},
+        }
+
+
+class ReleasingStream:
+    """
+    Iterable for StreamingHttpResponse that releases `slot` when the stream
+    ends or Django closes the response, even if iteration never started.
+    """
+
+    def __init__(self, iterable, slot):
+        self._iterator = iter(iterable)
+        self._slot = slot
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self._slot.release()
+            raise
+
+    def close(self):
+        try:
+            close = getattr(self._iterator, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._slot.release()
+
+
+class AsyncReleasingStream:
+    """Async counterpart of ReleasingStream (async views)."""
+
+    def __init__(self, iterable, slot):
+        self._iterator = aiter(iterable)
+        self._slot = slot
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await anext(self._iterator)
+        except BaseException:
+            self._slot.release()
+            raise
+
+    def close(self):
+        self._slot.release()
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,28 @@
+"""
+Delete stale WeatherData cache rows so the table stays bounded.
+
+Only fresh rows are ever read (WEATHER_CACHE_TTL); run this from cron:
+
+    python manage.py prune_weather_cache
+    python manage.py prune_weather_cache --older-than 6
+"""
+
+from django.core.management.base import BaseCommand
+
+from chatbot.weather_cache import RETENTION_HOURS, prune
+
+
+class Command(BaseCommand):
+    help = "Delete weather cache rows older than the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=RETENTION_HOURS,
+            help=f"Age in hours (default {RETENTION_HOURS}).",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune(options["older_than"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} weather rows."))
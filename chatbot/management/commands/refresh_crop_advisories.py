@@ -0,0 +1,70 @@
+"""
+Precompute crop advisories for popular (crop, stage, location) combos.
+
+Regenerates only combos whose weather moved to a new bucket since their
+last advisory, one at a time and throttled so it leaves Ollama to user
+traffic (see chatbot/crop_advisories.py); run it from cron, e.g. every
+3 hours:
+
+    python manage.py refresh_crop_advisories
+    python manage.py refresh_crop_advisories --min-requests 5 --limit 20
+    python manage.py refresh_crop_advisories --max-generations 5 --pause-factor 3
+"""
+
+from django.core.management.base import BaseCommand
+
+from chatbot.crop_advisories import (
+    LOOKBACK_DAYS,
+    MAX_COMBOS,
+    MAX_GENERATIONS,
+    MIN_REQUESTS,
+    PAUSE_FACTOR,
+    popular_combos,
+    refresh,
+)
+
+
+class Command(BaseCommand):
+    help = "Precompute crop advisories for popular combos whose weather changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=LOOKBACK_DAYS,
+            help=f"Popularity window in days (default {LOOKBACK_DAYS}).",
+        )
+        parser.add_argument(
+            "--min-requests",
+            type=int,
+            default=MIN_REQUESTS,
+            help=f"Requests for a combo to count as popular (default {MIN_REQUESTS}).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=MAX_COMBOS,
+            help=f"Most popular combos to refresh (default {MAX_COMBOS}).",
+        )
+        parser.add_argument(
+            "--max-generations",
+            type=int,
+            default=MAX_GENERATIONS,
+            help=f"LLM generations this run; the rest wait for the next (default {MAX_GENERATIONS}).",
+        )
+        parser.add_argument(
+            "--pause-factor",
+            type=float,
+            default=PAUSE_FACTOR,
+            help=f"Pause after a generation, as a multiple of its duration (default {PAUSE_FACTOR}).",
+        )
+
+    def handle(self, *args, **options):
+        combos = popular_combos(options["days"], options["min_requests"], options["limit"])
+        result = refresh(combos, options["max_generations"], options["pause_factor"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['combos']} combos: {result['generated']} generated, "
+            f"{result['unchanged']} unchanged, {result['failed']} failed, "
+            f"{result['deferred']} deferred; "
+            f"{result['pruned']} expired advisories deleted."
+        ))
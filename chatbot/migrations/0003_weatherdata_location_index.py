@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0002_conversation_context'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='weatherdata',
+            index=models.Index(fields=['location', '-fetched_at'], name='weather_location_fetched_idx'),
+        ),
+    ]
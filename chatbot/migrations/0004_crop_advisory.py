@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0003_weatherdata_location_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cropsuggestion',
+            name='location',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='CropAdvisory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('crop_key', models.CharField(max_length=100)),
+                ('stage_key', models.CharField(max_length=100)),
+                ('location_key', models.CharField(max_length=255)),
+                ('weather_bucket', models.CharField(max_length=100)),
+                ('weather_conditions', models.JSONField()),
+                ('suggestion', models.JSONField()),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('crop_key', 'stage_key', 'location_key', 'weather_bucket'), name='crop_advisory_unique_key')],
+            },
+        ),
+    ]
@@ -7,6 +7,14 @@ class ChatConversation(models.Model):
     session_id = models.CharField(max_length=255, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Rolling summary of turns that no longer fit the prompt budget, covering
+    # every message up to and including summary_message_id
+    summary = models.TextField(blank=True, default="")
+    summary_message_id = models.BigIntegerField(null=True, blank=True)
+    # Ollama's token context after the reply context_message_id, so the
+    # next turn can continue from its KV cache instead of re-prefilling
+    ollama_context = models.JSONField(null=True, blank=True)
+    context_message_id = models.BigIntegerField(null=True, blank=True)
     
     def __str__(self):
         return f"Conversation {self.session_id}"
@@ -31,6 +39,12 @@ class WeatherData(models.Model):
     forecast_data = models.JSONField()
     fetched_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Freshest row for a location (see weather_cache)
+            models.Index(fields=['location', '-fetched_at'], name='weather_location_fetched_idx'),
+        ]
+    
     def __str__(self):
         return f"Weather for {self.location}"
 
@@ -39,9 +53,32 @@ class CropSuggestion(models.Model):
     conversation = models.ForeignKey(ChatConversation, on_delete=models.CASCADE)
     crop_name = models.CharField(max_length=100)
     growth_stage = models.CharField(max_length=100)
+    # Location as requested; popular combos are precomputed (see crop_advisories)
+    location = models.CharField(max_length=255, blank=True, default="")
     weather_conditions = models.JSONField()
     suggestion = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
-        return f"{self.crop_name} - {self.growth_stage}"
\ No newline at end of file
+        return f"{self.crop_name} - {self.growth_stage}"
+
+class CropAdvisory(models.Model):
+    """Shared advisory for a crop, stage and location under one weather bucket"""
+    crop_key = models.CharField(max_length=100)
+    stage_key = models.CharField(max_length=100)
+    location_key = models.CharField(max_length=255)
+    weather_bucket = models.CharField(max_length=100)
+    weather_conditions = models.JSONField()
+    suggestion = models.JSONField()
+    generated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['crop_key', 'stage_key', 'location_key', 'weather_bucket'],
+                name='crop_advisory_unique_key',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.crop_key} - {self.stage_key} @ {self.location_key}"
\ No newline at end of file
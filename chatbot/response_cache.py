@@ -0,0 +1,215 @@
+"""
+Response cache for LLM answers.
+
+Many chat questions ("what fertilizer for tomato?") and crop suggestions
+(same crop, stage and roughly the same weather) repeat, and each one costs
+a full Ollama generation. Two per-process caches sit in front of the LLM:
+
+    chat_cache        key: normalised question (context-free turns only —
+                      a reply that depends on earlier turns is not reusable)
+    suggestion_cache  key: (crop, growth stage, discretised weather)
+
+Lookup is exact-match first. If CHAT_CACHE_EMBED_MODEL names an Ollama
+embedding model (e.g. "nomic-embed-text"), a miss falls back to the most
+similar cached question with cosine similarity >= CHAT_CACHE_SIMILARITY.
+Entries expire after a TTL and the least recently used entry is evicted
+when a cache is full. stats() reports hit rates so the caches can be sized.
+
+Tuning (env vars):
+    CHAT_CACHE_MAX_ENTRIES        per cache                (default 1000)
+    CHAT_CACHE_TTL                chat answers, seconds    (default 86400)
+    SUGGESTION_CACHE_TTL          suggestions, seconds     (default 10800)
+    CHAT_CACHE_EMBED_MODEL        Ollama embedding model   (default: off)
+    CHAT_CACHE_SIMILARITY         cosine threshold         (default 0.92)
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1000"))
+CHAT_TTL = int(os.getenv("CHAT_CACHE_TTL", str(24 * 3600)))
+SUGGESTION_TTL = int(os.getenv("SUGGESTION_CACHE_TTL", str(3 * 3600)))
+EMBED_MODEL = os.getenv("CHAT_CACHE_EMBED_MODEL", "")
+SIMILARITY_THRESHOLD = float(os.getenv("CHAT_CACHE_SIMILARITY", "0.92"))
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalise_prompt(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a question."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def embed(text: str):
+    """Unit-length embedding from Ollama, or None when disabled / unavailable."""
+    if not EMBED_MODEL:
+        return None
+    from krishiSathi.http_client import get_client
+
+    try:
+        response = get_client("ollama").post(
+            "/api/embeddings", json={"model": EMBED_MODEL, "prompt": text}, timeout=(3.05, 10)
+        )
+        response.raise_for_status()
+        vector = np.asarray(response.json()["embedding"], dtype=np.float32)
+    except Exception as exc:
+        logger.warning("Embedding lookup failed, using exact match only: %s", exc)
+        return None
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+class ResponseCache:
+    """TTL + LRU cache with optional embedding-similarity lookup."""
+
+    def __init__(self, name: str, ttl: int, max_entries: int = MAX_ENTRIES):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (value, expires_at, embedding)
+        self._lock = threading.Lock()
+        self._stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def get(self, key, embedding=None):
+        """Cached value for `key`, else for the closest `embedding`, else None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._exact(key, now)
+            if entry is not None:
+                return entry[0]
+
+            if embedding is not None:
+                match = self._nearest(embedding, now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self._stats["semantic_hits"] += 1
+                    return self._entries[match][0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def get_exact(self, key):
+        """Cached value for `key` only; a miss is not counted (get() follows)."""
+        with self._lock:
+            entry = self._exact(key, time.monotonic())
+            return entry[0] if entry is not None else None
+
+    def _exact(self, key, now):
+        # Caller holds the lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["exact_hits"] += 1
+        return entry
+
+    def set(self, key, value, embedding=None):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        lookups = hits + stats["misses"]
+        return {
+            **stats,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "semantic_lookup": bool(EMBED_MODEL),
+        }
+
+    def _nearest(self, embedding, now):
+        # Caller holds the lock; entries are bounded, so a linear scan is fine
+        keys, vectors = [], []
+        for key, (_, expires_at, vector) in self._entries.items():
+            if vector is not None and expires_at > now and vector.shape == embedding.shape:
+                keys.append(key)
+                vectors.append(vector)
+        if not vectors:
+            return None
+        scores = np.stack(vectors) @ embedding
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= SIMILARITY_THRESHOLD else None
+
+
+def _bucket(value, step):
+    try:
+        return int(round(float(value) / step) * step)
+    except (TypeError, ValueError):
+        return None
+
+
+def weather_bucket(weather_data: dict) -> tuple:
+    """
+    Discretise weather so near-identical conditions share a suggestion:
+    temperature to 2°C, humidity to 10%, sky condition, and the wettest
+    forecast day's rain chance to 20%.
+    """
+    current = weather_data.get("current", {})
+    forecast = weather_data.get("forecast", [])
+    max_rain = max((day.get("precipitation_chance", 0) for day in forecast), default=0)
+    return (
+        _bucket(current.get("temperature"), 2),
+        _bucket(current.get("humidity"), 10),
+        str(current.get("description", "")).lower(),
+        _bucket(max_rain, 20),
+    )
+
+
+def suggestion_key(crop_name: str, growth_stage: str, weather_data: dict) -> tuple:
+    return (
+        normalise_prompt(crop_name),
+        normalise_prompt(growth_stage),
+        weather_bucket(weather_data),
+    )
+
+
+chat_cache = ResponseCache("chat", CHAT_TTL)
+suggestion_cache = ResponseCache("crop_suggestion", SUGGESTION_TTL)
+
+
+def cache_stats() -> dict:
+    return {cache.name: cache.stats() for cache in (chat_cache, suggestion_cache)}
+
+
+def lookup_chat(message: str):
+    """
+    (key, embedding, cached reply or None) for a context-free chat turn.
+    The question is only embedded (an Ollama call) when the exact key misses.
+    """
+    key = normalise_prompt(message)
+    cached = chat_cache.get_exact(key)
+    if cached is not None:
+        return key, None, cached
+    embedding = embed(key)
+    return key, embedding, chat_cache.get(key, embedding)
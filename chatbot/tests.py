@@ -1,3 +1,298 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from payment.models import DailyUsage
+
+from . import context_builder, crop_advisories, response_cache, views
+from .context_builder import build_context
+from .llm_gateway import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_FREE,
+    PRIORITY_PRO,
+    LLMGateway,
+    LLMOverloaded,
+    ReleasingStream,
+)
+from .models import ChatConversation, CropAdvisory, CropSuggestion
+from .response_cache import ResponseCache, suggestion_key
+from .weather_cache import WeatherCache, city_key, forecast_step_start, geo_key
+
+WEATHER = {
+    "current": {"temperature": 24.2, "humidity": 61, "description": "Clear sky"},
+    "forecast": [{"precipitation_chance": 10}, {"precipitation_chance": 35}],
+}
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+class LLMGatewayTests(SimpleTestCase):
+    def queue_behind(self, gateway, priority, admitted):
+        def run():
+            with gateway.slot(priority):
+                admitted.append(priority)
+
+        queued = gateway.stats()["queued"]
+        thread = threading.Thread(target=run)
+        thread.start()
+        wait_until(lambda: gateway.stats()["queued"] == queued + 1)
+        return thread
+
+    def test_waiters_are_admitted_by_priority(self):
+        gateway = LLMGateway(max_concurrency=1, max_queue=10, max_wait=10, expected_generation=0.01)
+        held = gateway.acquire()
+        admitted = []
+        threads = [
+            self.queue_behind(gateway, priority, admitted)
+            for priority in (PRIORITY_BACKGROUND, PRIORITY_FREE, PRIORITY_PRO, PRIORITY_FREE)
+        ]
+        held.release()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(admitted, [PRIORITY_PRO, PRIORITY_FREE, PRIORITY_FREE, PRIORITY_BACKGROUND])
+        stats = gateway.stats()
+        self.assertEqual((stats["in_flight"], stats["queued"], stats["admitted"]), (0, 0, 5))
+        self.assertEqual(stats["admitted_by_priority"], {"pro": 1, "free": 3, "background": 1})
+
+    def test_full_queue_rejects_at_once(self):
+        gateway = LLMGateway(max_concurrency=1, max_queue=1, max_wait=10, expected_generation=0.01)
+        held = gateway.acquire()
+        admitted = []
+        waiter = self.queue_behind(gateway, PRIORITY_FREE, admitted)
+
+        with self.assertRaises(LLMOverloaded) as ctx:
+            gateway.acquire(PRIORITY_PRO)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+        held.release()
+        waiter.join(5)
+        self.assertEqual(admitted, [PRIORITY_FREE])
+        self.assertEqual(gateway.stats()["rejected"], 1)
+
+    def test_long_estimated_wait_rejects_at_once(self):
+        gateway = LLMGateway(max_concurrency=1, max_queue=10, max_wait=5, expected_generation=60)
+        held = gateway.acquire()
+        with self.assertRaises(LLMOverloaded) as ctx:
+            gateway.acquire()
+        self.assertEqual(ctx.exception.retry_after, 5)
+        held.release()
+        self.assertEqual(gateway.stats()["in_flight"], 0)
+
+    def test_cancelled_async_waiter_gives_its_place_back(self):
+        gateway = LLMGateway(max_concurrency=1, max_queue=10, max_wait=10, expected_generation=0.01)
+
+        async def scenario():
+            held = await gateway.aacquire()
+            waiter = asyncio.create_task(gateway.aacquire())
+            while gateway.stats()["queued"] != 1:
+                await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            held.release()
+
+        asyncio.run(scenario())
+        stats = gateway.stats()
+        self.assertEqual((stats["in_flight"], stats["queued"], stats["timed_out"]), (0, 0, 1))
+
+    def test_stream_releases_slot_when_closed_unread(self):
+        gateway = LLMGateway(max_concurrency=1)
+        stream = ReleasingStream(iter(["a", "b"]), gateway.acquire())
+        stream.close()
+        self.assertEqual(gateway.stats()["in_flight"], 0)
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def test_exact_hit_expiry_and_eviction(self):
+        cache = ResponseCache("test", ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), 3)
+
+        expired = ResponseCache("test", ttl=0)
+        expired.set("a", 1)
+        self.assertIsNone(expired.get_exact("a"))
+        self.assertEqual(expired.stats()["expirations"], 1)
+
+    def test_similar_question_is_a_semantic_hit(self):
+        cache = ResponseCache("test", ttl=60)
+        stored = np.array([1.0, 0.0], dtype=np.float32)
+        cache.set("how to water rice", "answer", stored)
+
+        close = np.array([0.99, 0.14], dtype=np.float32)
+        far = np.array([0.0, 1.0], dtype=np.float32)
+        self.assertEqual(cache.get("watering rice", close / np.linalg.norm(close)), "answer")
+        self.assertIsNone(cache.get("tomato pests", far))
+
+        stats = cache.stats()
+        self.assertEqual((stats["semantic_hits"], stats["misses"]), (1, 1))
+
+    def test_exact_chat_hit_skips_embedding(self):
+        cache = ResponseCache("chat", ttl=60)
+        with mock.patch.object(response_cache, "chat_cache", cache), \
+                mock.patch.object(response_cache, "embed", return_value=None) as embed:
+            cache.set("what is npk", "Nitrogen, phosphorus, potassium.")
+            key, embedding, cached = response_cache.lookup_chat("What is NPK?")
+            embed.assert_not_called()
+            self.assertEqual((key, cached), ("what is npk", "Nitrogen, phosphorus, potassium."))
+
+            response_cache.lookup_chat("What is urea?")
+            embed.assert_called_once_with("what is urea")
+
+    def test_near_identical_weather_shares_a_suggestion_key(self):
+        nearby = {
+            "current": {"temperature": 24.6, "humidity": 58, "description": "clear sky"},
+            "forecast": [{"precipitation_chance": 38}],
+        }
+        self.assertEqual(
+            suggestion_key(" Rice", "Seedling", WEATHER),
+            suggestion_key("rice", "seedling!", nearby),
+        )
+
+
+class WeatherCacheTests(TestCase):
+    def test_keys(self):
+        self.assertEqual(city_key("  Kathmandu  Valley "), "kathmandu valley")
+        self.assertEqual(geo_key(27.7172, 85.324), "geo:27.7,85.3")
+        self.assertEqual(geo_key(27.7172, 85.324), geo_key(27.71, 85.31))
+        self.assertEqual(
+            forecast_step_start(datetime(2024, 5, 1, 10, 59, tzinfo=dt_timezone.utc)),
+            datetime(2024, 5, 1, 9, 0, tzinfo=dt_timezone.utc),
+        )
+
+    def test_fetches_once_then_serves_memory_and_db(self):
+        cache = WeatherCache(ttl=600)
+        fetch = mock.Mock(return_value=WEATHER)
+
+        self.assertEqual(cache.get_or_fetch("pune", fetch), WEATHER)
+        self.assertEqual(cache.get_or_fetch("pune", fetch), WEATHER)
+        cache.clear_memory()
+        self.assertEqual(cache.get_or_fetch("pune", fetch), WEATHER)
+
+        fetch.assert_called_once()
+        stats = cache.stats()
+        self.assertEqual((stats["fetches"], stats["memory_hits"], stats["db_hits"]), (1, 1, 1))
+
+
+class ContextBuilderTests(SimpleTestCase):
+    def history(self, turns, length=40):
+        return [
+            {"id": i, "role": "user" if i % 2 else "assistant", "content": f"message {i} " + "x" * length}
+            for i in range(1, turns + 1)
+        ]
+
+    def test_continues_from_stored_ollama_context(self):
+        conversation = ChatConversation(ollama_context=[1, 2, 3], context_message_id=4)
+        context = build_context(conversation, self.history(4), "And for wheat?")
+        self.assertTrue(context.is_continuation)
+        self.assertEqual(context.prompt, "And for wheat?")
+
+    def test_rebuilt_prompt_keeps_newest_turns_within_budget(self):
+        conversation = ChatConversation(ollama_context=[1, 2, 3], context_message_id=3)
+        history = self.history(10, length=400)
+        with mock.patch.object(context_builder, "TOKEN_BUDGET", 600):
+            context = build_context(conversation, history, "And for wheat?")
+
+        self.assertFalse(context.is_continuation)
+        self.assertTrue(context.prompt.endswith("And for wheat?"))
+        self.assertIn("message 10", context.prompt)
+        self.assertTrue(context.overflow)
+        self.assertEqual(context.overflow, history[: len(context.overflow)])
+        self.assertNotIn(f"message {len(context.overflow)} ", context.prompt)
+
+
+class CropAdvisoryRefreshTests(TestCase):
+    def setUp(self):
+        conversation = ChatConversation.objects.create(session_id="s1")
+        for crop, location in [("Rice", "Pune")] * 3 + [("rice ", " pune")] + [("Wheat", "Delhi")]:
+            CropSuggestion.objects.create(
+                conversation=conversation, crop_name=crop, growth_stage="Seedling",
+                location=location, weather_conditions=WEATHER, suggestion="{}",
+            )
+
+        patchers = [
+            mock.patch.object(crop_advisories, "WeatherService"),
+            mock.patch.object(crop_advisories, "GeminiService"),
+            mock.patch.object(crop_advisories.time, "sleep"),
+        ]
+        weather_service, gemini_service, self.sleep = (p.start() for p in patchers)
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        weather_service.return_value.get_weather_data.return_value = WEATHER
+        self.generate = gemini_service.return_value.get_crop_suggestion
+        self.generate.return_value = json.dumps({"advice": "Irrigate lightly."})
+
+    def test_popular_combos_group_spellings(self):
+        combos = crop_advisories.popular_combos(min_requests=2)
+        self.assertEqual(combos, [("Rice", "Seedling", "Pune", 4)])
+
+    def test_refresh_generates_only_new_weather_buckets(self):
+        combos = crop_advisories.popular_combos(min_requests=2)
+        first = crop_advisories.refresh(combos)
+        self.assertEqual((first["generated"], first["unchanged"]), (1, 0))
+        self.assertEqual(
+            crop_advisories.find("rice", "seedling", "PUNE", WEATHER), {"advice": "Irrigate lightly."}
+        )
+
+        second = crop_advisories.refresh(combos)
+        self.assertEqual((second["generated"], second["unchanged"]), (0, 1))
+        self.generate.assert_called_once()
+        self.assertEqual(CropAdvisory.objects.count(), 1)
+
+    def test_refresh_is_throttled(self):
+        combos = [("Rice", "Seedling", "Pune", 4), ("Wheat", "Seedling", "Delhi", 3),
+                  ("Maize", "Seedling", "Hetauda", 3)]
+        result = crop_advisories.refresh(combos, max_generations=2, pause_factor=2)
+
+        self.assertEqual((result["generated"], result["deferred"]), (2, 1))
+        self.assertEqual(self.generate.call_count, 2)
+        # One pause, between the two generations
+        self.sleep.assert_called_once()
+
+
+class OverloadedRequestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("Farmer", "farmer@example.com", "9800000000", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        patchers = [
+            mock.patch.object(views, "WeatherService"),
+            mock.patch.object(views, "GeminiService"),
+            mock.patch.object(views, "suggestion_cache", ResponseCache("crop_suggestion", ttl=60)),
+        ]
+        weather_service, gemini_service, _ = (p.start() for p in patchers)
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        weather_service.return_value.get_weather_data.return_value = WEATHER
+        gemini_service.return_value.get_crop_suggestion.side_effect = LLMOverloaded(7)
+
+    def test_rejected_request_is_not_charged(self):
+        response = self.client.post(
+            reverse("crop-suggestion"),
+            {"location": "Pune", "crop_name": "Rice", "growth_stage": "Seedling"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "7")
+        usage = DailyUsage.objects.get(user=self.user, feature="weather_irrigation")
+        self.assertEqual(usage.count, 0)
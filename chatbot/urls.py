@@ -4,8 +4,10 @@ from .views import (
     WeatherView,
     CropSuggestionView,
     ChatView,
+    ChatStreamView,
     ConversationHistoryView
 )
+from .async_views import AsyncCropSuggestionView, AsyncChatView, AsyncChatStreamView
 
 urlpatterns = [
     # Weather endpoint
@@ -17,6 +19,14 @@ urlpatterns = [
     # General chat endpoint
     path('chat/', ChatView.as_view(), name='chat'),
     
+    # Chat with the reply streamed token by token (SSE)
+    path('chat/stream/', ChatStreamView.as_view(), name='chat-stream'),
+    
+    # Async variants for ASGI workers (many in-flight LLM calls per process)
+    path('async/crop-suggestion/', AsyncCropSuggestionView.as_view(), name='crop-suggestion-async'),
+    path('async/chat/', AsyncChatView.as_view(), name='chat-async'),
+    path('async/chat/stream/', AsyncChatStreamView.as_view(), name='chat-stream-async'),
+    
     # Conversation history
     path('conversation/<str:session_id>/', ConversationHistoryView.as_view(), name='conversation-history'),
     
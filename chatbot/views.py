@@ -1,12 +1,13 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 import uuid
 import json
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from .models import ChatConversation, ChatMessage, CropSuggestion
-from payment.quota import check_and_increment_quota
+from payment.quota import check_and_increment_quota, refund_quota
 from .serializers import (
     WeatherRequestSerializer,
     CropSuggestionRequestSerializer,
@@ -17,6 +18,10 @@ from .serializers import (
 )
 from .weather_service import WeatherService
 from .gemini_service import GeminiService
+from .llm_gateway import LLMOverloaded, ReleasingStream, llm_gateway, priority_for
+from . import crop_advisories
+from .context_builder import build_context, recent_history, remember_turn
+from .response_cache import chat_cache, lookup_chat, suggestion_cache, suggestion_key
 
 
 class WeatherView(APIView):
@@ -88,14 +93,26 @@ class CropSuggestionView(APIView):
             weather_service = WeatherService()
             weather_data = weather_service.get_weather_data(location)
             
-            # Step 2: Get AI suggestion using Gemini
-            gemini_service = GeminiService()
-            raw = gemini_service.get_crop_suggestion(
-                crop_name=crop_name,
-                growth_stage=growth_stage,
-                weather_data=weather_data
-            )
-            suggestion = json.loads(raw)
+            # Step 2: Get AI suggestion using Gemini, unless the same crop and
+            # stage was answered recently for similar weather, or precomputed
+            # for this location's current weather
+            cache_key = suggestion_key(crop_name, growth_stage, weather_data)
+            suggestion = suggestion_cache.get(cache_key)
+            if suggestion is None:
+                suggestion = crop_advisories.find(crop_name, growth_stage, location, weather_data)
+                if suggestion is not None:
+                    suggestion_cache.set(cache_key, suggestion)
+            cached = suggestion is not None
+            if not cached:
+                gemini_service = GeminiService(priority_for(request.user))
+                raw = gemini_service.get_crop_suggestion(
+                    crop_name=crop_name,
+                    growth_stage=growth_stage,
+                    weather_data=weather_data
+                )
+                suggestion = json.loads(raw)
+                suggestion_cache.set(cache_key, suggestion)
+                crop_advisories.store(crop_name, growth_stage, location, weather_data, suggestion)
             
             user = request.user if request.user.is_authenticated else None
             
@@ -110,6 +127,7 @@ class CropSuggestionView(APIView):
                 conversation=conversation,
                 crop_name=crop_name,
                 growth_stage=growth_stage,
+                location=location,
                 weather_conditions=weather_data,
                 suggestion=suggestion
             )
@@ -122,9 +140,12 @@ class CropSuggestionView(APIView):
                 'growth_stage': growth_stage,
                 'weather': weather_data,
                 'suggestion': suggestion,
+                'cached': cached,
                 'created_at': crop_suggestion.created_at
             }, status=status.HTTP_200_OK)
         
+        except LLMOverloaded as e:
+            return _overloaded(e, request, "weather_irrigation")
         except Exception as e:
             return Response({
                 'success': False,
@@ -132,6 +153,47 @@ class CropSuggestionView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _start_chat_turn(request, session_id, user_message):
+    """
+    Get or create the conversation, save the user's message and return
+    (conversation, history) with the unsummarised earlier messages.
+    """
+    user = request.user if request.user.is_authenticated else None
+    
+    # Get or create conversation
+    conversation, created = ChatConversation.objects.get_or_create(
+        session_id=session_id,
+        defaults={'user': user}
+    )          
+    
+    # Save user message
+    current = ChatMessage.objects.create(
+        conversation=conversation,
+        role='user',
+        content=user_message
+    )
+    
+    return conversation, recent_history(conversation, exclude_id=current.id)
+
+
+def _overloaded(exc, request, feature):
+    """
+    503 for a request the LLM gateway turned away; the quota use charged
+    for it is refunded.
+    """
+    refund_quota(request.user, feature)
+    return Response({
+        'success': False,
+        'error': str(exc),
+        'retry_after': exc.retry_after
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': str(exc.retry_after)})
+
+
+def _sse(event, data):
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
 class ChatView(APIView):
     """
     POST endpoint for general chatbot conversation
@@ -165,40 +227,24 @@ class ChatView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            user = request.user if request.user.is_authenticated else None
-            
-            # Get or create conversation
-            conversation, created = ChatConversation.objects.get_or_create(
-                session_id=session_id,
-                defaults={'user': user}
-            )          
-            
-            # Save user message
-            ChatMessage.objects.create(
-                conversation=conversation,
-                role='user',
-                content=user_message
+            conversation, conversation_history = _start_chat_turn(
+                request, session_id, user_message
             )
             
-            # Get conversation history for Gemini (last 10 messages)
-            messages = ChatMessage.objects.filter(
-                conversation=conversation
-            ).order_by('-timestamp')[:10]
+            # First turns don't depend on earlier context, so a repeated
+            # question can reuse a cached answer
+            ai_response = None
+            if not conversation_history:
+                cache_key, embedding, ai_response = lookup_chat(user_message)
+            cached = ai_response is not None
             
-            # Convert to Gemini format
-            conversation_history = []
-            for msg in reversed(messages[1:]):  # Exclude current user message
-                conversation_history.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
-            
-            # Get AI response using Gemini
-            gemini_service = GeminiService()
-            ai_response = gemini_service.chat_with_context(
-                user_message, 
-                conversation_history
-            )
+            if not cached:
+                # Get AI response within the prompt token budget
+                chat_context = build_context(conversation, conversation_history, user_message)
+                gemini_service = GeminiService(priority_for(request.user))
+                ai_response = gemini_service.chat_turn(chat_context)
+                if not conversation_history:
+                    chat_cache.set(cache_key, ai_response, embedding)
             
             # Save AI response
             assistant_message = ChatMessage.objects.create(
@@ -206,14 +252,20 @@ class ChatView(APIView):
                 role='assistant',
                 content=ai_response
             )
+            if not cached:
+                remember_turn(conversation, assistant_message,
+                              gemini_service.last_context, chat_context)
             
             return Response({
                 'success': True,
                 'session_id': session_id,
                 'response': ai_response,
+                'cached': cached,
                 'timestamp': assistant_message.timestamp
             }, status=status.HTTP_200_OK)
         
+        except LLMOverloaded as e:
+            return _overloaded(e, request, "chatbot")
         except Exception as e:
             return Response({
                 'success': False,
@@ -221,6 +273,113 @@ class ChatView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class ChatStreamView(APIView):
+    """
+    POST endpoint for chat with the reply streamed as it is generated
+    (Server-Sent Events, text/event-stream).
+    
+    Usage: POST /api/chatbot/chat/stream/
+    Body: same as /chat/
+    
+    Events:
+        token  {"token": "..."}                        one per model token
+        done   {"session_id", "response", "cached", "timestamp"}
+                                                       full reply, after it is saved
+        error  {"error": "..."}
+    The assistant message is stored once the stream completes (or with
+    whatever was generated if the client disconnects early).
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        
+        blocked = check_and_increment_quota(request.user, "chatbot")
+        if blocked:
+            return blocked
+        
+        serializer = ChatRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        session_id = serializer.validated_data['session_id']
+        user_message = serializer.validated_data['message']
+        
+        if not user_message.strip():
+            return Response({
+                'success': False,
+                'error': 'Message cannot be empty'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        conversation, conversation_history = _start_chat_turn(
+            request, session_id, user_message
+        )
+        cache_key = embedding = cached = None
+        if not conversation_history:
+            cache_key, embedding, cached = lookup_chat(user_message)
+        gemini_service = chat_context = slot = None
+        if cached is not None:
+            tokens = iter([cached])  # whole cached reply as a single token
+        else:
+            # Take the LLM slot now so overload is a 503, not a broken stream
+            priority = priority_for(request.user)
+            try:
+                slot = llm_gateway.acquire(priority)
+            except LLMOverloaded as e:
+                return _overloaded(e, request, "chatbot")
+            try:
+                chat_context = build_context(conversation, conversation_history, user_message)
+                gemini_service = GeminiService(priority)
+                tokens = gemini_service.stream_chat_turn(chat_context, slot)
+            except BaseException:
+                # Not yet owned by the response stream
+                slot.release()
+                raise
+        
+        def event_stream():
+            parts = []
+            saved = False
+            try:
+                for token in tokens:
+                    parts.append(token)
+                    yield _sse('token', {'token': token})
+                
+                ai_response = "".join(parts).strip()
+                if cache_key is not None and cached is None and ai_response:
+                    chat_cache.set(cache_key, ai_response, embedding)
+                assistant_message = ChatMessage.objects.create(
+                    conversation=conversation,
+                    role='assistant',
+                    content=ai_response
+                )
+                saved = True
+                if chat_context is not None:
+                    remember_turn(conversation, assistant_message,
+                                  gemini_service.last_context, chat_context)
+                yield _sse('done', {
+                    'session_id': session_id,
+                    'response': ai_response,
+                    'cached': cached is not None,
+                    'timestamp': assistant_message.timestamp.isoformat(),
+                })
+            except Exception as e:
+                yield _sse('error', {'error': str(e)})
+            finally:
+                # Client went away mid-stream: keep what was generated
+                partial = "".join(parts).strip()
+                if not saved and partial:
+                    ChatMessage.objects.create(
+                        conversation=conversation,
+                        role='assistant',
+                        content=partial
+                    )
+        
+        stream = event_stream() if slot is None else ReleasingStream(event_stream(), slot)
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+        return response
+
+
 class ConversationHistoryView(APIView):
     """
     GET endpoint to retrieve conversation history
@@ -0,0 +1,245 @@
+"""
+Two-tier weather cache shared by the chatbot and the weather app.
+
+    memory  per-process LRU, answers repeat lookups without a query
+    db      WeatherData rows, shared by every worker; looked up by
+            (location, -fetched_at), which is indexed
+
+Two kinds of key share the store:
+
+    city_key("  Kathmandu ")  -> "kathmandu"          chatbot WeatherService
+    geo_key(27.7172, 85.324)  -> "geo:27.7,85.3"      weather.WeatherForecastView
+
+Geo keys snap coordinates to a WEATHER_GEO_GRID-degree grid, so farmers in
+the same village share one entry. They are fetched for the cell centre,
+and they expire at the next 3-hour UTC boundary, when OpenWeather
+publishes a new forecast step. City entries expire WEATHER_CACHE_TTL after
+they were fetched.
+
+When several requests miss on the same key at once, only one of them calls
+OpenWeather. The others wait for its result (single flight, for both sync
+and async callers).
+
+WeatherData rows are only read while fresh. `manage.py prune_weather_cache`
+deletes rows older than WEATHER_CACHE_RETENTION, so the table stays
+bounded; run it from cron.
+
+Tuning (env vars):
+    WEATHER_CACHE_TTL              city freshness, seconds     (default 3600)
+    WEATHER_GEO_GRID               geo cell size, degrees      (default 0.05)
+    WEATHER_CACHE_MEMORY_ENTRIES   per-process entries         (default 512)
+    WEATHER_CACHE_RETENTION        rows kept for, hours        (default 48)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .models import WeatherData
+
+logger = logging.getLogger(__name__)
+
+TTL = int(os.getenv("WEATHER_CACHE_TTL", "3600"))
+MEMORY_ENTRIES = int(os.getenv("WEATHER_CACHE_MEMORY_ENTRIES", "512"))
+RETENTION_HOURS = int(os.getenv("WEATHER_CACHE_RETENTION", "48"))
+GEO_GRID = float(os.getenv("WEATHER_GEO_GRID", "0.05"))
+
+GEO_PREFIX = "geo:"
+# OpenWeather's 5-day forecast advances in 3-hour UTC steps
+FORECAST_STEP = 3 * 3600
+
+# Followers give up waiting on a stuck leader after this long and fetch themselves
+FLIGHT_TIMEOUT = 30
+
+
+def city_key(location: str) -> str:
+    return " ".join(location.split()).casefold()
+
+
+def snap_to_grid(lat: float, lon: float, grid: float = GEO_GRID) -> tuple[float, float]:
+    """Centre of the grid cell containing (lat, lon)."""
+    return (round(round(lat / grid) * grid, 6), round(round(lon / grid) * grid, 6))
+
+
+def geo_key(lat: float, lon: float) -> str:
+    lat, lon = snap_to_grid(lat, lon)
+    return f"{GEO_PREFIX}{lat:g},{lon:g}"
+
+
+def forecast_step_start(moment: datetime) -> datetime:
+    """Start of the 3-hour forecast step containing `moment`."""
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % FORECAST_STEP, tz=dt_timezone.utc)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class WeatherCache:
+    def __init__(self, ttl: int = TTL, memory_entries: int = MEMORY_ENTRIES):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()    # key -> (expires_at monotonic, payload)
+        self._lock = threading.Lock()
+        self._flights = {}              # key -> _Flight (sync callers)
+        self._async_flights = {}        # key -> asyncio.Task (async callers)
+        self._stats = {"memory_hits": 0, "db_hits": 0, "fetches": 0, "coalesced": 0}
+
+    # -- sync ----------------------------------------------------------
+
+    def get_or_fetch(self, key: str, fetch):
+        """Cached payload for `key` (city_key / geo_key), else fetch() once and store it."""
+        payload = self._from_memory(key)
+        if payload is not None:
+            return payload
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            self._count("coalesced")
+            if flight.done.wait(FLIGHT_TIMEOUT):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+            return self._fill(key, fetch)
+
+        try:
+            flight.result = self._fill(key, fetch)
+            return flight.result
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _fill(self, key, fetch):
+        row = self._fresh_rows(key).first()
+        if row is not None:
+            self._count("db_hits")
+            return self._remember_row(key, row)
+
+        self._count("fetches")
+        payload = fetch()
+        row = WeatherData.objects.create(
+            location=key,
+            current_weather=payload["current"],
+            forecast_data=payload["forecast"],
+        )
+        return self._remember_row(key, row)
+
+    # -- async ---------------------------------------------------------
+
+    async def aget_or_fetch(self, key: str, afetch):
+        """Async get_or_fetch(); `afetch` is a coroutine function."""
+        payload = self._from_memory(key)
+        if payload is not None:
+            return payload
+
+        loop = asyncio.get_running_loop()
+        task = self._async_flights.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._afill(key, afetch))
+            self._async_flights[key] = task
+            task.add_done_callback(lambda t: self._forget_task(key, t))
+        else:
+            self._count("coalesced")
+        # A cancelled request must not cancel the fetch others wait on
+        return await asyncio.shield(task)
+
+    async def _afill(self, key, afetch):
+        row = await self._fresh_rows(key).afirst()
+        if row is not None:
+            self._count("db_hits")
+            return self._remember_row(key, row)
+
+        self._count("fetches")
+        payload = await afetch()
+        row = await WeatherData.objects.acreate(
+            location=key,
+            current_weather=payload["current"],
+            forecast_data=payload["forecast"],
+        )
+        return self._remember_row(key, row)
+
+    def _forget_task(self, key, task):
+        if self._async_flights.get(key) is task:
+            del self._async_flights[key]
+
+    # -- tiers ---------------------------------------------------------
+
+    def _fresh_since(self, key, now):
+        if key.startswith(GEO_PREFIX):
+            return forecast_step_start(now)
+        return now - timedelta(seconds=self.ttl)
+
+    def _expires_at(self, key, fetched_at):
+        if key.startswith(GEO_PREFIX):
+            return forecast_step_start(fetched_at) + timedelta(seconds=FORECAST_STEP)
+        return fetched_at + timedelta(seconds=self.ttl)
+
+    def _fresh_rows(self, key):
+        return WeatherData.objects.filter(
+            location=key, fetched_at__gte=self._fresh_since(key, timezone.now())
+        ).order_by("-fetched_at")
+
+    def _from_memory(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return entry[1]
+
+    def _remember_row(self, key, row):
+        payload = {"current": row.current_weather, "forecast": row.forecast_data}
+        # Expire from memory when the row itself goes stale
+        remaining = (self._expires_at(key, row.fetched_at) - timezone.now()).total_seconds()
+        expires_at = time.monotonic() + max(0.0, remaining)
+        with self._lock:
+            self._memory[key] = (expires_at, payload)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return payload
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "memory_entries": len(self._memory), "ttl_seconds": self.ttl}
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+
+def prune(older_than_hours: int = RETENTION_HOURS) -> int:
+    """Delete WeatherData rows fetched more than `older_than_hours` ago."""
+    cutoff = timezone.now() - timedelta(hours=older_than_hours)
+    deleted, _ = WeatherData.objects.filter(fetched_at__lt=cutoff).delete()
+    return deleted
+
+
+weather_cache = WeatherCache()
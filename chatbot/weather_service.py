@@ -1,7 +1,5 @@
-import requests
-from datetime import datetime, timedelta
-from django.conf import settings
-from .models import WeatherData
+from weather.forecast_client import afetch_forecast, current_conditions, daily_summary, fetch_forecast
+from .weather_cache import city_key, weather_cache
 
 class WeatherService:
     """
@@ -9,117 +7,58 @@ class WeatherService:
     Uses OpenWeatherMap API (you can use any weather API)
     """
     
-    def __init__(self):
-        self.api_key = settings.WEATHER_API_KEY
-        self.base_url = "https://api.openweathermap.org/data/2.5"
-    
     def get_weather_data(self, location):
         """
         Gets current weather and 5-day forecast
-        First checks cache, then fetches from API if needed
+        Served from the weather cache (memory, then DB) when fresh,
+        otherwise fetched from the API once per location
+        """
+        return weather_cache.get_or_fetch(city_key(location), lambda: self._fetch(location))
+    
+    async def aget_weather_data(self, location):
         """
-        # Check if we have recent cached data (less than 1 hour old)
-        cached = WeatherData.objects.filter(
-            location=location,
-            fetched_at__gte=datetime.now() - timedelta(hours=1)
-        ).first()
-        
-        if cached:
-            return {
-                'current': cached.current_weather,
-                'forecast': cached.forecast_data
-            }
-        
-        # Fetch fresh data from API
-        current_weather = self._get_current_weather(location)
-        forecast = self._get_5day_forecast(location)
-        
-        # Save to database for caching
-        WeatherData.objects.create(
-            location=location,
-            current_weather=current_weather,
-            forecast_data=forecast
+        Async get_weather_data() for ASGI views: same cache, and the
+        event loop is free while OpenWeather answers
+        """
+        return await weather_cache.aget_or_fetch(
+            city_key(location), lambda: self._afetch(location)
         )
-        
-        return {
-            'current': current_weather,
-            'forecast': forecast
-        }
     
-    def _get_current_weather(self, location):
-        """Fetches current weather from API"""
-        url = f"{self.base_url}/weather"
-        params = {
-            'q': location,
-            'appid': self.api_key,
-            'units': 'metric'  # Use Celsius
-        }
-        
+    def _fetch(self, location):
+        """One /forecast call gives both current weather and the daily forecast"""
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Extract relevant information
-            return {
-                'temperature': data['main']['temp'],
-                'feels_like': data['main']['feels_like'],
-                'humidity': data['main']['humidity'],
-                'description': data['weather'][0]['description'],
-                'wind_speed': data['wind']['speed'],
-                'location': data['name']
-            }
+            data = fetch_forecast(q=location)
         except Exception as e:
-            raise Exception(f"Error fetching current weather: {str(e)}")
+            raise Exception(f"Error fetching weather: {str(e)}")
+        return self._from_forecast(data)
     
-    def _get_5day_forecast(self, location):
-        """Fetches 5-day forecast from API"""
-        url = f"{self.base_url}/forecast"
-        params = {
-            'q': location,
-            'appid': self.api_key,
-            'units': 'metric'
-        }
-        
+    async def _afetch(self, location):
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Process forecast data - group by day
-            daily_forecasts = []
-            current_date = None
-            daily_data = []
-            
-            for item in data['list']:
-                date = datetime.fromtimestamp(item['dt']).date()
-                
-                if current_date != date:
-                    if daily_data:
-                        daily_forecasts.append(self._process_day(daily_data))
-                    current_date = date
-                    daily_data = [item]
-                else:
-                    daily_data.append(item)
-            
-            # Add last day
-            if daily_data:
-                daily_forecasts.append(self._process_day(daily_data))
-            
-            return daily_forecasts[:5]  # Return only 5 days
-        
+            data = await afetch_forecast(q=location)
         except Exception as e:
-            raise Exception(f"Error fetching forecast: {str(e)}")
+            raise Exception(f"Error fetching weather: {str(e)}")
+        return self._from_forecast(data)
     
-    def _process_day(self, day_data):
-        """Processes data for a single day"""
-        temps = [item['main']['temp'] for item in day_data]
-        
+    def _from_forecast(self, data):
+        current = current_conditions(data)
         return {
-            'date': datetime.fromtimestamp(day_data[0]['dt']).strftime('%Y-%m-%d'),
-            'temp_min': min(temps),
-            'temp_max': max(temps),
-            'description': day_data[0]['weather'][0]['description'],
-            'humidity': sum(item['main']['humidity'] for item in day_data) / len(day_data),
-            'precipitation_chance': day_data[0].get('pop', 0) * 100  # Probability of precipitation
-        }
\ No newline at end of file
+            'current': {
+                'temperature': current['temperature'],
+                'feels_like': current['feels_like'],
+                'humidity': current['humidity'],
+                'description': current['description'],
+                'wind_speed': current['wind_speed'],
+                'location': current['location']
+            },
+            'forecast': [
+                {
+                    'date': day['date'],
+                    'temp_min': day['temp_min'],
+                    'temp_max': day['temp_max'],
+                    'description': day['description'],
+                    'humidity': day['humidity'],
+                    'precipitation_chance': day['precipitation_chance']  # Probability of precipitation
+                }
+                for day in daily_summary(data)
+            ]
+        }
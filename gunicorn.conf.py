@@ -0,0 +1,51 @@
+"""
+Gunicorn settings, picked up automatically from the working directory.
+
+Disease-model warm-up is opt-in: set DISEASE_MODEL_WARMUP=1 on the
+workers that serve /api/disease/. Each worker then loads the models and
+runs a dummy batch in a background thread right after it boots (after the
+fork — TensorFlow state must not be shared across forked processes).
+Price / weather / chat requests are served immediately; the load balancer
+should only send scans to workers whose /api/disease/ready/ returns 200.
+
+Every worker also sweeps async scan jobs lost by a previous (crashed or
+redeployed) worker when it boots; see CropDiseaseDetection/jobs.py.
+"""
+
+import logging
+import os
+import threading
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+
+def _warmup_enabled() -> bool:
+    return os.getenv("DISEASE_MODEL_WARMUP", "").lower() in ("1", "true", "yes")
+
+
+def _recover_scan_jobs():
+    from CropDiseaseDetection.jobs import recover_stale_jobs
+
+    try:
+        recover_stale_jobs()
+    except Exception:
+        logging.getLogger(__name__).exception("Recovering stale scan jobs failed")
+
+
+def post_worker_init(worker):
+    threading.Thread(target=_recover_scan_jobs, name="scan-job-recovery", daemon=True).start()
+
+    if not _warmup_enabled():
+        return
+
+    from CropDiseaseDetection.ml_model import warm_up
+
+    def _run():
+        try:
+            warm_up()
+        except Exception:
+            # Already logged; the worker stays up and reports "failed"
+            pass
+
+    threading.Thread(target=_run, name="disease-warmup", daemon=True).start()
+    worker.log.info("Disease model warm-up started")
@@ -5,6 +5,9 @@ callers never see raw exceptions from pandas or numpy.
 
 Updated: load_from_db() added — reads directly from
 price_predictor.DailyPriceHistory instead of a CSV file.
+Updated: prepare_series() resolves commodity names through
+price_predictor.commodity_index (exact / prefix / alias) instead of a
+case-folded substring scan over every row.
 """
 
 import logging
@@ -278,21 +281,20 @@ def prepare_series(df: pd.DataFrame, commodity: str) -> pd.Series:
         CommodityNotFoundError  — commodity not in dataset
         InsufficientDataError   — fewer than MIN_TRAIN_DAYS rows
     """
+    from price_predictor.commodity_index import CommodityIndex
+
     available = df["commodity"].unique().tolist()
-    matches = df[df["commodity"].str.lower() == commodity.strip().lower()]
-
-    if matches.empty:
-        # Try partial match
-        partial = df[
-            df["commodity"]
-            .str.lower()
-            .str.contains(commodity.strip().lower(), na=False)
-        ]
-        if partial.empty:
-            raise CommodityNotFoundError(commodity, available=available)
-        commodity = partial["commodity"].iloc[0]
-        matches = partial
-        logger.info("Partial match: '%s' resolved to '%s'", commodity, commodity)
+
+    # Resolve the name against the (few hundred) distinct commodity names
+    # rather than lower-casing / substring-scanning every row of the frame.
+    # Same literal prefix / alias rules as the price history endpoint; a
+    # misspelling is a 404, never a forecast for some other commodity.
+    resolved = CommodityIndex((name, name) for name in available).resolve(commodity)
+    if resolved is None:
+        raise CommodityNotFoundError(commodity, available=available)
+    if resolved != commodity:
+        logger.info("Commodity '%s' resolved to '%s'", commodity, resolved)
+    matches = df[df["commodity"] == resolved]
 
     sub = matches.set_index("date")[["avg_price"]]
     sub = sub[~sub.index.duplicated(keep="last")]
@@ -12,6 +12,11 @@ Updated:
     directly instead of the local PriceRecord model.
   - _run_forecast(): each forecast step includes a `confidence` field
     derived from the CI width relative to the predicted price.
+  - MarketAnalysisView._from_price_predictor_db() delegates to
+    price_predictor.market_service.get_market_movement(), which serves the
+    DailyMarketSummary written at ingestion (shared with /api/market/analysis/).
+  - HistoryView accepts ?resolution=weekly|monthly and returns OHLC buckets
+    from price_predictor.rollups.rollup_prices() for long-range charts.
 """
 
 import logging
@@ -475,38 +480,56 @@ class MetricsView(APIView):
 
 class HistoryView(APIView):
     """
-    GET /api/history/<commodity>/?days=30
+    GET /api/history/<commodity>/?days=30&resolution=daily
     Returns the last N days of actual recorded prices (from DB or CSV).
+
+    resolution=weekly | monthly returns OHLC buckets (open/high/low/close,
+    avg, volatility) instead of one point per day — use it for long ranges.
     """
 
     permission_classes = [AllowAny]
 
     def get(self, request, commodity):
+        from rest_framework.exceptions import ValidationError
+        from price_predictor.rollups import RESOLUTIONS
+
         days = request.query_params.get("days", "30")
         try:
             days = int(days)
             if days < 1 or days > 730:
                 raise ValueError
         except ValueError:
-            from rest_framework.exceptions import ValidationError
-
             raise ValidationError({"days": "Must be an integer between 1 and 730."})
 
+        resolution = request.query_params.get("resolution", "daily").lower()
+        if resolution not in RESOLUTIONS:
+            raise ValidationError(
+                {"resolution": f"Must be one of: {', '.join(RESOLUTIONS)}."}
+            )
+
         from .ml.preprocess import prepare_series
 
         df = _get_dataframe()  # DB-first, CSV fallback
         series = prepare_series(df, commodity)
         recent = series.tail(days)
 
+        if resolution == "daily":
+            data = [
+                {"date": str(d.date()), "price": round(float(p), 2)}
+                for d, p in zip(recent.index, recent.values)
+            ]
+        else:
+            from price_predictor.rollups import rollup_prices
+
+            data = rollup_prices(recent.to_frame(), resolution)
+
         return Response(
             {
                 "commodity": commodity,
                 "days": days,
-                "data_points": len(recent),
-                "data": [
-                    {"date": str(d.date()), "price": round(float(p), 2)}
-                    for d, p in zip(recent.index, recent.values)
-                ],
+                "resolution": resolution,
+                "data_points": len(data),
+                "data": data,
             }
         )
 
@@ -548,67 +571,35 @@ class MarketAnalysisView(APIView):
 
     # DB implementation (price_predictor.DailyPriceHistory)
     def _from_price_predictor_db(self):
-        from price_predictor.models import DailyPriceHistory
-        from django.db.models import Max
+        from price_predictor.market_service import get_market_movement
 
-        latest_date = DailyPriceHistory.objects.aggregate(d=Max("date"))["d"]
-        if not latest_date:
+        # Shared with /api/market/analysis/ — one joined query, cached per
+        # latest trading date. The previous trading day may not be exactly
+        # yesterday if data is sparse.
+        movement = get_market_movement()
+        if movement is None:
             raise ValueError("No DailyPriceHistory rows in price_predictor DB.")
 
-        today_qs = DailyPriceHistory.objects.filter(date=latest_date).select_related(
-            "product"
-        )
-
-        # Previous trading day (may not be exactly yesterday if data is sparse)
-        prev_date = DailyPriceHistory.objects.filter(date__lt=latest_date).aggregate(
-            d=Max("date")
-        )["d"]
-
-        prev_lookup = {}
-        if prev_date:
-            for rec in DailyPriceHistory.objects.filter(date=prev_date).select_related(
-                "product"
-            ):
-                prev_lookup[rec.product.commodityname] = rec.avg_price
-
-        changes = []
-        for rec in today_qs:
-            name = rec.product.commodityname
-            yesterday_price = prev_lookup.get(name)
-            change_pct = 0.0
-            trend = "stable"
-
-            if yesterday_price and yesterday_price > 0:
-                change_pct = round(
-                    (rec.avg_price - yesterday_price) / yesterday_price * 100, 2
-                )
-                trend = (
-                    "up" if change_pct > 0 else "down" if change_pct < 0 else "stable"
-                )
-
-            changes.append(
-                {
-                    "commodity": name,
-                    "today": rec.avg_price,
-                    "yesterday": yesterday_price,
-                    "change_percentage": change_pct,
-                    "trend": trend,
-                    "unit": rec.product.commodityunit or "kg",
-                }
-            )
-
-        up_count = sum(1 for c in changes if c["trend"] == "up")
-        down_count = sum(1 for c in changes if c["trend"] == "down")
-        market_trend = (
-            "Bullish"
-            if up_count > down_count
-            else "Bearish" if down_count > up_count else "Neutral"
-        )
+        changes = [
+            {
+                "commodity": c["commodity"],
+                "today": c["today"],
+                "yesterday": c["yesterday"],
+                "change_percentage": c["change_percentage"],
+                "trend": "stable" if c["trend"] == "same" else c["trend"],
+                "unit": c["unit"] or "kg",
+            }
+            for c in movement["changes"]
+        ]
 
         return Response(
             {
-                "today": str(latest_date),
-                "market_trend": market_trend,
+                "today": str(movement["today"]),
+                "market_trend": movement["market_trend"],
+                "volatility": {
+                    "7d": movement["volatility_7d"],
+                    "30d": movement["volatility_30d"],
+                },
                 "changes": changes,
             }
         )
@@ -659,13 +650,11 @@ class MarketAnalysisView(APIView):
                 }
             )
 
+        from price_predictor.market_service import classify_market
+
         up_count = sum(1 for c in changes if c["trend"] == "up")
         down_count = sum(1 for c in changes if c["trend"] == "down")
-        market_trend = (
-            "Bullish"
-            if up_count > down_count
-            else "Bearish" if down_count > up_count else "Neutral"
-        )
+        market_trend = classify_market(up_count, down_count)
 
         return Response(
             {
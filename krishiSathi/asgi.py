@@ -2,15 +2,55 @@
 ASGI config for krishiSathi project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; websockets under /ws/disease/jobs/ deliver async
+disease-scan results (see CropDiseaseDetection/ws.py). On lifespan startup
+the worker sweeps scan jobs lost by a previous worker (see
+CropDiseaseDetection/jobs.py).
+
+Chat and crop-suggestion traffic is best served from ASGI workers, where
+the async views under /api/chatbot/async/ keep many Ollama generations in
+flight per process:
+
+    uvicorn krishiSathi.asgi:application --host 0.0.0.0 --port 8000 --workers 2
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+import logging
 import os
 
+from asgiref.sync import sync_to_async
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'krishiSathi.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from CropDiseaseDetection.jobs import recover_stale_jobs  # noqa: E402
+from CropDiseaseDetection.ws import scan_job_websocket  # noqa: E402
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await sync_to_async(recover_stale_jobs, thread_sensitive=False)()
+            except Exception:
+                logging.getLogger(__name__).exception("Recovering stale scan jobs failed")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(scope, receive, send)
+        return
+    if scope["type"] == "websocket":
+        await scan_job_websocket(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -0,0 +1,402 @@
+"""
+Shared outbound HTTP layer.
+
+Every third-party call (OpenWeather, Kalimati, Ollama, eSewa) goes through
+a named ServiceClient instead of bare requests.get/post:
+
+    from krishiSathi.http_client import get_client
+
+    client = get_client("openweather")
+    response = client.get("/forecast", params={...})
+
+Each service gets:
+    * one pooled requests.Session (keep-alive, per-host connection pool)
+    * its own (connect, read) timeout — a call can never hang forever
+    * retries with jittered exponential backoff on connection errors,
+      timeouts and 429/502/503/504, for idempotent requests only
+    * a circuit breaker: after `breaker_threshold` consecutive failures the
+      client fails fast with CircuitOpenError for `breaker_reset` seconds,
+      then lets one trial request through. A request whose outcome is
+      unknown (cancelled, or an unexpected exception) counts as a failure,
+      and a trial that never reports back expires after `breaker_reset`,
+      so the circuit cannot stay half-open for good
+    * latency / error / retry metrics, exposed via http_metrics()
+
+Async (ASGI) views use the same client through aget/apost/arequest and
+astream, backed by an httpx.AsyncClient per event loop. Timeouts, retries,
+the circuit breaker and metrics are shared with the sync path.
+
+Relative paths are joined onto the service's base URL, which comes from
+settings (OPENWEATHER_BASE_URL, KALIMATI_BASE_URL, OLLAMA_BASE_URL,
+ESEWA_BASE_URL), so tests and local development can point any service at
+a stub server. Per-service knobs can be overridden with
+settings.OUTBOUND_HTTP = {"ollama": {"read_timeout": 300}, ...}.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "connect_timeout": 3.05,
+    "read_timeout": 10,
+    "retries": 2,
+    "backoff_base": 0.3,        # seconds; doubled per attempt, +/-50% jitter
+    "backoff_max": 5.0,
+    "breaker_threshold": 5,     # consecutive failures before opening
+    "breaker_reset": 30,        # seconds the circuit stays open
+    "pool_maxsize": 10,
+}
+
+# service name -> (base URL setting, overrides of DEFAULTS)
+SERVICES = {
+    "openweather": ("OPENWEATHER_BASE_URL", {}),
+    "kalimati": ("KALIMATI_BASE_URL", {"connect_timeout": 5, "read_timeout": 15}),
+    # Generation is slow and not idempotent enough to blindly repeat
+    "ollama": ("OLLAMA_BASE_URL", {"read_timeout": 120, "retries": 0, "breaker_threshold": 3}),
+    "esewa": ("ESEWA_BASE_URL", {"connect_timeout": 5, "read_timeout": 15, "retries": 1}),
+}
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Latency samples kept per service for percentiles
+LATENCY_WINDOW = 200
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised without touching the network while a service's circuit is open.
+    Subclasses ConnectionError so existing "upstream unreachable" handling
+    applies unchanged.
+    """
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_after:
+                self.state = self.HALF_OPEN  # let one trial request through
+                self.trial_started = now
+                return True
+            if self.state == self.HALF_OPEN and now - self.trial_started >= self.reset_after:
+                self.trial_started = now  # the last trial never reported back
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ServiceClient:
+    def __init__(self, name: str, base_url: str, **config):
+        self.name = name
+        self.base_url = (base_url or "").rstrip("/")
+        self.config = {**DEFAULTS, **config}
+        self.breaker = CircuitBreaker(
+            self.config["breaker_threshold"], self.config["breaker_reset"]
+        )
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4, pool_maxsize=self.config["pool_maxsize"], max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # httpx pools are bound to the loop that created them
+        self._async_clients = weakref.WeakKeyDictionary()
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "short_circuited": 0,
+            "status_codes": {},
+        }
+
+    @property
+    def timeout(self):
+        return (self.config["connect_timeout"], self.config["read_timeout"])
+
+    def url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def request(self, method, path, retry=None, **kwargs) -> requests.Response:
+        """
+        Send a request through the pool. `retry` forces retrying on/off;
+        by default only idempotent methods are retried. Raises like
+        requests does (call raise_for_status() as before), plus
+        CircuitOpenError when the service is failing.
+        """
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.config["retries"] if retry else 0)
+        url = self.url(path)
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self._count("short_circuited")
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit open).")
+
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                self._record(time.monotonic() - started, None)
+                self.breaker.record_failure()
+                if attempt + 1 < attempts:
+                    self._backoff(attempt, url, exc)
+                    continue
+                raise
+            except BaseException:
+                # Outcome unknown: count it, so a half-open trial is settled
+                self.breaker.record_failure()
+                raise
+
+            self._record(time.monotonic() - started, response.status_code)
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if response.status_code in RETRY_STATUSES and attempt + 1 < attempts:
+                response.close()
+                self._backoff(attempt, url, f"HTTP {response.status_code}")
+                continue
+            return response
+
+    # -- asyncio -------------------------------------------------------
+
+    def _async_client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            size = self.config["pool_maxsize"]
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=size, max_keepalive_connections=size)
+            )
+            self._async_clients[loop] = client
+        return client
+
+    def _async_timeout(self, timeout):
+        import httpx
+
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        return httpx.Timeout(read, connect=connect)
+
+    async def aget(self, path, **kwargs):
+        return await self.arequest("GET", path, **kwargs)
+
+    async def apost(self, path, **kwargs):
+        return await self.arequest("POST", path, **kwargs)
+
+    async def arequest(self, method, path, retry=None, **kwargs):
+        """
+        Async counterpart of request(), returning an httpx.Response.
+        Transport failures raise httpx.TransportError subclasses.
+        """
+        import httpx
+
+        method = method.upper()
+        kwargs["timeout"] = self._async_timeout(kwargs.get("timeout", self.timeout))
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.config["retries"] if retry else 0)
+        url = self.url(path)
+        client = self._async_client()
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self._count("short_circuited")
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit open).")
+
+            started = time.monotonic()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as exc:
+                self._record(time.monotonic() - started, None)
+                self.breaker.record_failure()
+                if attempt + 1 < attempts:
+                    await asyncio.sleep(self._backoff_delay(attempt, url, exc))
+                    continue
+                raise
+            except BaseException:
+                # Cancelled (client went away) or unexpected: count it, so a
+                # half-open trial is settled
+                self.breaker.record_failure()
+                raise
+
+            self._record(time.monotonic() - started, response.status_code)
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if response.status_code in RETRY_STATUSES and attempt + 1 < attempts:
+                await asyncio.sleep(
+                    self._backoff_delay(attempt, url, f"HTTP {response.status_code}")
+                )
+                continue
+            return response
+
+    @asynccontextmanager
+    async def astream(self, method, path, **kwargs):
+        """
+        Streamed async request (never retried): yields an httpx.Response
+        whose body is read with aiter_lines()/aiter_bytes().
+        """
+        import httpx
+
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open).")
+
+        kwargs["timeout"] = self._async_timeout(kwargs.get("timeout", self.timeout))
+        started = time.monotonic()
+        connected = False
+        try:
+            async with self._async_client().stream(method.upper(), self.url(path), **kwargs) as response:
+                connected = True
+                self._record(time.monotonic() - started, response.status_code)
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                yield response
+        except httpx.TransportError:
+            if not connected:
+                self._record(time.monotonic() - started, None)
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or failed before the response arrived; once it has,
+            # the outcome is already recorded and errors are the caller's
+            if not connected:
+                self.breaker.record_failure()
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, status_codes=dict(self._stats["status_codes"]))
+            latencies = sorted(self._latencies)
+
+        def percentile(q):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+        return {
+            **stats,
+            "error_rate": round(stats["errors"] / stats["requests"], 4) if stats["requests"] else 0.0,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+            "circuit": self.breaker.state,
+            "base_url": self.base_url,
+        }
+
+    def _backoff_delay(self, attempt, url, reason) -> float:
+        delay = min(
+            self.config["backoff_max"],
+            self.config["backoff_base"] * (2 ** attempt) * random.uniform(0.5, 1.5),
+        )
+        logger.warning("%s: retrying %s in %.2fs (%s)", self.name, url, delay, reason)
+        self._count("retries")
+        return delay
+
+    def _backoff(self, attempt, url, reason):
+        time.sleep(self._backoff_delay(attempt, url, reason))
+
+    def _record(self, elapsed, status_code):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._latencies.append(elapsed)
+            if status_code is None or status_code >= 500:
+                self._stats["errors"] += 1
+            if status_code is not None:
+                codes = self._stats["status_codes"]
+                codes[status_code] = codes.get(status_code, 0) + 1
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str) -> ServiceClient:
+    """Process-wide client for one of SERVICES (created on first use)."""
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        if name not in _clients:
+            url_setting, overrides = SERVICES[name]
+            config = {**overrides, **getattr(settings, "OUTBOUND_HTTP", {}).get(name, {})}
+            _clients[name] = ServiceClient(
+                name, getattr(settings, url_setting, ""), **config
+            )
+        return _clients[name]
+
+
+def http_metrics() -> dict:
+    """Per-upstream metrics for every client used in this process."""
+    return {name: client.stats() for name, client in sorted(_clients.items())}
+
+
+def reset_clients():
+    """Drop all clients (tests: pick up changed settings / stub URLs)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
@@ -244,7 +244,7 @@ SIMPLE_JWT = {
 }
 
 # Ollama settings
-OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_BASE_URL = config("OLLAMA_BASE_URL", default="http://host.docker.internal:11434")
 OLLAMA_MODEL = "llama3.2"           
 OLLAMA_VISION_MODEL = "llava" 
 
@@ -256,6 +256,13 @@ ESEWA_PRODUCT_CODE = config("ESEWA_PRODUCT_CODE")
 ESEWA_BASE_URL = config("ESEWA_BASE_URL")
 DOMAIN = config("DOMAIN")
 
+# Outbound HTTP (krishiSathi/http_client.py). Base URLs can point at local
+# stub servers; OUTBOUND_HTTP overrides per-service timeouts / retries, e.g.
+# {"ollama": {"read_timeout": 300}}
+OPENWEATHER_BASE_URL = config("OPENWEATHER_BASE_URL", default="https://api.openweathermap.org/data/2.5")
+KALIMATI_BASE_URL = config("KALIMATI_BASE_URL", default="https://kalimatimarket.gov.np")
+OUTBOUND_HTTP = {}
+
 # Directory where trained model .pkl files are saved
 MODELS_DIR = BASE_DIR / 'kalimati_forecast' / 'models_ml'
 MODELS_DIR.mkdir(exist_ok=True)
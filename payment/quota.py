@@ -1,14 +1,17 @@
 # payment/quota.py
+from django.db.models import F
 from django.utils.timezone import now
 from rest_framework.response import Response
 from .models import DailyUsage, DAILY_LIMITS
 
 
-def check_and_increment_quota(user, feature):
+def check_and_increment_quota(user, feature, amount=1):
     """
     Call this at the start of every protected feature view.
     Returns None if allowed, or a DRF Response(403) if the free limit is hit.
     PRO users are always allowed (returns None immediately).
+    `amount` charges several uses at once (e.g. a bulk scan of N images);
+    the request is blocked unless all of them fit in the remaining quota.
     """
     # PRO users: skip all checks
     try:
@@ -25,17 +28,38 @@ def check_and_increment_quota(user, feature):
         user=user, feature=feature, date=now().date()
     )
 
-    if usage.count >= limit:
+    if usage.count + amount > limit:
         return Response(
             {
                 "error": f"Daily limit of {limit} reached for {feature.replace('_', ' ')}.",
                 "limit": limit,
                 "used": usage.count,
+                "requested": amount,
                 "upgrade_url": "/pricing",
             },
             status=403,
         )
 
-    usage.count += 1
+    usage.count += amount
     usage.save(update_fields=["count"])
     return None
+
+
+def refund_quota(user, feature, amount=1):
+    """
+    Give back uses charged by check_and_increment_quota() for a request the
+    server itself turned away (e.g. the LLM was overloaded), so the user is
+    not charged for a 503.
+    """
+    try:
+        if user.subscription.is_pro:
+            return
+    except Exception:
+        pass  # no subscription row = FREE
+
+    if DAILY_LIMITS.get(feature) is None:
+        return
+
+    DailyUsage.objects.filter(
+        user=user, feature=feature, date=now().date(), count__gte=amount
+    ).update(count=F("count") - amount)
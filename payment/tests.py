@@ -1,3 +1,42 @@
 from django.test import TestCase
 
-# Create your tests here.
+from authentication.models import User
+
+from .models import DAILY_LIMITS, DailyUsage, Subscription
+from .quota import check_and_increment_quota, refund_quota
+
+
+class QuotaTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("Farmer", "farmer@example.com", "9800000000", "pw")
+
+    def used(self, feature="chatbot"):
+        return DailyUsage.objects.get(user=self.user, feature=feature).count
+
+    def test_multi_use_charge_must_fit_remaining_quota(self):
+        limit = DAILY_LIMITS["disease_detection"]
+        self.assertIsNone(check_and_increment_quota(self.user, "disease_detection", amount=limit - 1))
+
+        blocked = check_and_increment_quota(self.user, "disease_detection", amount=2)
+        self.assertEqual(blocked.status_code, 403)
+        self.assertEqual((blocked.data["used"], blocked.data["requested"]), (limit - 1, 2))
+        self.assertEqual(self.used("disease_detection"), limit - 1)
+
+    def test_refund_gives_back_a_use(self):
+        check_and_increment_quota(self.user, "chatbot")
+        check_and_increment_quota(self.user, "chatbot")
+        refund_quota(self.user, "chatbot")
+        self.assertEqual(self.used(), 1)
+
+    def test_refund_never_goes_below_zero(self):
+        check_and_increment_quota(self.user, "chatbot")
+        refund_quota(self.user, "chatbot", amount=2)
+        self.assertEqual(self.used(), 1)
+        refund_quota(self.user, "weather_irrigation")
+        self.assertFalse(DailyUsage.objects.filter(feature="weather_irrigation").exists())
+
+    def test_pro_users_are_neither_charged_nor_refunded(self):
+        Subscription.objects.create(user=self.user, plan=Subscription.Plan.PRO)
+        self.assertIsNone(check_and_increment_quota(self.user, "chatbot"))
+        refund_quota(self.user, "chatbot")
+        self.assertFalse(DailyUsage.objects.exists())
@@ -12,6 +12,8 @@ import requests
 
 from django.conf import settings
 
+from krishiSathi.http_client import get_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -126,7 +128,7 @@ def verify_payment_with_esewa(transaction_uuid: str, total_amount: str) -> dict:
         requests.RequestException : Network or timeout errors
         ValueError                : Unexpected response format
     """
-    verify_url = f"{settings.ESEWA_BASE_URL}/api/epay/transaction/status/"
+    verify_url = "/api/epay/transaction/status/"
     params = {
         "product_code"    : settings.ESEWA_PRODUCT_CODE,
         "transaction_uuid": transaction_uuid,
@@ -136,11 +138,8 @@ def verify_payment_with_esewa(transaction_uuid: str, total_amount: str) -> dict:
     logger.info("Verifying payment with eSewa API | txn=%s", transaction_uuid)
 
     try:
-        response = requests.get(
-            verify_url,
-            params=params,
-            timeout=15,  # 15 second timeout
-        )
+        # Pooled client: 15s read timeout, one retry, circuit breaker
+        response = get_client("esewa").get(verify_url, params=params)
         response.raise_for_status()
         data = response.json()
         logger.info("eSewa verification response | txn=%s | status=%s", transaction_uuid, data.get("status"))
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MasterProduct, DailyPriceHistory
+from .models import MasterProduct, DailyPriceHistory, DailyMarketSummary
 @admin.register(MasterProduct)
 class MasterProductAdmin(admin.ModelAdmin):
     list_display = (
@@ -15,3 +15,13 @@ class DailyPriceHistoryAdmin(admin.ModelAdmin):
     list_filter = ("date", "product")
     search_fields = ("product__commodityname",)
     ordering = ("-date",)
+
+@admin.register(DailyMarketSummary)
+class DailyMarketSummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        "date", "market_trend", "up_count", "down_count",
+        "avg_change_percentage", "volatility_7d", "volatility_30d",
+    )
+    list_filter = ("market_trend",)
+    ordering = ("-date",)
+    readonly_fields = ("created_at", "updated_at")
@@ -0,0 +1,220 @@
+"""
+In-memory commodity name resolution.
+
+MasterProduct holds a few hundred commodity names, so every lookup that
+used to be a LIKE '%..%' join, a DRF SearchFilter or a pandas substring
+scan over price history can instead be answered from a small prefix +
+trigram index kept in process memory.
+
+Matching order (best first):
+    1. exact name            "tomato big(nepali)"
+    2. name prefix           "tomato b"
+    3. word prefix           "big"          -> "Tomato Big(Nepali)"
+    4. substring             "mato"
+    5. trigram similarity    "tomatoe", "cauliflwer"   (search() only)
+Only search() - i.e. autocomplete - ever suggests a fuzzy match; resolve()
+and matching_keys() answer with literal matches or nothing, so a typo never
+returns another commodity's prices.
+Local names are mapped through COMMODITY_ALIASES first ("golbheda" -> "tomato").
+"""
+
+import re
+import threading
+import time
+
+# Nepali / alternative names -> the word Kalimati uses in commodityname
+COMMODITY_ALIASES = {
+    "golbheda": "tomato",
+    "gol bheda": "tomato",
+    "aalu": "potato",
+    "alu": "potato",
+    "pyaj": "onion",
+    "pyaaj": "onion",
+    "kauli": "cauli",
+    "cauliflower": "cauli",
+    "banda": "cabbage",
+    "bhanta": "brinjal",
+    "eggplant": "brinjal",
+    "khursani": "chilli",
+    "chili": "chilli",
+    "lasun": "garlic",
+    "aduwa": "ginger",
+    "kakro": "cucumber",
+    "gajar": "carrot",
+    "mula": "raddish",
+    "radish": "raddish",
+    "simi": "bean",
+    "karela": "bitter gourd",
+    "lauka": "bottle gourd",
+    "ghiraula": "sponge gourd",
+    "farsi": "pumpkin",
+    "bhindi": "okra",
+    "ramtoriya": "okra",
+    "matar": "pea",
+    "kerau": "pea",
+    "dhaniya": "coriander",
+    "kera": "banana",
+    "syau": "apple",
+    "suntala": "orange",
+    "kagati": "lime",
+    "aanp": "mango",
+    "chyau": "mushroom",
+}
+
+# Rebuild at most this often so names added by another worker show up
+INDEX_TTL_SECONDS = 300
+
+# Minimum share of query trigrams a name must contain to match fuzzily
+FUZZY_THRESHOLD = 0.4
+
+# Rank values returned by CommodityIndex.search()
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalise(name: str) -> str:
+    """Lower-case, punctuation-free, single-spaced form of a commodity name."""
+    return _NON_WORD.sub(" ", str(name).lower()).strip()
+
+
+def _trigrams(text: str) -> set:
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class CommodityIndex:
+    """
+    Prefix / trigram index over a fixed list of commodity names.
+
+    `entries` is an iterable of (key, name) pairs; the key is whatever the
+    caller wants back (a MasterProduct id, or the name itself).
+    """
+
+    def __init__(self, entries):
+        self._entries = []          # [(key, name, normalised)]
+        self._exact = {}            # normalised -> [i]
+        self._prefix = {}           # word prefix -> {i}
+        self._trigram = {}          # trigram -> {i}
+
+        for i, (key, name) in enumerate(entries):
+            norm = normalise(name)
+            self._entries.append((key, name, norm))
+            self._exact.setdefault(norm, []).append(i)
+            for word in norm.split():
+                for end in range(1, len(word) + 1):
+                    self._prefix.setdefault(word[:end], set()).add(i)
+            for gram in _trigrams(norm):
+                self._trigram.setdefault(gram, set()).add(i)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Ranked matches for `query` as [(rank, key, name)], best first.
+        Fuzzy matches are only returned when nothing matches literally.
+        """
+        norm = self._expand_alias(normalise(query))
+        if not norm:
+            return []
+
+        ranked = {}
+        for i in self._exact.get(norm, []):
+            ranked[i] = (EXACT, 0.0)
+
+        # Every query word must prefix some word of the name
+        candidates = set.intersection(
+            *(self._prefix.get(word, set()) for word in norm.split())
+        )
+        for i in candidates:
+            rank = PREFIX if self._entries[i][2].startswith(norm) else WORD_PREFIX
+            ranked.setdefault(i, (rank, 0.0))
+
+        # Mid-word substrings ("mato") — names are few, so a scan is cheap
+        for i, (_, _, entry_norm) in enumerate(self._entries):
+            if i not in ranked and norm in entry_norm:
+                ranked[i] = (SUBSTRING, 0.0)
+
+        if not ranked:
+            ranked = {i: (FUZZY, -sim) for i, sim in self._fuzzy(norm)}
+
+        order = sorted(
+            ranked,
+            key=lambda i: (*ranked[i], len(self._entries[i][2]), self._entries[i][1]),
+        )
+        if limit:
+            order = order[:limit]
+        return [(ranked[i][0], self._entries[i][0], self._entries[i][1]) for i in order]
+
+    def resolve(self, query: str):
+        """Key of the single best literal match for `query`, or None."""
+        matches = self.search(query, limit=1)
+        if matches and matches[0][0] <= SUBSTRING:
+            return matches[0][1]
+        return None
+
+    def matching_keys(self, query: str) -> list:
+        """
+        Keys of every literal match (what a substring search would return);
+        empty when only fuzzy matches exist.
+        """
+        matches = self.search(query, limit=None)
+        return [key for rank, key, _ in matches if rank <= SUBSTRING]
+
+    def _expand_alias(self, norm: str) -> str:
+        if norm in COMMODITY_ALIASES:
+            return COMMODITY_ALIASES[norm]
+        return " ".join(COMMODITY_ALIASES.get(word, word) for word in norm.split())
+
+    def _fuzzy(self, norm: str):
+        grams = _trigrams(norm)
+        overlap = {}
+        for gram in grams:
+            for i in self._trigram.get(gram, ()):
+                overlap[i] = overlap.get(i, 0) + 1
+
+        # Share of the query's trigrams found in the name, so a misspelt
+        # word still scores well against long multi-word names.
+        for i, shared in overlap.items():
+            sim = shared / len(grams)
+            if sim >= FUZZY_THRESHOLD:
+                yield i, sim
+
+
+# Process-wide index over MasterProduct
+
+_lock = threading.Lock()
+_index = None
+_built_at = 0.0
+
+
+def get_commodity_index() -> CommodityIndex:
+    """
+    Index over MasterProduct keyed by product id (built lazily, one query).
+    Rebuilt after INDEX_TTL_SECONDS or invalidate_commodity_index().
+    """
+    global _index, _built_at
+
+    index = _index
+    if index is not None and time.monotonic() - _built_at < INDEX_TTL_SECONDS:
+        return index
+
+    with _lock:
+        if _index is None or time.monotonic() - _built_at >= INDEX_TTL_SECONDS:
+            from .models import MasterProduct
+
+            _index = CommodityIndex(
+                MasterProduct.objects.values_list("id", "commodityname")
+            )
+            _built_at = time.monotonic()
+        return _index
+
+
+def invalidate_commodity_index():
+    """Force a rebuild on next use (call after new commodities are ingested)."""
+    global _index
+    _index = None
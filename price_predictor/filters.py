@@ -1,5 +1,7 @@
 import django_filters
+from rest_framework.filters import BaseFilterBackend
 from .models import MasterProduct
+from .commodity_index import get_commodity_index
 
 class MasterProductFilter(django_filters.FilterSet):
     min_price_gte = django_filters.NumberFilter(
@@ -12,3 +14,18 @@ class MasterProductFilter(django_filters.FilterSet):
     class Meta:
         model = MasterProduct
         fields = []
+
+
+class CommoditySearchFilter(BaseFilterBackend):
+    """
+    ?search=<name> resolved through the in-memory commodity index
+    (prefix and alias aware) instead of an ICONTAINS scan.
+    """
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        ids = get_commodity_index().matching_keys(query)
+        return queryset.filter(pk__in=ids)
@@ -0,0 +1,57 @@
+"""
+Backfill DailyMarketSummary rows from existing DailyPriceHistory.
+
+The market-price fetch keeps the summary current for every new date;
+this command is for history ingested before summaries existed, or after
+bulk edits to past prices:
+
+    python manage.py build_market_summaries              # missing dates only
+    python manage.py build_market_summaries --rebuild    # every date
+    python manage.py build_market_summaries --date 2026-04-29
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from price_predictor.market_service import build_daily_market_summary
+from price_predictor.models import DailyPriceHistory, DailyMarketSummary
+
+
+class Command(BaseCommand):
+    help = "Materialise DailyMarketSummary rows for ingested trading dates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Build a single date (YYYY-MM-DD).")
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Rebuild summaries that already exist as well.",
+        )
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                dates = [datetime.strptime(options["date"], "%Y-%m-%d").date()]
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format.")
+        else:
+            dates = (
+                DailyPriceHistory.objects.values_list("date", flat=True)
+                .distinct()
+                .order_by("date")
+            )
+            if not options["rebuild"]:
+                dates = dates.exclude(
+                    date__in=DailyMarketSummary.objects.values("date")
+                )
+            dates = list(dates)
+
+        for trading_date in dates:
+            summary = build_daily_market_summary(trading_date)
+            self.stdout.write(
+                f"{trading_date}: {summary.market_trend} "
+                f"({summary.up_count} up / {summary.down_count} down)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Built {len(dates)} summaries."))
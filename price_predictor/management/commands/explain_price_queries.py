@@ -0,0 +1,124 @@
+"""
+Print the query plan of every hot price query.
+
+Runs each read path the price endpoints use, captures the SQL Django
+actually sends, and prints EXPLAIN ANALYZE for it. Point it at a local
+database seeded with realistic history (e.g. a restored production dump):
+
+    python manage.py explain_price_queries
+    python manage.py explain_price_queries --commodity Tomato --no-analyze
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from price_predictor.commodity_index import get_commodity_index
+from price_predictor.market_service import (
+    get_latest_trading_dates,
+    movement_rows,
+    stored_summary,
+    volatility_rows,
+)
+from price_predictor.models import DailyPriceHistory, MasterProduct
+
+
+class Command(BaseCommand):
+    help = "Print EXPLAIN (ANALYZE) output for the hot price-history queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--commodity",
+            default="Tomato",
+            help="Commodity name used by the per-commodity history queries.",
+        )
+        parser.add_argument(
+            "--no-analyze",
+            action="store_true",
+            help="Print the planner estimate only, without executing the query.",
+        )
+
+    def handle(self, *args, **options):
+        commodity = options["commodity"]
+        analyze = not options["no_analyze"]
+
+        if not DailyPriceHistory.objects.exists():
+            self.stderr.write(
+                self.style.WARNING(
+                    "DailyPriceHistory is empty — plans will not be representative. "
+                    "Seed the local DB first."
+                )
+            )
+
+        latest, previous = get_latest_trading_dates()
+        today = timezone.now().date()
+        # An empty table still yields plans, just not representative ones
+        latest = latest or today
+        month_ago = today - timedelta(days=30)
+
+        hot_paths = [
+            ("latest / previous trading date", get_latest_trading_dates),
+            # The same querysets market_service runs
+            ("analysis: stored daily summary", lambda: stored_summary(latest)),
+            (
+                "analysis: movement rows (live / summary build)",
+                lambda: list(movement_rows(latest, previous)),
+            ),
+            (
+                "analysis: rolling volatility window",
+                lambda: list(volatility_rows(latest)),
+            ),
+            (
+                "stats: products updated today",
+                lambda: DailyPriceHistory.objects.filter(date=today).count(),
+            ),
+            ("stats: total products", lambda: MasterProduct.objects.count()),
+            (
+                "history: last month for commodity",
+                lambda: list(
+                    DailyPriceHistory.objects.filter(
+                        product_id__in=get_commodity_index().matching_keys(commodity),
+                        date__gte=month_ago,
+                    ).order_by("date")
+                ),
+            ),
+            (
+                "forecast: full history load",
+                lambda: list(
+                    DailyPriceHistory.objects.values(
+                        "date", "avg_price", "min_price", "max_price",
+                        "product__commodityname",
+                    ).order_by("date")
+                ),
+            ),
+            (
+                "latest prices list",
+                lambda: list(MasterProduct.objects.order_by("commodityname")),
+            ),
+        ]
+
+        for label, run in hot_paths:
+            with CaptureQueriesContext(connection) as ctx:
+                run()
+
+            for query in ctx.captured_queries:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label}"))
+                self.stdout.write(query["sql"])
+                self.stdout.write(self._explain(query["sql"], analyze))
+
+    def _explain(self, sql: str, analyze: bool) -> str:
+        if connection.vendor == "postgresql":
+            prefix = "EXPLAIN (ANALYZE, BUFFERS)" if analyze else "EXPLAIN"
+        elif connection.vendor == "sqlite":
+            prefix = "EXPLAIN QUERY PLAN"
+        else:
+            prefix = "EXPLAIN"
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}")
+            rows = cursor.fetchall()
+
+        return "\n".join(" | ".join(str(col) for col in row) for row in rows)
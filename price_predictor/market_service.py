@@ -0,0 +1,307 @@
+"""
+Shared market-data queries for the price predictor.
+
+Kept separate from the views so price_predictor, kalimati_forecast and the
+admin panel all resolve trading dates and day-over-day price movement the
+same (index-friendly, cached) way.
+"""
+
+import statistics
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Max, Min, OuterRef, Subquery
+
+from .models import DailyPriceHistory, DailyMarketSummary
+
+# Movement for a given trading day only changes when that day or the one
+# before it is re-fetched; invalidate_market_movement() drops both entries.
+MARKET_MOVEMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Rolling windows (calendar days) for the volatility figures
+VOLATILITY_WINDOWS = (7, 30)
+
+
+def get_latest_trading_dates():
+    """
+    Return (latest_date, previous_date) from DailyPriceHistory.
+
+    Both values come from MAX(date) lookups that are answered from the
+    date-leading index, instead of a DISTINCT scan over the whole table.
+    Either value may be None when there is not enough history.
+    """
+    latest = DailyPriceHistory.objects.aggregate(d=Max("date"))["d"]
+    if latest is None:
+        return None, None
+
+    return latest, _previous_trading_date(latest)
+
+
+def _previous_trading_date(latest):
+    return DailyPriceHistory.objects.filter(date__lt=latest).aggregate(
+        d=Max("date")
+    )["d"]
+
+
+def _next_trading_date(trading_date):
+    return DailyPriceHistory.objects.filter(date__gt=trading_date).aggregate(
+        d=Min("date")
+    )["d"]
+
+
+def classify_market(up_count: int, down_count: int) -> str:
+    """Bullish / Bearish / Neutral from the number of rising vs falling items."""
+    if up_count > down_count:
+        return "Bullish"
+    if down_count > up_count:
+        return "Bearish"
+    return "Neutral"
+
+
+def _movement_cache_key(latest_date) -> str:
+    return f"market_movement:{latest_date.isoformat()}"
+
+
+def invalidate_market_movement(trading_date):
+    """
+    Drop the cached movement for a day whose prices were (re)ingested, and
+    for the next stored trading day, which is compared against it.
+    """
+    keys = [_movement_cache_key(trading_date)]
+    following = _next_trading_date(trading_date)
+    if following is not None:
+        keys.append(_movement_cache_key(following))
+    cache.delete_many(keys)
+
+
+def get_market_movement():
+    """
+    Today-vs-previous-trading-day price movement for every commodity.
+
+    Returns None when there is no history at all, otherwise:
+        {
+            "today":      date,
+            "yesterday":  date | None,
+            "market_trend": "Bullish" | "Bearish" | "Neutral",
+            "up_count":   int,
+            "down_count": int,
+            "volatility_7d":  float | None,
+            "volatility_30d": float | None,
+            "changes": [
+                {"commodity", "unit", "today", "yesterday",
+                 "change_percentage", "trend" ("up" | "down" | "same"),
+                 "volatility_7d", "volatility_30d"},
+                ...
+            ],
+        }
+
+    Served from the DailyMarketSummary row written at ingestion time. A
+    cache hit costs one MAX(date) query, a miss one more to read the
+    summary. Dates ingested before summaries existed are computed live.
+    """
+    latest = DailyPriceHistory.objects.aggregate(d=Max("date"))["d"]
+    if latest is None:
+        return None
+
+    key = _movement_cache_key(latest)
+    movement = cache.get(key)
+    if movement is None:
+        summary = stored_summary(latest)
+        if summary is not None:
+            movement = _movement_from_summary(summary)
+        else:
+            movement = _compute_market_movement(
+                latest, _previous_trading_date(latest)
+            )
+        cache.set(key, movement, MARKET_MOVEMENT_CACHE_TIMEOUT)
+    return movement
+
+
+def build_daily_market_summary(trading_date) -> DailyMarketSummary:
+    """
+    (Re)materialise the DailyMarketSummary for one ingested trading day.
+
+    Called by the market-price fetch after it writes the day's history;
+    read endpoints never call this.
+    """
+    movement = _compute_market_movement(
+        trading_date, _previous_trading_date(trading_date)
+    )
+    changes = movement["changes"]
+    pct_changes = [c["change_percentage"] for c in changes]
+
+    summary, _ = DailyMarketSummary.objects.update_or_create(
+        date=trading_date,
+        defaults={
+            "previous_date": movement["yesterday"],
+            "market_trend": movement["market_trend"],
+            "commodity_count": len(changes),
+            "up_count": movement["up_count"],
+            "down_count": movement["down_count"],
+            "unchanged_count": len(changes)
+            - movement["up_count"]
+            - movement["down_count"],
+            "avg_change_percentage": (
+                round(statistics.fmean(pct_changes), 2) if pct_changes else 0.0
+            ),
+            "volatility_7d": movement["volatility_7d"],
+            "volatility_30d": movement["volatility_30d"],
+            "changes": changes,
+        },
+    )
+    invalidate_market_movement(trading_date)
+    return summary
+
+
+def rebuild_market_summaries(trading_date) -> list:
+    """
+    Build the summary for an ingested day and rebuild the stored trading
+    days whose comparison or volatility windows include it: the next
+    trading day compares against `trading_date`, and every day up to the
+    widest volatility window later has its returns in the window.
+
+    Returns the rebuilt DailyMarketSummary rows, `trading_date` first.
+    """
+    horizon = trading_date + timedelta(days=max(VOLATILITY_WINDOWS))
+    following = (
+        DailyPriceHistory.objects.filter(date__gt=trading_date, date__lte=horizon)
+        .values_list("date", flat=True)
+        .distinct()
+        .order_by("date")
+    )
+    return [
+        build_daily_market_summary(day) for day in [trading_date, *following]
+    ]
+
+
+def stored_summary(trading_date):
+    """The DailyMarketSummary row for `trading_date`, or None."""
+    return DailyMarketSummary.objects.filter(date=trading_date).first()
+
+
+def movement_rows(latest, previous):
+    """
+    Per-commodity rows of `latest` with the `previous` day's average
+    alongside (one correlated subquery, no second pass).
+    """
+    previous_price = DailyPriceHistory.objects.filter(
+        product=OuterRef("product"), date=previous
+    ).values("avg_price")[:1]
+
+    return (
+        DailyPriceHistory.objects.filter(date=latest)
+        .annotate(previous_avg=Subquery(previous_price))
+        .values(
+            "product_id",
+            "avg_price",
+            "previous_avg",
+            commodity=F("product__commodityname"),
+            unit=F("product__commodityunit"),
+        )
+        .order_by("product__commodityname")
+    )
+
+
+def volatility_rows(latest):
+    """(product_id, date, avg_price) over the widest volatility window ending at `latest`."""
+    widest = max(VOLATILITY_WINDOWS)
+    return (
+        DailyPriceHistory.objects.filter(
+            date__gt=latest - timedelta(days=widest), date__lte=latest
+        )
+        .values_list("product_id", "date", "avg_price")
+        .order_by("product_id", "date")
+    )
+
+
+def _movement_from_summary(summary: DailyMarketSummary) -> dict:
+    return {
+        "today": summary.date,
+        "yesterday": summary.previous_date,
+        "market_trend": summary.market_trend,
+        "up_count": summary.up_count,
+        "down_count": summary.down_count,
+        "volatility_7d": summary.volatility_7d,
+        "volatility_30d": summary.volatility_30d,
+        "changes": summary.changes,
+    }
+
+
+def _compute_market_movement(latest, previous) -> dict:
+    rows = movement_rows(latest, previous)
+    volatility = _rolling_volatility(latest)
+
+    changes = []
+    up_count = down_count = 0
+
+    for row in rows:
+        today_avg = row["avg_price"]
+        y_avg = row["previous_avg"]
+
+        if y_avg and y_avg > 0:
+            change_pct = (today_avg - y_avg) / y_avg * 100
+        else:
+            change_pct = 0.0
+
+        # Classify before rounding so small moves still count as up / down
+        trend = "up" if change_pct > 0 else "down" if change_pct < 0 else "same"
+        if trend == "up":
+            up_count += 1
+        elif trend == "down":
+            down_count += 1
+
+        vol = volatility.get(row["product_id"], {})
+        changes.append(
+            {
+                "commodity": row["commodity"],
+                "unit": row["unit"],
+                "today": today_avg,
+                "yesterday": y_avg,
+                "change_percentage": round(change_pct, 2),
+                "trend": trend,
+                "volatility_7d": vol.get(7),
+                "volatility_30d": vol.get(30),
+            }
+        )
+
+    return {
+        "today": latest,
+        "yesterday": previous,
+        "market_trend": classify_market(up_count, down_count),
+        "up_count": up_count,
+        "down_count": down_count,
+        "volatility_7d": _market_volatility(changes, "volatility_7d"),
+        "volatility_30d": _market_volatility(changes, "volatility_30d"),
+        "changes": changes,
+    }
+
+
+def _rolling_volatility(latest) -> dict:
+    """
+    {product_id: {7: stdev, 30: stdev}} of daily % price changes in the
+    trailing windows ending at `latest`. One query over the widest window.
+    """
+    returns = defaultdict(list)
+    last_price = {}
+    for product_id, day, price in volatility_rows(latest):
+        prev = last_price.get(product_id)
+        if prev and prev > 0:
+            returns[product_id].append((day, (price - prev) / prev * 100))
+        last_price[product_id] = price
+
+    result = {}
+    for product_id, series in returns.items():
+        result[product_id] = {}
+        for window in VOLATILITY_WINDOWS:
+            start = latest - timedelta(days=window)
+            values = [r for day, r in series if day > start]
+            result[product_id][window] = (
+                round(statistics.stdev(values), 2) if len(values) >= 2 else None
+            )
+    return result
+
+
+def _market_volatility(changes: list, field: str):
+    values = [c[field] for c in changes if c[field] is not None]
+    return round(statistics.fmean(values), 2) if values else None
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('price_predictor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailypricehistory',
+            index=models.Index(fields=['date', 'product'], name='dph_date_product_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('price_predictor', '0002_dailypricehistory_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMarketSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('previous_date', models.DateField(blank=True, null=True)),
+                ('market_trend', models.CharField(max_length=10)),
+                ('commodity_count', models.PositiveIntegerField(default=0)),
+                ('up_count', models.PositiveIntegerField(default=0)),
+                ('down_count', models.PositiveIntegerField(default=0)),
+                ('unchanged_count', models.PositiveIntegerField(default=0)),
+                ('avg_change_percentage', models.FloatField(default=0)),
+                ('volatility_7d', models.FloatField(blank=True, null=True)),
+                ('volatility_30d', models.FloatField(blank=True, null=True)),
+                ('changes', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+    ]
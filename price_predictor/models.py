@@ -39,6 +39,45 @@ class DailyPriceHistory(models.Model):
     class Meta:
         unique_together = ("product", "date")
         ordering = ["-date"]
+        indexes = [
+            # unique_together gives a (product, date) index; analysis and
+            # stats queries filter by date first, so they need date-leading.
+            models.Index(fields=["date", "product"], name="dph_date_product_idx"),
+        ]
 
     def __str__(self):
         return f"{self.product.commodityname} - {self.date}"
+
+class DailyMarketSummary(models.Model):
+    """
+    Materialised market analysis for one trading day.
+    Written once per ingested date by the market-price fetch (and the
+    build_market_summaries backfill); the analysis endpoints only read it.
+    """
+    date = models.DateField(unique=True)
+    previous_date = models.DateField(null=True, blank=True)
+
+    # Market-wide aggregates
+    market_trend = models.CharField(max_length=10)
+    commodity_count = models.PositiveIntegerField(default=0)
+    up_count = models.PositiveIntegerField(default=0)
+    down_count = models.PositiveIntegerField(default=0)
+    unchanged_count = models.PositiveIntegerField(default=0)
+    avg_change_percentage = models.FloatField(default=0)
+
+    # Mean of the per-commodity std-dev of daily % changes
+    volatility_7d = models.FloatField(null=True, blank=True)
+    volatility_30d = models.FloatField(null=True, blank=True)
+
+    # Per-commodity rows: commodity, unit, today, yesterday,
+    # change_percentage, trend, volatility_7d, volatility_30d
+    changes = models.JSONField(default=list)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.date} - {self.market_trend}"
@@ -0,0 +1,68 @@
+"""
+Weekly / monthly OHLC rollups of daily commodity prices.
+
+Used by the history endpoints so long-range charts receive one point per
+week or month instead of one per day. Aggregation is done with pandas
+resampling; pandas is imported inside rollup_prices() so validating the
+`resolution` parameter does not load it for plain daily requests.
+"""
+
+# resolution -> pandas resample rule (bins labelled by their first day)
+RESOLUTIONS = {
+    "daily": None,
+    "weekly": "W-MON",
+    "monthly": "MS",
+}
+
+
+def rollup_prices(frame, resolution: str) -> list:
+    """
+    Aggregate a daily price frame into OHLC buckets.
+
+    `frame` must have a DatetimeIndex and an `avg_price` column;
+    `min_price` / `max_price` are used for low / high when present,
+    otherwise the daily averages are.
+
+    Returns a list of dicts ordered by period:
+        period_start, open, high, low, close, avg, volatility, points
+
+    `volatility` is the std-dev of day-over-day % changes inside the bucket
+    (None when the bucket has fewer than two changes).
+    """
+    import pandas as pd
+
+    rule = RESOLUTIONS[resolution]
+    frame = frame.sort_index()
+    avg = frame["avg_price"].astype(float)
+    high_src = frame["max_price"] if "max_price" in frame else avg
+    low_src = frame["min_price"] if "min_price" in frame else avg
+
+    resample = {"closed": "left", "label": "left"}
+    buckets = pd.DataFrame(
+        {
+            "open": avg.resample(rule, **resample).first(),
+            "close": avg.resample(rule, **resample).last(),
+            "avg": avg.resample(rule, **resample).mean(),
+            "high": high_src.astype(float).resample(rule, **resample).max(),
+            "low": low_src.astype(float).resample(rule, **resample).min(),
+            "volatility": (avg.pct_change() * 100)
+            .resample(rule, **resample)
+            .std(),
+            "points": avg.resample(rule, **resample).count(),
+        }
+    )
+    buckets = buckets[buckets["points"] > 0].round(2)
+
+    return [
+        {
+            "period_start": str(row.Index.date()),
+            "open": row.open,
+            "high": row.high,
+            "low": row.low,
+            "close": row.close,
+            "avg": row.avg,
+            "volatility": None if pd.isna(row.volatility) else row.volatility,
+            "points": int(row.points),
+        }
+        for row in buckets.itertuples()
+    ]
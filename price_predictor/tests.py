@@ -1,3 +1,196 @@
-from django.test import TestCase
+from datetime import date
+from io import StringIO
 
-# Create your tests here.
+import pandas as pd
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from kalimati_forecast.exceptions import CommodityNotFoundError
+from kalimati_forecast.ml.preprocess import prepare_series
+
+from .commodity_index import (
+    EXACT,
+    FUZZY,
+    PREFIX,
+    SUBSTRING,
+    WORD_PREFIX,
+    CommodityIndex,
+    get_commodity_index,
+    invalidate_commodity_index,
+)
+from .market_service import get_market_movement, rebuild_market_summaries
+from .models import DailyMarketSummary, DailyPriceHistory, MasterProduct
+from .rollups import rollup_prices
+
+D1, D2, D3 = date(2024, 5, 1), date(2024, 5, 2), date(2024, 5, 3)
+
+
+class ExplainPriceQueriesTests(TestCase):
+    def test_explains_the_market_service_queries(self):
+        tomato = MasterProduct.objects.create(commodityname="Tomato Big", commodityunit="KG")
+        for day in (D1, D2):
+            DailyPriceHistory.objects.create(
+                product=tomato, date=day, min_price=90, max_price=110, avg_price=100
+            )
+
+        out = StringIO()
+        call_command("explain_price_queries", "--no-analyze", stdout=out)
+        report = out.getvalue()
+
+        for label in (
+            "analysis: stored daily summary",
+            "analysis: movement rows (live / summary build)",
+            "analysis: rolling volatility window",
+        ):
+            self.assertIn(f"== {label}", report)
+        self.assertNotIn("analysis: previous day rows", report)
+        self.assertIn("dph_date_product_idx", report)
+
+
+class MarketMovementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tomato = MasterProduct.objects.create(commodityname="Tomato Big", commodityunit="KG")
+        self.potato = MasterProduct.objects.create(commodityname="Potato Red", commodityunit="KG")
+
+    def price(self, product, day, avg):
+        DailyPriceHistory.objects.update_or_create(
+            product=product, date=day,
+            defaults={"min_price": avg - 5, "max_price": avg + 5, "avg_price": avg},
+        )
+
+    def test_small_moves_still_count_as_up_or_down(self):
+        self.price(self.tomato, D1, 100.0)
+        self.price(self.tomato, D2, 100.001)
+        self.price(self.potato, D1, 50.0)
+        self.price(self.potato, D2, 50.0)
+
+        movement = get_market_movement()
+        changes = {c["commodity"]: c for c in movement["changes"]}
+        self.assertEqual((changes["Tomato Big"]["trend"], changes["Tomato Big"]["change_percentage"]), ("up", 0.0))
+        self.assertEqual(changes["Potato Red"]["trend"], "same")
+        self.assertEqual((movement["market_trend"], movement["up_count"]), ("Bullish", 1))
+
+
+class MarketSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tomato = MasterProduct.objects.create(commodityname="Tomato Big", commodityunit="KG")
+
+    def price(self, day, avg):
+        DailyPriceHistory.objects.update_or_create(
+            product=self.tomato, date=day,
+            defaults={"min_price": avg - 5, "max_price": avg + 5, "avg_price": avg},
+        )
+
+    def test_reingesting_a_day_rebuilds_the_days_after_it(self):
+        for day, avg in ((D1, 100.0), (D2, 110.0), (D3, 99.0)):
+            self.price(day, avg)
+        summaries = rebuild_market_summaries(D1)
+        self.assertEqual([s.date for s in summaries], [D1, D2, D3])
+
+        latest = get_market_movement()
+        self.assertEqual(latest["changes"][0]["change_percentage"], -10.0)
+        self.assertEqual(latest["volatility_7d"], 14.14)
+
+        # D2 is corrected: D3's change (and the cached movement) follow it
+        self.price(D2, 90.0)
+        rebuild_market_summaries(D2)
+
+        d3 = DailyMarketSummary.objects.get(date=D3)
+        self.assertEqual((d3.market_trend, d3.changes[0]["change_percentage"]), ("Bullish", 10.0))
+        self.assertEqual(get_market_movement()["changes"][0]["change_percentage"], 10.0)
+        self.assertEqual(DailyMarketSummary.objects.get(date=D2).changes[0]["trend"], "down")
+
+
+class CommodityIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = CommodityIndex([
+            (1, "Tomato Big(Nepali)"),
+            (2, "Tomato Small(Local)"),
+            (3, "Potato Red"),
+            (4, "Cauli Local"),
+        ])
+
+    def test_literal_matches_are_ranked(self):
+        self.assertEqual(self.index.search("tomato big(nepali)")[0][:2], (EXACT, 1))
+        self.assertEqual([(r, k) for r, k, _ in self.index.search("tomato")], [(PREFIX, 1), (PREFIX, 2)])
+        self.assertEqual([(r, k) for r, k, _ in self.index.search("local")], [(WORD_PREFIX, 4), (WORD_PREFIX, 2)])
+        self.assertEqual([(r, k) for r, k, _ in self.index.search("mato")], [(SUBSTRING, 1), (SUBSTRING, 2)])
+
+    def test_aliases_resolve(self):
+        self.assertEqual(self.index.matching_keys("golbheda"), [1, 2])
+        self.assertEqual(self.index.resolve("Cauliflower"), 4)
+        self.assertEqual(self.index.search("zzzz"), [])
+
+    def test_misspellings_are_suggested_but_never_resolved(self):
+        self.assertEqual([(r, k) for r, k, _ in self.index.search("potatoe")], [(FUZZY, 3)])
+        self.assertIsNone(self.index.resolve("potatoe"))
+        self.assertEqual(self.index.matching_keys("potatoe"), [])
+
+    def test_forecast_series_needs_a_literal_match(self):
+        df = pd.DataFrame({
+            "date": pd.date_range("2024-01-01", periods=3, freq="D"),
+            "commodity": ["Potato Red"] * 3,
+            "avg_price": [50.0, 51.0, 52.0],
+        })
+        with self.assertRaises(CommodityNotFoundError):
+            prepare_series(df, "potatoe")
+
+
+class CommodityIndexCacheTests(TestCase):
+    def test_rebuilt_after_invalidation(self):
+        invalidate_commodity_index()
+        tomato = MasterProduct.objects.create(commodityname="Tomato Big")
+        self.assertEqual(get_commodity_index().resolve("tomato"), tomato.pk)
+
+        onion = MasterProduct.objects.create(commodityname="Onion Dry")
+        self.assertIsNone(get_commodity_index().resolve("onion"))
+        invalidate_commodity_index()
+        self.assertEqual(get_commodity_index().resolve("pyaj"), onion.pk)
+
+    def test_history_of_a_misspelt_commodity_is_empty(self):
+        invalidate_commodity_index()
+        potato = MasterProduct.objects.create(commodityname="Potato Red", commodityunit="KG")
+        DailyPriceHistory.objects.create(
+            product=potato, date=timezone.now().date(), min_price=45, max_price=55, avg_price=50
+        )
+
+        hit = self.client.get(reverse("history-last-month", args=["potato"]))
+        miss = self.client.get(reverse("history-last-month", args=["potatoe"]))
+        self.assertEqual(len(hit.json()), 1)
+        self.assertEqual((miss.status_code, miss.json()), (200, []))
+
+
+class RollupTests(SimpleTestCase):
+    def frame(self):
+        days = pd.date_range("2024-04-29", "2024-05-12", freq="D")
+        avg = [100.0 + i for i in range(len(days))]
+        return pd.DataFrame(
+            {"avg_price": avg, "min_price": [a - 5 for a in avg], "max_price": [a + 5 for a in avg]},
+            index=days,
+        )
+
+    def test_weekly_ohlc(self):
+        first, second = rollup_prices(self.frame(), "weekly")
+        self.assertEqual(first["period_start"], "2024-04-29")
+        self.assertEqual(
+            (first["open"], first["high"], first["low"], first["close"], first["avg"], first["points"]),
+            (100.0, 111.0, 95.0, 106.0, 103.0, 7),
+        )
+        self.assertEqual((second["period_start"], second["open"], second["close"]), ("2024-05-06", 107.0, 113.0))
+        self.assertIsNotNone(first["volatility"])
+
+    def test_monthly_buckets_skip_missing_days(self):
+        frame = self.frame().drop(pd.Timestamp("2024-05-05"))
+        april, may = rollup_prices(frame, "monthly")
+        self.assertEqual((april["period_start"], april["points"]), ("2024-04-01", 2))
+        self.assertEqual((may["period_start"], may["points"], may["open"]), ("2024-05-01", 11, 102.0))
+
+    def test_single_point_has_no_volatility(self):
+        frame = self.frame().iloc[:1]
+        (bucket,) = rollup_prices(frame, "weekly")
+        self.assertIsNone(bucket["volatility"])
@@ -5,7 +5,8 @@ from .views import (
     DailyPriceHistoryAPIView,
     MarketPriceAnalysisAPIView,
     PriceStatsAPIView,
-    LastMonthHistoryView
+    LastMonthHistoryView,
+    CommodityAutocompleteView,
 )
 
 urlpatterns = [
@@ -15,4 +16,5 @@ urlpatterns = [
     path("analysis/", MarketPriceAnalysisAPIView.as_view(), name="analysis"),
     path("stats/", PriceStatsAPIView.as_view(), name="price-stats"),
     path("history-last-month/<str:commodity>/", LastMonthHistoryView.as_view(), name="history-last-month"),
+    path("commodities/autocomplete/", CommodityAutocompleteView.as_view(), name="commodity-autocomplete"),
 ]
@@ -1,19 +1,22 @@
-import requests
 from datetime import datetime
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from krishiSathi import settings
+from krishiSathi.http_client import get_client
 from .models import MasterProduct, DailyPriceHistory
 from .serializers import MasterProductSerializer, DailyPriceHistorySerializer
-from .filters import MasterProductFilter
+from .filters import MasterProductFilter, CommoditySearchFilter
+from .commodity_index import get_commodity_index, invalidate_commodity_index
+from .market_service import get_market_movement, rebuild_market_summaries
 from rest_framework.permissions import AllowAny
 from rest_framework.generics import ListAPIView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from datetime import timedelta
 from django.utils import timezone
+from django.db.models import F
 
 class FetchMarketPriceAPIView(APIView):
     """
@@ -24,13 +27,15 @@ class FetchMarketPriceAPIView(APIView):
         - If commodity missing → set today's fields NULL, keep last_price unchanged
     2. DailyPriceHistory:
         - Insert only for commodities that appear in todays API
+    3. DailyMarketSummary:
+        - Rebuilt for the fetched date (the only writer of the summary)
     """
 
     permission_classes = [AllowAny]
 
     def get(self, request):
         
-        api_url = "https://kalimatimarket.gov.np/api/daily-prices/en"
+        api_url = "/api/daily-prices/en"
         
         headers = {
             "Accept": "application/json",
@@ -38,7 +43,7 @@ class FetchMarketPriceAPIView(APIView):
             "User-Agent": "Mozilla/5.0"
         }
         try:
-            response = requests.get(api_url,headers=headers,timeout=15)
+            response = get_client("kalimati").get(api_url, headers=headers)
             response.raise_for_status()
             data = response.json()
             
@@ -59,6 +64,7 @@ class FetchMarketPriceAPIView(APIView):
 
         # Track which items appear today
         products_seen_today = set()
+        new_products = False
 
         # Process all items from API
         for item in data["prices"]:
@@ -80,6 +86,7 @@ class FetchMarketPriceAPIView(APIView):
                     "last_price": avg_p,   # always updated when new data exists
                 }
             )
+            new_products = new_products or created
 
             DailyPriceHistory.objects.update_or_create(
                 product=product,
@@ -102,6 +109,14 @@ class FetchMarketPriceAPIView(APIView):
                 # last_price remains unchanged (previous known price)
                 product.save(update_fields=["min_price", "max_price", "avg_price"])
 
+        if new_products:
+            invalidate_commodity_index()
+
+        # Materialise the day's market analysis — the analysis endpoints
+        # only ever read this summary. Later days compare against this one,
+        # so their summaries (and cached movement) are rebuilt as well.
+        rebuild_market_summaries(api_date)
+
         return Response(
             {"message": "Market prices updated (missing items set to NULL)", "date": str(api_date)},
             status=status.HTTP_201_CREATED
@@ -110,7 +125,7 @@ class FetchMarketPriceAPIView(APIView):
 class LatestPricesAPIView(ListAPIView):
     """
     Latest market prices with:
-    - search by commodity name
+    - search by commodity name (?search=, via the commodity index)
     - filter by price range
     - sort ascending / descending
     """
@@ -121,13 +136,10 @@ class LatestPricesAPIView(ListAPIView):
 
     filter_backends = [
         DjangoFilterBackend,
-        SearchFilter,
+        CommoditySearchFilter,
         OrderingFilter,
     ]
 
-    # Search
-    search_fields = ["commodityname"]
-
     # Filter (from filters.py)
     filterset_class = MasterProductFilter
 
@@ -148,7 +160,7 @@ class DailyPriceHistoryAPIView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        data = DailyPriceHistory.objects.all()
+        data = DailyPriceHistory.objects.select_related("product")
         serializer = DailyPriceHistorySerializer(data, many=True)
         return Response(serializer.data)
 class MarketPriceAnalysisAPIView(APIView):
@@ -160,64 +172,30 @@ class MarketPriceAnalysisAPIView(APIView):
     permission_classes = [AllowAny]
     
     def get(self, request):
-        dates = list(
-            DailyPriceHistory.objects.values_list("date", flat=True)
-            .distinct()
-            .order_by("date")
-        )
+        movement = get_market_movement()
 
-        if len(dates) < 2:
+        if movement is None or movement["yesterday"] is None:
             return Response({"error": "Not enough historical data"}, status=400)
 
-        yesterday = dates[-2]
-        today = dates[-1]
-
-        today_rows = DailyPriceHistory.objects.filter(date=today)
-        yesterday_rows = DailyPriceHistory.objects.filter(date=yesterday)
-
-        # Fast lookup map
-        yesterday_map = {row.product.id: row.avg_price for row in yesterday_rows}
-
-        results = []
-        ups = downs = 0
-
-        for row in today_rows:
-            pid = row.product.id
-            today_avg = row.avg_price
-            y_avg = yesterday_map.get(pid)
-
-            if y_avg:
-                change_pct = ((today_avg - y_avg) / y_avg) * 100
-            else:
-                change_pct = 0
-
-            trend = (
-                "up" if change_pct > 0 else
-                "down" if change_pct < 0 else
-                "same"
-            )
-
-            if trend == "up": ups += 1
-            if trend == "down": downs += 1
-
-            results.append({
-                "commodity": row.product.commodityname,
-                "today": today_avg,
-                "yesterday": y_avg,
-                "change_percentage": round(change_pct, 2),
-                "trend": trend,
-            })
-
-        market_trend = (
-            "Bullish" if ups > downs else
-            "Bearish" if downs > ups else
-            "Neutral"
-        )
+        results = [
+            {
+                "commodity": c["commodity"],
+                "today": c["today"],
+                "yesterday": c["yesterday"],
+                "change_percentage": c["change_percentage"],
+                "trend": c["trend"],
+            }
+            for c in movement["changes"]
+        ]
 
         return Response({
-            "today": str(today),
-            "yesterday": str(yesterday),
-            "market_trend": market_trend,
+            "today": str(movement["today"]),
+            "yesterday": str(movement["yesterday"]),
+            "market_trend": movement["market_trend"],
+            "volatility": {
+                "7d": movement["volatility_7d"],
+                "30d": movement["volatility_30d"],
+            },
             "changes": results
         })
         
@@ -231,9 +209,9 @@ class PriceStatsAPIView(APIView):
 
         total_products = MasterProduct.objects.count()
 
-        updated_today = MasterProduct.objects.filter(
-            dailypricehistory__date=today
-        ).distinct().count()
+        # (product, date) is unique, so counting today's history rows is the
+        # same as counting distinct products — without the join.
+        updated_today = DailyPriceHistory.objects.filter(date=today).count()
 
         missing_today = total_products - updated_today
 
@@ -248,19 +226,84 @@ class PriceStatsAPIView(APIView):
         
 class LastMonthHistoryView(APIView):
     """
-    Returns last 30 days of data for a specific commodity
+    Returns last 30 days of data for a specific commodity.
+
+    ?resolution=daily (default) | weekly | monthly
+    Weekly / monthly return OHLC buckets per product instead of raw rows.
     """
 
     permission_classes = [AllowAny]
 
     def get(self, request, commodity):
+        from .rollups import RESOLUTIONS
+
+        resolution = request.query_params.get("resolution", "daily").lower()
+        if resolution not in RESOLUTIONS:
+            return Response(
+                {"error": f"resolution must be one of: {', '.join(RESOLUTIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         today = timezone.now().date()
         start_date = today - timedelta(days=30)
 
+        product_ids = get_commodity_index().matching_keys(commodity)
+
         data = DailyPriceHistory.objects.filter(
-            product__commodityname__icontains=commodity,
+            product_id__in=product_ids,
             date__gte=start_date
-        ).order_by("date")
+        ).select_related("product").order_by("date")
 
-        serializer = DailyPriceHistorySerializer(data, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        if resolution == "daily":
+            serializer = DailyPriceHistorySerializer(data, many=True)
+            return Response(serializer.data)
+
+        return Response(self._rollup(data, resolution))
+
+    def _rollup(self, queryset, resolution):
+        import pandas as pd
+        from .rollups import rollup_prices
+
+        rows = list(
+            queryset.values(
+                "date", "min_price", "max_price", "avg_price",
+                product_name=F("product__commodityname"),
+            )
+        )
+        if not rows:
+            return []
+
+        df = pd.DataFrame.from_records(rows)
+        df["date"] = pd.to_datetime(df["date"])
+
+        results = []
+        for name, group in df.groupby("product_name", sort=True):
+            for bucket in rollup_prices(group.set_index("date"), resolution):
+                results.append({"product_name": name, **bucket})
+        return results
+
+
+class CommodityAutocompleteView(APIView):
+    """
+    GET /api/market/commodities/autocomplete/?q=tom&limit=10
+    Ranked commodity suggestions from the in-memory commodity index.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            limit = 10
+
+        matches = get_commodity_index().search(query, limit=limit) if query else []
+
+        return Response({
+            "query": query,
+            "results": [
+                {"id": product_id, "commodityname": name}
+                for _, product_id, name in matches
+            ],
+        })
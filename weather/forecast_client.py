@@ -0,0 +1,97 @@
+"""
+Single-call OpenWeather client shared by the weather app and the chatbot.
+
+OpenWeather's 5-day /forecast response (up to 40 three-hour steps) holds
+everything either app shows, so one upstream call per location is enough:
+
+    data = fetch_forecast(q="Kathmandu")          # or lat=..., lon=...
+    current_conditions(data)                      # first step, as "current"
+    daily_summary(data)                           # one dict per local day
+
+daily_summary() groups the steps by the location's local date (using the
+city's UTC offset from the response) and aggregates them with numpy instead
+of a Python loop per day.
+"""
+
+import numpy as np
+from django.conf import settings
+
+from krishiSathi.http_client import get_client
+
+FORECAST_DAYS = 5
+SECONDS_PER_DAY = 86400
+
+
+def _params(query: dict) -> dict:
+    return {**query, "appid": settings.WEATHER_API_KEY, "units": "metric"}
+
+
+def fetch_forecast(**query) -> dict:
+    """Raw /forecast payload for q=<city> or lat=/lon=."""
+    response = get_client("openweather").get("/forecast", params=_params(query))
+    response.raise_for_status()
+    return response.json()
+
+
+async def afetch_forecast(**query) -> dict:
+    response = await get_client("openweather").aget("/forecast", params=_params(query))
+    response.raise_for_status()
+    return response.json()
+
+
+def current_conditions(data: dict) -> dict:
+    """Conditions of the first forecast step (nearest to now)."""
+    step = data["list"][0]
+    return {
+        "temperature": step["main"]["temp"],
+        "feels_like": step["main"]["feels_like"],
+        "humidity": step["main"]["humidity"],
+        "description": step["weather"][0]["description"],
+        "condition": step["weather"][0]["main"],
+        "wind_speed": step["wind"]["speed"],
+        "rainfall": step.get("rain", {}).get("3h", 0),
+        "location": data.get("city", {}).get("name", ""),
+    }
+
+
+def daily_summary(data: dict, days: int = FORECAST_DAYS) -> list[dict]:
+    """
+    Per-day aggregates for the first `days` local days: min / max / first
+    temperature, mean humidity, and the first step's description,
+    condition, rain and precipitation chance.
+    """
+    steps = data["list"]
+    n = len(steps)
+    if not n:
+        return []
+    offset = data.get("city", {}).get("timezone", 0)
+
+    dt = np.fromiter((s["dt"] for s in steps), dtype=np.int64, count=n)
+    temp = np.fromiter((s["main"]["temp"] for s in steps), dtype=np.float64, count=n)
+    humidity = np.fromiter((s["main"]["humidity"] for s in steps), dtype=np.float64, count=n)
+
+    day = (dt + offset) // SECONDS_PER_DAY
+    # Index of the first step of each day; steps are in time order
+    starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    counts = np.diff(np.r_[starts, n])
+    temp_min = np.minimum.reduceat(temp, starts)
+    temp_max = np.maximum.reduceat(temp, starts)
+    humidity_mean = np.add.reduceat(humidity, starts) / counts
+
+    summary = []
+    for k, first in enumerate(starts[:days]):
+        step = steps[first]
+        local_date = np.datetime64(int(day[first]), "D").item()
+        summary.append({
+            "date": local_date.strftime("%Y-%m-%d"),
+            "day": local_date.strftime("%A"),
+            "temp": float(temp[first]),
+            "temp_min": float(temp_min[k]),
+            "temp_max": float(temp_max[k]),
+            "humidity": float(humidity_mean[k]),
+            "description": step["weather"][0]["description"],
+            "condition": step["weather"][0]["main"],
+            "rain": step.get("rain", {}).get("3h", 0),
+            "precipitation_chance": step.get("pop", 0) * 100,
+        })
+    return summary
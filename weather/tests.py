@@ -1,3 +1,122 @@
-from django.test import TestCase
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.test import SimpleTestCase
+
+from krishiSathi.http_client import CircuitBreaker, CircuitOpenError, ServiceClient
+
+from .forecast_client import current_conditions, daily_summary
+
+# Nepal is UTC+5:45
+NPT_OFFSET = 5 * 3600 + 45 * 60
+
+
+def step(moment, temp, humidity, description="clear sky", pop=0.0, rain=None):
+    data = {
+        "dt": int(moment.replace(tzinfo=dt_timezone.utc).timestamp()),
+        "main": {"temp": temp, "feels_like": temp, "humidity": humidity},
+        "weather": [{"description": description, "main": description.title()}],
+        "wind": {"speed": 1.5},
+        "pop": pop,
+    }
+    if rain is not None:
+        data["rain"] = {"3h": rain}
+    return data
+
+
+class DailySummaryTests(SimpleTestCase):
+    def forecast(self):
+        return {
+            "city": {"name": "Kathmandu", "timezone": NPT_OFFSET},
+            "list": [
+                # 15:00 and 18:00 UTC are still 1 May in Kathmandu
+                step(datetime(2024, 5, 1, 15), 20.0, 60, "light rain", pop=0.8, rain=1.2),
+                step(datetime(2024, 5, 1, 18), 16.0, 80),
+                # 21:00 UTC is 02:45 on 2 May
+                step(datetime(2024, 5, 1, 21), 14.0, 90, "overcast clouds"),
+                step(datetime(2024, 5, 2, 0), 18.0, 70),
+                step(datetime(2024, 5, 2, 3), 25.0, 50),
+            ],
+        }
+
+    def test_steps_are_grouped_by_local_day(self):
+        days = daily_summary(self.forecast())
+
+        self.assertEqual([d["date"] for d in days], ["2024-05-01", "2024-05-02"])
+        first, second = days
+        self.assertEqual((first["temp"], first["temp_min"], first["temp_max"]), (20.0, 16.0, 20.0))
+        self.assertEqual(first["humidity"], 70.0)
+        self.assertEqual((first["description"], first["rain"], first["precipitation_chance"]),
+                         ("light rain", 1.2, 80.0))
+        self.assertEqual((second["temp"], second["temp_min"], second["temp_max"]), (14.0, 14.0, 25.0))
+        self.assertEqual(second["humidity"], 70.0)
+        self.assertEqual((second["description"], second["rain"]), ("overcast clouds", 0))
+
+    def test_days_limit_and_empty_forecast(self):
+        self.assertEqual(len(daily_summary(self.forecast(), days=1)), 1)
+        self.assertEqual(daily_summary({"list": []}), [])
+
+    def test_current_conditions_use_first_step(self):
+        current = current_conditions(self.forecast())
+        self.assertEqual((current["temperature"], current["rainfall"], current["location"]),
+                         (20.0, 1.2, "Kathmandu"))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("krishiSathi.http_client.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opens_after_threshold_and_lets_one_trial_through(self):
+        breaker = CircuitBreaker(threshold=2, reset_after=30)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        self.now += 30
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(threshold=1, reset_after=30)
+        breaker.record_failure()
+        self.now += 30
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_unreported_trial_expires(self):
+        breaker = CircuitBreaker(threshold=1, reset_after=30)
+        breaker.record_failure()
+        self.now += 30
+        self.assertTrue(breaker.allow())
+        self.now += 29
+        self.assertFalse(breaker.allow())
+        self.now += 1
+        self.assertTrue(breaker.allow())
+
+    def test_interrupted_request_settles_the_trial(self):
+        client = ServiceClient("test", "http://upstream", retries=0, breaker_threshold=1, breaker_reset=30)
+        with mock.patch.object(client.session, "request", side_effect=requests.ConnectionError):
+            with self.assertRaises(requests.ConnectionError):
+                client.get("/forecast")
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            client.get("/forecast")
+
+        self.now += 30
+        with mock.patch.object(client.session, "request", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                client.get("/forecast")
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(client.breaker.allow())
@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from chatbot.weather_cache import geo_key, snap_to_grid, weather_cache
 from .serializers import WeatherRequestSerializer
 from .weather_services import fetch_weather_and_forecast
 
@@ -14,6 +15,10 @@ class WeatherForecastView(APIView):
         lat = serializer.validated_data["lat"]
         lon = serializer.validated_data["lon"]
 
-        data = fetch_weather_and_forecast(lat, lon)
+        # Nearby coordinates share one cached forecast for their grid cell
+        cell_lat, cell_lon = snap_to_grid(lat, lon)
+        data = weather_cache.get_or_fetch(
+            geo_key(lat, lon), lambda: fetch_weather_and_forecast(cell_lat, cell_lon)
+        )
 
         return Response(data, status=status.HTTP_200_OK)